@@ -1,27 +1,27 @@
-from flask import Flask, redirect, url_for
+from flask import Flask, redirect, url_for, jsonify
 from flask_login import LoginManager
-from database import init_db
+from werkzeug.middleware.proxy_fix import ProxyFix
+from database import init_read_routing, ping_db
+from config import Config
 from models import User # Pastikan User diimpor dari models.py
 from blueprints.auth import auth_bp
 from blueprints.forum import forum_bp
 # Import fungsi create_messages_blueprint, bukan langsung messages_bp
 from blueprints.messages import create_messages_blueprint 
-import os
 from dotenv import load_dotenv
 from flask_socketio import SocketIO # Import SocketIO
+from commands import db_cli
+from purge import purge_worker
+from socket_manager import socketio_options, client_options as socketio_client_options
+from live_topics import topic_broadcaster
+from inbox import unread_count
 
 load_dotenv() # Memuat variabel dari .env
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-
-# Tambahkan baris ini untuk membuat fungsi str() tersedia di Jinja2
-app.jinja_env.globals.update(str=str)
-
-# Inisialisasi Flask-Login
+# Extension dibuat tanpa app; create_app() mengikatnya ke setiap instance Flask
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login' # Akan redirect ke halaman login jika user belum login
+socketio = SocketIO()
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -31,27 +31,70 @@ def load_user(user_id):
     """
     return User.find_by_id(user_id)
 
-# Inisialisasi database saat aplikasi dimulai
-# Menggunakan app.app_context() memastikan bahwa operasi database dilakukan dalam konteks aplikasi
-with app.app_context():
-    init_db()
+def create_app(config=Config):
+    """
+    Application factory. Dipanggil sekali per proses worker (lihat wsgi.py dan serve.py),
+    sehingga Flask app, server Socket.IO dan client MongoDB dibuat setelah fork.
+    `config` mengisi app.config; modul lain (cache, pool MongoDB, Socket.IO) membaca
+    config.Config langsung, jadi ubah environment sebelum import untuk pengaturannya.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if Config.PROXY_FIX_X_FOR:
+        # request.remote_addr (dipakai rate_limit.py) diambil dari X-Forwarded-For proxy tepercaya
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_FIX_X_FOR)
+
+    # Tambahkan baris ini untuk membuat fungsi str() tersedia di Jinja2
+    # socketio_client_options: opsi io(...) di template, sesuai transport server
+    # unread_count: badge pesan belum dibaca di navbar, dibaca langsung dari MongoDB (lihat inbox.py)
+    app.jinja_env.globals.update(str=str, socketio_client_options=socketio_client_options(), unread_count=unread_count)
+
+    # Inisialisasi Flask-Login
+    login_manager.init_app(app)
+
+    # Koneksi database dibuat saat pertama dipakai (database.get_db), bukan saat import, agar cold start
+    # tidak menunggu server selection MongoDB. Pemeriksaan koneksi: GET /healthz atau `flask db ping`.
+
+    # Setelah request tulis (POST), jalur baca berat sesi ini memakai primary sebentar; lihat database.read_db()
+    init_read_routing(app)
 
-# Inisialisasi Flask-SocketIO setelah inisialisasi Flask app
-# Gunakan `async_mode='eventlet'` atau `async_mode='gevent'` jika Anda berencana untuk deployment yang serius
-# Untuk pengembangan, mode default biasanya cukup.
-socketio = SocketIO(app, cors_allowed_origins="*") # Izinkan CORS jika diperlukan, atau batasi sesuai kebutuhan
+    # Async mode, transport dan client manager (message queue atau MongoDB) diatur lewat Config.SOCKETIO_*
+    # agar emit ke room sampai ke client yang terhubung ke worker/host lain; lihat socket_manager.py
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options()) # Izinkan CORS jika diperlukan, atau batasi sesuai kebutuhan
 
-# Registrasi Blueprints
-app.register_blueprint(auth_bp, url_prefix='/auth')
-app.register_blueprint(forum_bp, url_prefix='/') # Forum di root URL
+    # Registrasi Blueprints
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(forum_bp, url_prefix='/') # Forum di root URL
 
-# Buat instance blueprint messages dengan meneruskan objek socketio
-# Ini memecahkan circular import
-messages_bp = create_messages_blueprint(socketio)
-app.register_blueprint(messages_bp, url_prefix='/') # Pesan pribadi di root URL, atau bisa '/messages'
+    # Buat instance blueprint messages dengan meneruskan objek socketio
+    # Ini memecahkan circular import
+    messages_bp = create_messages_blueprint(socketio)
+    app.register_blueprint(messages_bp, url_prefix='/') # Pesan pribadi di root URL, atau bisa '/messages'
+
+    # Room per topik dan broadcast balasan baru/diedit/dihapus ke penonton topic_detail
+    topic_broadcaster.init_app(socketio)
+
+    app.add_url_rule('/healthz', 'healthz', healthz)
+
+    # Perintah CLI database: `flask db ping`, `flask db ensure-indexes`, `flask db check-indexes`
+    app.cli.add_command(db_cli)
+
+    return app
+
+def healthz():
+    """
+    Health check untuk load balancer / monitoring: ping MongoDB.
+    Mengembalikan 503 jika database tidak dapat dijangkau.
+    """
+    try:
+        return jsonify({'status': 'ok', 'mongo_ms': round(ping_db(Config.MONGO_HEALTHCHECK_TIMEOUT_SECONDS), 1)})
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 503
 
 
 if __name__ == '__main__':
-    # Pastikan debug=False saat produksi
-    # Jalankan aplikasi dengan socketio.run
+    # Hanya untuk pengembangan (server Werkzeug, debug, satu proses).
+    # Produksi: `python serve.py` (gunicorn, lihat README.md)
+    app = create_app()
+    purge_worker.start()
     socketio.run(app, debug=True)
@@ -0,0 +1,81 @@
+# benchmarks/bench_http.py
+"""
+Benchmark throughput HTTP sebuah server yang sedang berjalan: C client konkuren dengan
+koneksi keep-alive meminta path yang sama selama D detik. Melaporkan request/detik,
+latensi p50/p99 dan jumlah error. Dipakai untuk membandingkan server pengembangan
+(`python app.py`) dengan launcher produksi (`python serve.py`), lihat README.md.
+
+Jalankan dari root repo, terhadap server yang sudah berjalan:
+    python benchmarks/bench_http.py http://127.0.0.1:5000 --path / --path /topic/<id> -c 50 -d 30
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def worker(url, paths, deadline, results, lock):
+    parts = urlsplit(url)
+    conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = None
+    latencies, errors, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                conn = conn_class(parts.hostname, parts.port, timeout=30)
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    with lock:
+        results["latencies"].extend(latencies)
+        results["errors"] += errors
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="Base URL server, mis. http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="Path yang diminta bergiliran (boleh berulang); default /")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Jumlah client konkuren")
+    parser.add_argument("-d", "--duration", type=float, default=30, help="Lama pengukuran (detik)")
+    parser.add_argument("--warmup", type=float, default=3, help="Pemanasan sebelum pengukuran (detik)")
+    args = parser.parse_args()
+    paths = args.path or ["/"]
+
+    for duration in (args.warmup, args.duration): # Hasil pemanasan dibuang
+        results, lock = {"latencies": [], "errors": 0}, threading.Lock()
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=worker, args=(args.url, paths, deadline, results, lock))
+                   for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    latencies = results["latencies"]
+    print(f"server={args.url} paths={','.join(paths)} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"throughput: {len(latencies) / args.duration:10.1f} req/s ({len(latencies)} ok, {results['errors']} errors)")
+    print(f"latency:    p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_hydration.py
+"""
+Benchmark hidrasi model: membandingkan cara lama (constructor per baris dengan __dict__
+dan ObjectId(...) ulang) dengan row mapper berbasis __slots__ di models.py, untuk
+dokumen dict biasa maupun RawBSONDocument. Tidak membutuhkan MongoDB: dokumen
+di-encode ke BSON lalu di-decode dengan CodecOptions yang sama seperti driver.
+
+Jalankan dari root repo:  python benchmarks/bench_hydration.py [jumlah_baris]
+"""
+import datetime
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from hydration import CODEC_OPTIONS, RAW_CODEC_OPTIONS
+from models import Post
+
+REPEAT = 5
+
+
+class LegacyPost:
+    """The Post constructor path used before the hydration layer (per-row __dict__, ObjectId re-wrap)."""
+    def __init__(self, topic_id, content, author_id, author_username, created_at=None, updated_at=None, _id=None):
+        self.topic_id = ObjectId(topic_id)
+        self.content = content
+        self.author_id = ObjectId(author_id)
+        self.author_username = author_username
+        self.created_at = created_at if created_at else datetime.datetime.utcnow()
+        self.updated_at = updated_at if updated_at else datetime.datetime.utcnow()
+        self._id = _id if _id else ObjectId()
+        self._is_new = _id is None
+
+
+def legacy_rows(docs):
+    return [LegacyPost(
+        topic_id=p["topic_id"],
+        content=p["content"],
+        author_id=p["author_id"],
+        author_username=p["author_username"],
+        created_at=p["created_at"],
+        updated_at=p.get("updated_at", p["created_at"]),
+        _id=p["_id"]
+    ) for p in docs]
+
+
+def slot_rows(docs):
+    return [Post.from_document(p) for p in docs]
+
+
+def make_payloads(count):
+    """BSON-encoded posts documents, as they would arrive from the server."""
+    topic_id = ObjectId()
+    now = datetime.datetime(2024, 1, 1)
+    return [bson.encode({
+        "_id": ObjectId(),
+        "topic_id": topic_id,
+        "content": "Balasan contoh untuk benchmark hidrasi. " * 8,
+        "author_id": ObjectId(),
+        "author_username": f"user{i % 500}",
+        "created_at": now + datetime.timedelta(seconds=i),
+        "updated_at": now + datetime.timedelta(seconds=i),
+    }) for i in range(count)]
+
+
+def measure(name, payloads, codec_options, hydrate):
+    """
+    Reports, for one decode + hydrate strategy, the best decode and hydrate times and the
+    memory still held by the hydrated rows once the decoded documents are dropped.
+    """
+    decode_best = hydrate_best = float("inf")
+    for _ in range(REPEAT):
+        gc.collect()
+        started = time.perf_counter()
+        docs = [bson.decode(p, codec_options=codec_options) for p in payloads]
+        decoded = time.perf_counter()
+        hydrate(docs)
+        finished = time.perf_counter()
+        decode_best = min(decode_best, decoded - started)
+        hydrate_best = min(hydrate_best, finished - decoded)
+        del docs
+
+    gc.collect()
+    tracemalloc.start()
+    docs = [bson.decode(p, codec_options=codec_options) for p in payloads]
+    rows = hydrate(docs)
+    del docs
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    print(f"{name:<30} {decode_best * 1000:8.1f} {hydrate_best * 1000:8.1f} {(decode_best + hydrate_best) * 1000:8.1f}"
+          f" {retained / 1024 / 1024:9.2f} {peak / 1024 / 1024:9.2f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payloads = make_payloads(count)
+    print(f"{count} baris, waktu terbaik dari {REPEAT} putaran")
+    print(f"{'':<30} {'decode':>8} {'hidrasi':>8} {'total':>8} {'MiB sisa':>9} {'MiB puncak':>9}")
+    measure("constructor lama (naive)", payloads, CodecOptions(), legacy_rows)
+    measure("row mapper (tz-aware)", payloads, CODEC_OPTIONS, slot_rows)
+    measure("row mapper (RawBSONDocument)", payloads, RAW_CODEC_OPTIONS, slot_rows)
+
+
+if __name__ == "__main__":
+    main()
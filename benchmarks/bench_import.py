@@ -0,0 +1,123 @@
+# benchmarks/bench_import.py
+"""
+Benchmark cold start: waktu `import wsgi` (yang dijalankan Vercel pada setiap cold start)
+dan request pertama, masing-masing di interpreter baru. MONGO_URI diarahkan ke alamat
+yang tidak dapat dijangkau (TEST-NET), sehingga setiap akses jaringan ke MongoDB saat
+import atau saat merender halaman login langsung terlihat sebagai regresi besar.
+
+Selain median/p90, dicetak modul dengan waktu import kumulatif terbesar (-X importtime)
+untuk menunjukkan import mana yang perlu ditunda.
+
+Jalankan dari root repo:
+    python benchmarks/bench_import.py                       # ukur saja
+    python benchmarks/bench_import.py --save                # simpan sebagai baseline
+    python benchmarks/bench_import.py --tolerance 0.2       # gagal (exit 1) jika median > baseline + 20%
+Baseline bergantung pada mesin; simpan dan bandingkan di mesin (atau runner CI) yang sama.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmarks", ".import_baseline.json")
+
+# Dijalankan di interpreter baru; mencetak waktu import dan request pertama dalam detik
+PROBE = """
+import time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+response = wsgi.app.test_client().get('/auth/login')
+assert response.status_code == 200, response.status_code
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def probe_env():
+    env = dict(os.environ)
+    env.update({
+        "MONGO_URI": "mongodb://192.0.2.1:27017",
+        "SECRET_KEY": env.get("SECRET_KEY") or "bench"
+    })
+    env.pop("PYTHONDONTWRITEBYTECODE", None) # Cold start di deploy memakai .pyc yang sudah ada
+    return env
+
+
+def run_probe():
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=BASE_DIR, env=probe_env(),
+                            capture_output=True, text=True, check=True).stdout
+    import_s, request_s = output.split()[-2:]
+    return float(import_s), float(request_s)
+
+
+def top_imports(limit):
+    """Returns (cumulative_us, module) for the slowest top-level imports of one cold `import wsgi`."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wsgi"], cwd=BASE_DIR,
+                            env=probe_env(), capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2: # Modul yang diimpor langsung oleh wsgi/app dan satu tingkat di bawahnya
+            rows.append((int(parts[1]), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Jumlah interpreter baru yang diukur")
+    parser.add_argument("--top", type=int, default=15, help="Jumlah modul terlambat yang ditampilkan")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="File JSON baseline")
+    parser.add_argument("--save", action="store_true", help="Simpan hasil sebagai baseline baru")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Kenaikan median yang masih diterima (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    run_probe() # Pemanasan: bytecode .pyc dan page cache OS
+    samples = [run_probe() for _ in range(args.runs)]
+    imports = [s[0] * 1000 for s in samples]
+    requests = [s[1] * 1000 for s in samples]
+    result = {
+        "import_ms": round(statistics.median(imports), 1),
+        "first_request_ms": round(statistics.median(requests), 1),
+        "python": sys.version.split()[0]
+    }
+
+    print(f"import wsgi:    median {result['import_ms']:8.1f} ms  p90 {percentile(imports, 90):8.1f} ms")
+    print(f"first request:  median {result['first_request_ms']:8.1f} ms  p90 {percentile(requests, 90):8.1f} ms")
+    print("slowest imports (cumulative):")
+    for cumulative_us, name in top_imports(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline yet; run with --save to record one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failed = False
+    for key in ("import_ms", "first_request_ms"):
+        limit = baseline[key] * (1 + args.tolerance)
+        status = "OK" if result[key] <= limit else "REGRESSION"
+        failed = failed or status != "OK"
+        print(f"[{status}] {key}: {result[key]} ms (baseline {baseline[key]} ms, limit {limit:.1f} ms)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
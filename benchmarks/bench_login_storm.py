@@ -0,0 +1,158 @@
+# benchmarks/bench_login_storm.py
+"""
+Benchmark gelombang login: S client login bersamaan (GET form untuk token CSRF, lalu POST)
+sementara P client lain meminta route yang tidak berhubungan dengan login (default /healthz).
+Setiap fase berjalan D detik:
+
+1. baseline: hanya client route lain, tanpa login;
+2. storm: client login dan client route lain bersamaan.
+
+Melaporkan throughput login (berhasil, ditolak 503, gagal) dan p50/p99 route lain di kedua
+fase. Hashing di pool thread (passwords.py) seharusnya membuat p99 fase storm tetap dekat
+dengan baseline; bandingkan dengan PASSWORD_HASH_WORKERS dan PASSWORD_HASH_QUEUE yang berbeda.
+
+Semua percobaan memakai satu akun dan satu IP, jadi limiter login (rate_limit.py) akan
+menolaknya dengan 429 setelah beberapa percobaan. Untuk mengukur hashing, jalankan server
+dengan RATE_LIMIT_ENABLED=false; untuk mengukur limiter, biarkan aktif.
+
+Jalankan terhadap server yang sudah berjalan, dengan akun yang sudah terdaftar:
+    python benchmarks/bench_login_storm.py http://127.0.0.1:8000 --username bench --password rahasia123 \\
+        --storm 32 --probes 8 -d 20
+"""
+import argparse
+import http.client
+import re
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+CSRF_RE = re.compile(rb'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+class Client:
+    """One keep-alive connection with a minimal cookie jar (only the session cookie matters here)."""
+    def __init__(self, url):
+        parts = urlsplit(url)
+        conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.conn = conn_class(parts.hostname, parts.port, timeout=60)
+        self.cookies = {}
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            name, _, rest = header.partition("=")
+            self.cookies[name.strip()] = rest.split(";", 1)[0]
+        return response.status, data
+
+
+def login_worker(url, username, password, deadline, stats, lock):
+    client = Client(url)
+    local = {"ok": 0, "busy": 0, "limited": 0, "failed": 0, "latencies": []}
+    while time.perf_counter() < deadline:
+        client.cookies = {} # Sesi baru setiap percobaan, seperti client yang berbeda
+        started = time.perf_counter()
+        try:
+            status, page = client.request("GET", "/auth/login")
+            token = CSRF_RE.search(page)
+            body = urlencode({"username": username, "password": password,
+                              "csrf_token": token.group(1).decode() if token else ""})
+            status, _ = client.request("POST", "/auth/login", body)
+        except (OSError, http.client.HTTPException):
+            local["failed"] += 1
+            client = Client(url)
+            continue
+        if status == 302:
+            local["ok"] += 1
+            local["latencies"].append(time.perf_counter() - started)
+        elif status == 503:
+            local["busy"] += 1
+        elif status == 429:
+            local["limited"] += 1
+        else:
+            local["failed"] += 1
+    with lock:
+        for key in ("ok", "busy", "limited", "failed"):
+            stats[key] += local[key]
+        stats["latencies"].extend(local["latencies"])
+
+
+def probe_worker(url, path, deadline, stats, lock):
+    client = Client(url)
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status, _ = client.request("GET", path)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            client = Client(url)
+            continue
+        if status >= 500:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+    with lock:
+        stats["latencies"].extend(latencies)
+        stats["errors"] += errors
+
+
+def run_phase(args, storm):
+    deadline = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    logins = {"ok": 0, "busy": 0, "limited": 0, "failed": 0, "latencies": []}
+    probes = {"latencies": [], "errors": 0}
+    threads = [threading.Thread(target=probe_worker, args=(args.url, args.probe_path, deadline, probes, lock))
+               for _ in range(args.probes)]
+    if storm:
+        threads += [threading.Thread(target=login_worker,
+                                     args=(args.url, args.username, args.password, deadline, logins, lock))
+                    for _ in range(args.storm)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return logins, probes
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="Base URL server, mis. http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True, help="Akun yang sudah terdaftar")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--storm", type=int, default=32, help="Jumlah client login bersamaan")
+    parser.add_argument("--probes", type=int, default=8, help="Jumlah client route lain")
+    parser.add_argument("--probe-path", default="/healthz", help="Route yang tidak berhubungan dengan login")
+    parser.add_argument("-d", "--duration", type=float, default=20, help="Lama setiap fase (detik)")
+    args = parser.parse_args()
+
+    print(f"server={args.url} storm={args.storm} probes={args.probes} probe_path={args.probe_path} "
+          f"duration={args.duration}s")
+    for name, storm in (("baseline", False), ("storm", True)):
+        logins, probes = run_phase(args, storm)
+        lat = probes["latencies"]
+        print(f"[{name}] {args.probe_path}: {len(lat) / args.duration:8.1f} req/s, "
+              f"p50 {percentile(lat, 50):.1f} ms, p99 {percentile(lat, 99):.1f} ms, {probes['errors']} errors")
+        if storm:
+            print(f"[{name}] login: {logins['ok'] / args.duration:8.1f} ok/s, p50 {percentile(logins['latencies'], 50):.1f} ms, "
+                  f"p99 {percentile(logins['latencies'], 99):.1f} ms, {logins['busy']} rejected (503), "
+                  f"{logins['limited']} throttled (429), {logins['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
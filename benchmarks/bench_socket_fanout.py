@@ -0,0 +1,115 @@
+# benchmarks/bench_socket_fanout.py
+"""
+Benchmark fan-out client manager Socket.IO (lihat socket_manager.py): satu proses
+mem-publish N pesan lewat backend, K proses listener (mewakili worker/host lain)
+menerima semuanya. Melaporkan throughput publish, throughput sampai listener terakhir
+menerima pesan terakhir, serta latensi p50/p99 per pesan.
+
+Jalankan dari root repo, dengan broker yang sama seperti di deploy:
+    python benchmarks/bench_socket_fanout.py mongo                    # MONGO_URI, mode capped
+    SOCKETIO_MONGO_MODE=changestream python benchmarks/bench_socket_fanout.py mongo
+    python benchmarks/bench_socket_fanout.py redis://localhost:6379/0 --listeners 4 --messages 20000
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import socketio
+from config import Config
+from socket_manager import MongoManager, _mongo_url
+
+CHANNEL = "bench-socketio-fanout"
+
+
+def make_manager(url):
+    """Builds the same manager class socket_manager.socketio_options() / Flask-SocketIO would pick."""
+    if url == "mongo" or url.startswith(("mongodb://", "mongodb+srv://")):
+        return MongoManager(_mongo_url(url), channel=CHANNEL, collection=Config.SOCKETIO_MONGO_COLLECTION,
+                            mode=Config.SOCKETIO_MONGO_MODE, capped_bytes=Config.SOCKETIO_MONGO_CAPPED_BYTES)
+    if url.startswith(("redis://", "rediss://")):
+        return socketio.RedisManager(url, channel=CHANNEL)
+    if url.startswith("kafka://"):
+        return socketio.KafkaManager(url, channel=CHANNEL)
+    if url.startswith("zmq"):
+        return socketio.ZmqManager(url, channel=CHANNEL)
+    return socketio.KombuManager(url, channel=CHANNEL)
+
+
+def _decode(message):
+    if isinstance(message, dict):
+        return message
+    try:
+        return pickle.loads(message)
+    except Exception:
+        return None
+
+
+def listener(url, messages, ready, results):
+    manager = make_manager(url)
+    latencies = []
+    stream = manager._listen()
+    ready.set()
+    for message in stream:
+        data = _decode(message)
+        if not data or data.get("method") != "bench":
+            continue
+        latencies.append(time.time() - data["sent_at"])
+        if data["seq"] == messages - 1:
+            break
+    results.put((time.time(), latencies))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="URL message queue, atau `mongo` untuk MONGO_URI")
+    parser.add_argument("--listeners", type=int, default=2, help="Jumlah proses penerima")
+    parser.add_argument("--messages", type=int, default=5000, help="Jumlah pesan yang di-publish")
+    parser.add_argument("--payload", type=int, default=200, help="Ukuran isi pesan (byte)")
+    args = parser.parse_args()
+
+    results = multiprocessing.Queue()
+    procs = []
+    for _ in range(args.listeners):
+        ready = multiprocessing.Event()
+        proc = multiprocessing.Process(target=listener, args=(args.url, args.messages, ready, results), daemon=True)
+        proc.start()
+        ready.wait(30)
+        procs.append(proc)
+    time.sleep(1) # Beri waktu listener membuka cursor / subscription
+
+    publisher = make_manager(args.url)
+    body = "x" * args.payload
+    start = time.time()
+    for seq in range(args.messages):
+        publisher._publish({"method": "bench", "seq": seq, "sent_at": time.time(), "data": body})
+    published = time.time()
+
+    finished, latencies = [], []
+    for _ in procs:
+        done_at, lat = results.get(timeout=300)
+        finished.append(done_at)
+        latencies.extend(lat)
+    for proc in procs:
+        proc.join(5)
+
+    print(f"backend={args.url} listeners={args.listeners} messages={args.messages} payload={args.payload}B")
+    print(f"publish:   {args.messages / (published - start):10.0f} msg/s")
+    print(f"delivered: {args.messages / (max(finished) - start):10.0f} msg/s per listener "
+          f"({args.messages * args.listeners / (max(finished) - start):.0f} deliveries/s)")
+    print(f"latency:   p50 {percentile(latencies, 50) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
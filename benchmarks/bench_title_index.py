@@ -0,0 +1,99 @@
+# benchmarks/bench_title_index.py
+"""
+Benchmark index typeahead judul (title_index.TitleIndex): waktu build, ukuran memori,
+latensi suggest() dan waktu penggabungan delta ke blob. Tidak membutuhkan MongoDB:
+judul sintetis (3-9 kata) dimasukkan dengan langkah yang sama seperti rebuild().
+
+Jalankan dari root repo:  python benchmarks/bench_title_index.py [--titles N] [--delta N]
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from bson.objectid import ObjectId
+from config import Config
+from title_index import TitleIndex
+
+WORDS = ("belajar flask blueprint python mongodb index query cache socket server worker deploy "
+         "error login session template form topik balasan pesan profil admin cari judul data "
+         "koneksi replika atlas gunicorn gevent docker nginx proxy latensi memori thread proses "
+         "unicode jinja route api json token upload gambar skema migrasi backup pagination").split()
+SEED = 42
+
+
+def make_titles(count, rng):
+    """Synthetic titles of 3 to 9 words with a few unique words, so keys are not all duplicates."""
+    vocabulary = WORDS + [f"{w}{i}" for w in WORDS for i in range(200)]
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 9))).title()
+            for _ in range(count)]
+
+
+def build(titles):
+    """Builds a ready index the way TitleIndex.rebuild() does, without reading MongoDB."""
+    index = TitleIndex(Config.SUGGEST_MAX_WORDS, Config.SUGGEST_KEY_LENGTH,
+                       merge_threshold=sys.maxsize, refresh_seconds=float("inf"))
+    entries = []
+    for title in titles:
+        ordinal = index._append_title(ObjectId(), title)
+        entries.extend((key, ordinal, position) for key, position in index._keys_for(title))
+    entries.sort()
+    index._pack(entries)
+    index.ready = True
+    index._last_refresh = time.monotonic() # suggest() tidak memanggil sync() ke MongoDB
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=1_000_000, help="jumlah judul di index")
+    parser.add_argument("--delta", type=int, default=8000, help="judul baru yang digabung ke blob")
+    parser.add_argument("--queries", type=int, default=10000, help="jumlah panggilan suggest()")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    titles = make_titles(args.titles, rng)
+    gc.collect()
+
+    started = time.perf_counter()
+    index = build(titles)
+    build_seconds = time.perf_counter() - started
+    stats = index.stats()
+    print(f"{args.titles} judul, SUGGEST_MAX_WORDS={Config.SUGGEST_MAX_WORDS}, "
+          f"SUGGEST_KEY_LENGTH={Config.SUGGEST_KEY_LENGTH}")
+    print(f"build            {build_seconds:8.2f} s")
+    print(f"kunci            {stats['keys']:8d}")
+    print(f"memori (packed)  {stats['packed_bytes'] / 1024 / 1024:8.1f} MiB")
+
+    # Prefix 1-6 huruf dari kata yang ada di judul
+    queries = [rng.choice(WORDS)[:rng.randint(1, 6)] for _ in range(args.queries)]
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.suggest(query, Config.SUGGEST_LIMIT)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    print(f"suggest rata2    {statistics.fmean(latencies):8.3f} ms")
+    print(f"suggest p99      {latencies[int(len(latencies) * 0.99)]:8.3f} ms")
+
+    for title in make_titles(args.delta, rng):
+        index.add(ObjectId(), title)
+    # Sama seperti add() saat delta melewati SUGGEST_MERGE_THRESHOLD, tetapi di thread ini
+    with index._lock:
+        delta_keys = len(index._delta)
+        index._merging = True
+        index._frozen, index._delta = index._delta, []
+    started = time.perf_counter()
+    index._merge()
+    print(f"merge delta      {time.perf_counter() - started:8.2f} s ({delta_keys} kunci)")
+
+
+if __name__ == "__main__":
+    main()
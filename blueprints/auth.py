@@ -1,23 +1,42 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from models import User
-from werkzeug.security import generate_password_hash
+from passwords import password_hasher, HasherBusy
+import rate_limit
 from forms.forms import RegistrationForm, LoginForm # Import forms
 
 auth_bp = Blueprint('auth', __name__)
 
+def _throttled(template, form, retry_after):
+    """Jawaban 429 untuk percobaan yang melewati batas rate_limit.py."""
+    flash('Terlalu banyak percobaan. Silakan coba lagi nanti.', 'danger')
+    return render_template(template, form=form), 429, {'Retry-After': str(retry_after)}
+
+def _busy(template, form):
+    """Jawaban 503 saat antrean hashing password penuh (lihat passwords.py); client boleh mencoba lagi."""
+    flash('Server sedang sibuk. Silakan coba lagi sebentar lagi.', 'warning')
+    return render_template(template, form=form), 503, {'Retry-After': '1'}
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     """Route untuk pendaftaran user baru."""
     if current_user.is_authenticated:
         return redirect(url_for('forum.index'))
     form = RegistrationForm()
+    if request.method == 'POST':
+        # Sebelum validasi form: validasi menjalankan query keunikan ke database
+        retry_after = rate_limit.check_register(rate_limit.client_ip())
+        if retry_after:
+            return _throttled('register.html', form, retry_after)
     if form.validate_on_submit():
         username = form.username.data
         email = form.email.data
         password = form.password.data
         
-        hashed_password = generate_password_hash(password)
+        try:
+            hashed_password = password_hasher.hash(password)
+        except HasherBusy:
+            return _busy('register.html', form)
         new_user = User(username, email, hashed_password)
         new_user.save()
         flash('Pendaftaran berhasil! Silakan masuk.', 'success')
@@ -30,17 +49,29 @@ def login():
     if current_user.is_authenticated:
         return redirect(url_for('forum.index'))
     form = LoginForm()
+    if request.method == 'POST':
+        # Sebelum lookup user dan hashing password
+        retry_after = rate_limit.check_login(rate_limit.client_ip(), request.form.get('username'))
+        if retry_after:
+            return _throttled('login.html', form, retry_after)
     if form.validate_on_submit():
         username = form.username.data
         password = form.password.data
         user = User.find_by_username(username)
 
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HasherBusy:
+            return _busy('login.html', form)
+
+        if valid:
             login_user(user)
             flash('Berhasil masuk!', 'success')
             next_page = request.args.get('next')
             return redirect(next_page or url_for('forum.index'))
         else:
+            # Hanya percobaan gagal yang mengurangi bucket username
+            rate_limit.record_login_failure(username)
             flash('Nama pengguna atau kata sandi tidak valid.', 'danger')
     return render_template('login.html', form=form)
 
@@ -1,11 +1,26 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify
 from flask_login import login_required, current_user
-from models import Topic, Post, User
+from models import Topic, Post, User, LIVE_TOPICS
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+import counters
 from datetime import datetime
 from math import ceil
 from forms.forms import TopicForm, PostForm
 from functools import wraps
-from database import get_db
+from database import read_db
+from user_cache import user_cache
+from purge import job_progress
+from search_cache import search_cache
+from search_engine import search_backend
+from title_index import title_index
+from live_topics import topic_broadcaster
+from pool_stats import pool_monitor
+from passwords import password_hasher
+import rate_limit
+from config import Config
+from http_cache import conditional_get
+from page_cache import cached_page, page_cache, topic_tag, user_tag, TOPICS_TAG
 
 forum_bp = Blueprint('forum', __name__)
 
@@ -22,19 +37,55 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _cursor_args():
+    """
+    Membaca parameter pagination cursor dari query string.
+    `after`/`before` adalah token opaque, `last=1` melompat ke halaman terakhir.
+    """
+    after = request.args.get('after') or None
+    before = request.args.get('before') or None
+    last = request.args.get('last') == '1'
+    return after, before, last
+
+# Validator conditional GET (lihat http_cache.py): data murah yang berubah setiap kali halaman berubah
+
+def _forum_validators(**kwargs):
+    modified = counters.last_modified(counters.TOPICS_COUNTER, counters.POSTS_COUNTER, heavy=True)
+    return (modified,), modified
+
+def _topic_validators(topic_id):
+    try:
+        topic = read_db().topics.find_one(
+            {"_id": ObjectId(topic_id), **LIVE_TOPICS},
+            {"updated_at": 1, "reply_count": 1, "last_post_at": 1, "posts_updated_at": 1}
+        )
+    except InvalidId:
+        return None
+    if not topic:
+        return None
+    times = [topic.get(field) for field in ("updated_at", "last_post_at", "posts_updated_at")]
+    return (times, topic.get("reply_count")), max((t for t in times if t), default=None)
+
+def _profile_validators(username):
+    user = User.find_by_username(username)
+    if not user:
+        return None
+    counters.load_user_activity(user)
+    modified = counters.last_modified(counters.TOPICS_COUNTER, counters.POSTS_COUNTER, heavy=True)
+    return (user.topic_count, user.post_count, user.last_active_at, modified), modified
+
 @forum_bp.route('/')
+@conditional_get(_forum_validators, Config.CDN_S_MAXAGE_INDEX)
+@cached_page(Config.PAGE_CACHE_TTL_INDEX, lambda: [TOPICS_TAG])
 def index():
-    """Route utama untuk menampilkan daftar topik dengan pagination."""
-    page = request.args.get('page', 1, type=int)
+    """Route utama untuk menampilkan daftar topik dengan pagination berbasis cursor."""
     per_page = 10 # Jumlah topik per halaman
-    topics, total_topics = Topic.get_paginated_topics(page, per_page)
-    
-    total_pages = ceil(total_topics / per_page) if total_topics > 0 else 1
-    
-    return render_template('index.html', 
-                           topics=topics, 
-                           page=page, 
-                           total_pages=total_pages, 
+    after, before, last = _cursor_args()
+    pagination = Topic.get_topics_page(per_page, after=after, before=before, last=last)
+
+    return render_template('index.html',
+                           topics=pagination.items,
+                           pagination=pagination,
                            per_page=per_page)
 
 @forum_bp.route('/new_topic', methods=['GET', 'POST'])
@@ -56,6 +107,8 @@ def new_topic():
     return render_template('new_topic.html', form=form)
 
 @forum_bp.route('/topic/<topic_id>', methods=['GET', 'POST'])
+@conditional_get(_topic_validators, Config.CDN_S_MAXAGE_TOPIC)
+@cached_page(Config.PAGE_CACHE_TTL_TOPIC, lambda topic_id: [topic_tag(topic_id)])
 def topic_detail(topic_id):
     """Route untuk menampilkan detail topik dan memungkinkan balasan."""
     topic = Topic.find_by_id(topic_id)
@@ -63,13 +116,6 @@ def topic_detail(topic_id):
         flash('Topik tidak ditemukan.', 'danger')
         return redirect(url_for('forum.index'))
 
-    # Pagination untuk postingan/balasan
-    page = request.args.get('page', 1, type=int)
-    per_page = 5 # Jumlah postingan per halaman
-    # Pastikan topic._id dikonversi ke string saat diteruskan ke get_posts_for_topic
-    posts, total_posts = Post.get_posts_for_topic(str(topic._id), page, per_page) 
-    total_pages = ceil(total_posts / per_page) if total_posts > 0 else 1
-
     form = PostForm()
     if form.validate_on_submit():
         if not current_user.is_authenticated:
@@ -86,14 +132,17 @@ def topic_detail(topic_id):
         new_post.save()
         flash('Balasan Anda telah diposting!', 'success')
         # Redirect ke halaman terakhir postingan agar post baru terlihat
-        last_page = ceil((total_posts + 1) / per_page) if (total_posts + 1) > 0 else 1
-        return redirect(url_for('forum.topic_detail', topic_id=topic_id, page=last_page))
+        return redirect(url_for('forum.topic_detail', topic_id=topic_id, last=1))
 
-    return render_template('topic_detail.html', 
-                           topic=topic, 
-                           posts=posts, 
-                           page=page, 
-                           total_pages=total_pages,
+    # Pagination berbasis cursor untuk postingan/balasan
+    per_page = 5 # Jumlah postingan per halaman
+    after, before, last = _cursor_args()
+    pagination = Post.get_posts_page(str(topic._id), per_page, after=after, before=before, last=last)
+
+    return render_template('topic_detail.html',
+                           topic=topic,
+                           posts=pagination.items,
+                           pagination=pagination,
                            form=form)
 
 @forum_bp.route('/topic/<topic_id>/edit', methods=['GET', 'POST'])
@@ -134,7 +183,7 @@ def delete_topic(topic_id):
         flash('Anda tidak memiliki izin untuk menghapus topik ini.', 'danger')
         return redirect(url_for('forum.topic_detail', topic_id=topic_id))
 
-    topic.delete() # Memanggil metode delete di model
+    topic.delete() # Soft delete; balasan dihapus bertahap di background
     flash('Topik berhasil dihapus!', 'success')
     return redirect(url_for('forum.index'))
 
@@ -182,33 +231,35 @@ def delete_post(post_id):
     return redirect(url_for('forum.topic_detail', topic_id=topic_id_redirect))
 
 @forum_bp.route('/user/<username>')
+@conditional_get(_profile_validators, Config.CDN_S_MAXAGE_PROFILE)
+@cached_page(Config.PAGE_CACHE_TTL_PROFILE, lambda username: [user_tag(username)])
 def user_profile(username):
-    """Route untuk menampilkan profil user dan topik yang dibuat."""
+    """Route untuk menampilkan profil user beserta topik atau balasannya, dengan pagination berbasis cursor."""
     user = User.find_by_username(username)
     if not user:
         flash('User tidak ditemukan.', 'danger')
         return redirect(url_for('forum.index'))
-    
-    # Ambil topik yang dibuat oleh user ini
-    # Pastikan author_id adalah ObjectId untuk query
-    user_topics_data = list(get_db().topics.find({"author_id": user._id}).sort("created_at", -1))
-    
-    # Konversi data mentah ke objek Topic
-    user_topics = [Topic(
-        title=t["title"],
-        content=t["content"],
-        author_id=t["author_id"],
-        author_username=t["author_username"],
-        created_at=t["created_at"],
-        updated_at=t.get("updated_at", t["created_at"]),
-        _id=t["_id"]
-    ) for t in user_topics_data]
-
-    return render_template('user_profile.html', user=user, user_topics=user_topics)
+
+    # Jumlah topik/balasan di header dibaca dari counter pada dokumen user, bukan dihitung
+    counters.load_user_activity(user)
+    tab = 'replies' if request.args.get('tab') == 'replies' else 'topics'
+    per_page = 10
+    after, before, last = _cursor_args()
+    if tab == 'replies':
+        pagination = Post.get_user_posts_page(user._id, per_page, after=after, before=before, last=last)
+    else:
+        pagination = Topic.get_user_topics_page(user._id, per_page, after=after, before=before, last=last)
+
+    return render_template('user_profile.html',
+                           user=user,
+                           tab=tab,
+                           items=pagination.items,
+                           pagination=pagination)
 
 @forum_bp.route('/search')
+@conditional_get(_forum_validators, Config.CDN_S_MAXAGE_SEARCH)
 def search():
-    """Route untuk melakukan pencarian topik menggunakan Atlas Search."""
+    """Route untuk melakukan pencarian topik menggunakan backend pencarian yang dikonfigurasi."""
     query = request.args.get('q', '', type=str).strip()
     page = request.args.get('page', 1, type=int)
     per_page = 10
@@ -227,3 +278,30 @@ def search():
                            page=page, 
                            total_pages=total_pages,
                            total_results=total_results)
+
+@forum_bp.route('/search/suggest')
+def search_suggest():
+    """Route JSON untuk typeahead judul topik di navbar, dilayani dari index prefix di memori."""
+    query = request.args.get('q', '', type=str).strip()
+    suggestions = title_index.suggest(query, Config.SUGGEST_LIMIT) if query else []
+    for suggestion in suggestions:
+        suggestion['url'] = url_for('forum.topic_detail', topic_id=suggestion['id'])
+    return jsonify({'query': query, 'suggestions': suggestions})
+
+@forum_bp.route('/admin/stats')
+@admin_required
+def admin_stats():
+    """Route admin untuk melihat statistik cache (hit/miss, ukuran) dalam format JSON."""
+    return jsonify({
+        'user_cache': user_cache.stats(),
+        'purge_jobs': job_progress(),
+        'search': {'backend': search_backend.name,
+                   'index': search_backend.stats() if hasattr(search_backend, 'stats') else None,
+                   'cache': search_cache.stats()},
+        'title_index': title_index.stats(),
+        'page_cache': page_cache.stats(),
+        'live_topics': topic_broadcaster.stats(),
+        'mongo_pool': pool_monitor.stats(),
+        'password_hasher': password_hasher.stats(),
+        'rate_limits': rate_limit.stats()
+    })
@@ -1,15 +1,59 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from models import Message, User
+from hydration import as_utc
 from forms.forms import MessageForm
 from datetime import datetime
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from werkzeug.datastructures import MultiDict
 from flask_socketio import join_room, leave_room, emit # Import emit, join_room, leave_room
 
+HISTORY_PAGE_SIZE = 30 # Jumlah pesan per halaman riwayat percakapan
+
+def _message_payload(message, sender_username):
+    """Serializes a Message into the JSON shape shared by Socket.IO events and the history endpoint."""
+    return {
+        'message_id': str(message._id),
+        'sender_id': str(message.sender_id),
+        'receiver_id': str(message.receiver_id),
+        'content': message.content,
+        # ISO 8601 dengan offset (+00:00) agar browser tidak membacanya sebagai waktu lokal
+        'created_at': as_utc(message.created_at).isoformat(timespec='seconds'),
+        'sender_username': sender_username
+    }
+
 # Fungsi ini akan mengembalikan instance Blueprint, menerima socketio sebagai argumen
 def create_messages_blueprint(socketio_instance):
     messages_bp = Blueprint('messages', __name__)
 
+    def deliver_message(receiver_id, content):
+        """
+        Stores a message from current_user and emits it to the rooms of both participants
+        with a single emit. Returns the message payload, or None if saving failed.
+        """
+        conversation_id = Message.conversation_id_for(current_user._id, receiver_id)
+        saved_message = Message(current_user._id, receiver_id, content, conversation_id).save()
+        if not saved_message:
+            return None
+        message_data = _message_payload(saved_message, current_user.username)
+        socketio_instance.emit('new_message', message_data, to=[str(current_user._id), str(receiver_id)])
+        return message_data
+
+    def mark_read(other_user_id):
+        """
+        Marks the messages from other_user_id to current_user as read if any are unread,
+        then pushes the new unread total to the reader and a read receipt to the sender.
+        """
+        total = Message.mark_messages_as_read(other_user_id, current_user._id)
+        if total is None:
+            return
+        socketio_instance.emit('unread_count', {'total': total}, to=str(current_user._id))
+        socketio_instance.emit('messages_read', {
+            'conversation_id': Message.conversation_id_for(current_user._id, other_user_id),
+            'reader_id': str(current_user._id)
+        }, to=str(other_user_id))
+
     @messages_bp.route('/messages')
     @login_required
     def list_conversations():
@@ -31,37 +75,17 @@ def create_messages_blueprint(socketio_instance):
             flash('ID pengguna tidak valid.', 'danger')
             return redirect(url_for('messages.list_conversations'))
 
-        messages = Message.get_messages_between_users(current_user._id, other_user_obj_id)
+        # Hanya pesan terbaru yang dimuat; pesan lama diambil lewat endpoint riwayat
+        history = Message.get_messages_page(current_user._id, other_user_obj_id, HISTORY_PAGE_SIZE)
         
-        # Tandai pesan yang diterima oleh current_user dari other_user sebagai sudah dibaca
-        Message.mark_messages_as_read(other_user_obj_id, current_user._id)
+        # Tandai pesan dari other_user sebagai sudah dibaca; tanpa penulisan jika tidak ada yang belum dibaca
+        mark_read(other_user_obj_id)
 
         form = MessageForm()
 
+        # Fallback tanpa JavaScript / saat socket terputus; jalur utama adalah event `send_message`
         if form.validate_on_submit():
-            content = form.content.data
-            sender_id = current_user._id
-            receiver_id = other_user_obj_id
-            
-            u_ids = sorted([str(sender_id), str(receiver_id)])
-            conversation_id = f"{u_ids[0]}-{u_ids[1]}"
-
-            new_message = Message(sender_id, receiver_id, content, conversation_id)
-            saved_message = new_message.save() # Call save method
-
-            if saved_message: # Check if save was successful
-                message_data = {
-                    'message_id': str(saved_message._id),
-                    'sender_id': str(saved_message.sender_id),
-                    'receiver_id': str(saved_message.receiver_id),
-                    'content': saved_message.content,
-                    'created_at': saved_message.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    'sender_username': current_user.username
-                }
-                
-                socketio_instance.emit('new_message', message_data, room=str(current_user._id))
-                socketio_instance.emit('new_message', message_data, room=str(other_user_obj_id))
-
+            if deliver_message(other_user_obj_id, form.content.data): # Check if save was successful
                 flash('Pesan Anda telah dikirim!', 'success') # Add success flash message
                 form.content.data = '' 
                 return redirect(url_for('messages.conversation_detail', other_user_id=other_user_id))
@@ -70,11 +94,44 @@ def create_messages_blueprint(socketio_instance):
                 # If save failed, it's good to redirect to refresh the page and show the error.
                 return redirect(url_for('messages.conversation_detail', other_user_id=other_user_id))
         
+        # Status baca pesan terakhir milik current_user untuk indikator "Dibaca"
+        own_messages = [m for m in history.items if m.sender_id == current_user._id]
+        last_read = bool(own_messages) and own_messages[-1].read
+
         return render_template('conversation.html', 
                                other_user=other_user, 
-                               messages=messages, 
+                               messages=history.items, 
+                               older_cursor=history.prev_cursor,
+                               last_read=last_read,
                                form=form)
 
+    @messages_bp.route('/messages/<string:other_user_id>/history')
+    @login_required
+    def conversation_history(other_user_id):
+        """JSON endpoint returning the page of messages older than the `before` cursor."""
+        try:
+            other_user_obj_id = ObjectId(other_user_id)
+        except Exception:
+            return jsonify({'error': 'ID pengguna tidak valid.'}), 400
+
+        before = request.args.get('before') or None
+        if not before:
+            return jsonify({'error': 'Parameter before wajib diisi.'}), 400
+
+        history = Message.get_messages_page(current_user._id, other_user_obj_id, HISTORY_PAGE_SIZE, before=before)
+        # Nama lawan bicara hanya dicari jika halaman ini memuat pesan darinya
+        other_username = None
+        if any(m.sender_id == other_user_obj_id for m in history.items):
+            other_user = User.find_by_id(other_user_id)
+            other_username = other_user.username if other_user else None
+        return jsonify({
+            'messages': [
+                _message_payload(m, current_user.username if m.sender_id == current_user._id else other_username)
+                for m in history.items
+            ],
+            'older_cursor': history.prev_cursor
+        })
+
     # SocketIO event handlers. Dekorator ini harus menggunakan socketio_instance.
     @socketio_instance.on('connect')
     def handle_connect():
@@ -92,4 +149,48 @@ def create_messages_blueprint(socketio_instance):
             leave_room(str(current_user._id))
             print(f"User {current_user.username} (ID: {current_user._id}) disconnected and left room {current_user._id}")
 
+    @socketio_instance.on('send_message')
+    def handle_send_message(data):
+        """
+        Sends a private message over the socket: {receiver_id, content, csrf_token}.
+        The return value is the acknowledgement: {'ok': True, 'message': payload} with the
+        stored message, or {'ok': False, 'error': ...}. Both participants' rooms receive
+        `new_message` as with the HTTP form.
+        """
+        if not current_user.is_authenticated:
+            return {'ok': False, 'error': 'Silakan login terlebih dahulu.'}
+        if not isinstance(data, dict):
+            return {'ok': False, 'error': 'Data pesan tidak valid.'}
+        try:
+            receiver_id = ObjectId(data.get('receiver_id'))
+        except (InvalidId, TypeError):
+            return {'ok': False, 'error': 'ID pengguna tidak valid.'}
+        if not User.find_by_id(receiver_id):
+            return {'ok': False, 'error': 'User tidak ditemukan.'}
+
+        # Validator (termasuk CSRF) yang sama dengan form HTTP
+        form = MessageForm(formdata=MultiDict({
+            'content': data.get('content') or '',
+            'csrf_token': data.get('csrf_token') or ''
+        }))
+        if not form.validate():
+            errors = form.content.errors or form.csrf_token.errors
+            return {'ok': False, 'error': errors[0] if errors else 'Pesan tidak valid.'}
+
+        message_data = deliver_message(receiver_id, form.content.data)
+        if not message_data:
+            return {'ok': False, 'error': 'Gagal mengirim pesan. Silakan coba lagi.'}
+        return {'ok': True, 'message': message_data}
+
+    @socketio_instance.on('mark_read')
+    def handle_mark_read(data):
+        """Marks a conversation as read while it is open: {other_user_id}."""
+        if not current_user.is_authenticated or not isinstance(data, dict):
+            return
+        try:
+            other_user_id = ObjectId(data.get('other_user_id'))
+        except (InvalidId, TypeError):
+            return
+        mark_read(other_user_id)
+
     return messages_bp
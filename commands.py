@@ -0,0 +1,106 @@
+# commands.py
+"""
+Perintah CLI untuk pemeliharaan database, didaftarkan sebagai grup `flask db`.
+"""
+import sys
+import click
+from flask.cli import AppGroup
+from pymongo.errors import ConnectionFailure
+from database import ping_db
+from indexes import ensure_indexes, check_indexes
+from counters import TOPICS_COUNTER, get_count, repair_topic_counters, repair_user_counters
+from excerpts import backfill_excerpts
+from inbox import backfill_inbox
+from purge import job_progress
+from search_engine import search_backend
+
+db_cli = AppGroup('db', help='Perintah pemeliharaan database MongoDB.')
+
+
+@db_cli.command('ping')
+def ping_command():
+    """Memeriksa koneksi ke MongoDB; keluar dengan kode non-zero jika gagal."""
+    try:
+        click.echo(f"MongoDB OK ({ping_db():.1f} ms)")
+    except ConnectionFailure as e:
+        click.echo(f"MongoDB unreachable: {e}", err=True)
+        sys.exit(1)
+
+
+@db_cli.command('ensure-indexes')
+@click.option('--check', is_flag=True, help='Setelah membuat index, verifikasi setiap query dengan explain().')
+def ensure_indexes_command(check):
+    """Membuat semua index yang didefinisikan di indexes.INDEXES."""
+    created = ensure_indexes()
+    for collection_name, names in created.items():
+        click.echo(f"{collection_name}: {', '.join(names)}")
+    if check:
+        _run_index_check()
+
+
+@db_cli.command('check-indexes')
+def check_indexes_command():
+    """Menjalankan explain() untuk setiap query model dan gagal jika ada COLLSCAN/SORT di memori."""
+    _run_index_check()
+
+
+def _run_index_check():
+    """Prints the explain() result of every model query and exits non-zero on failure."""
+    failed = False
+    for name, stages, ok in check_indexes():
+        status = 'OK' if ok else 'FAIL'
+        click.echo(f"[{status}] {name}: {' -> '.join(stages)}")
+        failed = failed or not ok
+    if failed:
+        click.echo('Beberapa query tidak didukung index. Jalankan `flask db ensure-indexes`.', err=True)
+        sys.exit(1)
+
+
+@db_cli.command('repair-counters')
+@click.option('--batch-size', default=1000, show_default=True, help='Jumlah update per bulk_write.')
+def repair_counters_command(batch_size):
+    """Membangun ulang reply_count/last_post_* pada topik dan counter total topik dari koleksi posts."""
+    fixed = repair_topic_counters(batch_size=batch_size)
+    click.echo(f"{fixed} topik diperbaiki. Total topik: {get_count(TOPICS_COUNTER)}")
+
+
+@db_cli.command('repair-user-counters')
+@click.option('--batch-size', default=1000, show_default=True, help='Jumlah update per bulk_write.')
+def repair_user_counters_command(batch_size):
+    """Membangun ulang topic_count/post_count/last_active_at pada user dari koleksi topics dan posts."""
+    fixed = repair_user_counters(batch_size=batch_size)
+    click.echo(f"{fixed} user diperbaiki.")
+
+
+@db_cli.command('backfill-inbox')
+@click.option('--batch-size', default=1000, show_default=True, help='Jumlah percakapan per bulk_write.')
+def backfill_inbox_command(batch_size):
+    """Membangun koleksi inbox dari pesan yang sudah ada."""
+    written = backfill_inbox(batch_size=batch_size)
+    click.echo(f"{written} entri inbox ditulis.")
+
+
+@db_cli.command('backfill-excerpts')
+@click.option('--batch-size', default=1000, show_default=True, help='Jumlah update per bulk_write.')
+@click.option('--rewrite', is_flag=True, help='Tulis ulang semua excerpt, misalnya setelah EXCERPT_LENGTH diubah.')
+def backfill_excerpts_command(batch_size, rewrite):
+    """Mengisi field excerpt pada topik yang belum memilikinya."""
+    written = backfill_excerpts(batch_size=batch_size, rewrite=rewrite)
+    click.echo(f"{written} topik diperbarui.")
+
+
+@db_cli.command('purge-status')
+def purge_status_command():
+    """Menampilkan progres job penghapusan balasan topik di background."""
+    for job in job_progress():
+        click.echo(f"{job['topic_id']}: {job['status']}, {job['deleted_posts']} balasan dihapus")
+
+
+@db_cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Membangun ulang index pencarian lokal dari MongoDB dan menyimpan snapshot-nya."""
+    if search_backend.name != 'local':
+        click.echo(f"SEARCH_BACKEND={search_backend.name}; index lokal tidak digunakan.", err=True)
+        sys.exit(1)
+    stats = search_backend.rebuild()
+    click.echo(f"{stats['documents']} dokumen, {stats['terms']} term diindex ke {search_backend.snapshot_path}")
@@ -0,0 +1,194 @@
+# counters.py
+"""
+Counter global dan perbaikan counter denormalisasi pada dokumen topik dan user.
+
+Koleksi `counters` menyimpan satu dokumen per counter, misalnya
+{"_id": "topics", "count": <jumlah topik>}, sehingga halaman indeks tidak perlu
+menjalankan count_documents({}) di setiap request.
+
+Dokumen counter juga menyimpan `modified_at`, waktu penulisan terakhir pada koleksi
+terkait, yang dipakai sebagai validator Last-Modified/ETag (lihat http_cache.py).
+
+Dokumen user menyimpan `topic_count`, `post_count` dan `last_active_at` yang dijaga oleh
+jalur save/delete Topic dan Post (lihat record_user_activity()), sehingga header profil
+tidak memerlukan query penghitungan. Counter ini tidak disimpan di user_cache: perubahannya
+tidak meng-invalidate cache, dan profil membacanya dengan load_user_activity().
+"""
+import datetime
+from flask import g, has_request_context
+from pymongo import ASCENDING, UpdateOne
+from database import get_db, read_db
+
+TOPICS_COUNTER = "topics"
+POSTS_COUNTER = "posts"
+
+
+def increment(name, delta=1, touch=False):
+    """Atomically adds delta to the named counter, creating it if needed. touch=True also bumps modified_at."""
+    update = {"$inc": {"count": delta}}
+    if touch:
+        update["$max"] = {"modified_at": datetime.datetime.utcnow()}
+    get_db().counters.update_one({"_id": name}, update, upsert=True)
+
+
+def touch(name):
+    """Records that the collection behind the named counter was just written."""
+    get_db().counters.update_one(
+        {"_id": name}, {"$max": {"modified_at": datetime.datetime.utcnow()}}, upsert=True
+    )
+
+
+def last_modified(*names, heavy=False):
+    """
+    Returns the latest modified_at among the named counters, or None if none was touched yet.
+    heavy=True reads with the same routing as the heavy read paths (see database.read_db),
+    so validators do not run ahead of the pages they describe.
+    """
+    times = [doc["modified_at"] for doc in (read_db() if heavy else get_db()).counters.find({"_id": {"$in": list(names)}}, {"modified_at": 1})
+             if doc.get("modified_at")]
+    return max(times) if times else None
+
+
+def get_count(name):
+    """Returns the current value of the named counter (0 if it does not exist)."""
+    doc = get_db().counters.find_one({"_id": name})
+    return doc["count"] if doc else 0
+
+
+def repair_topic_counters(batch_size=1000):
+    """
+    Rebuilds reply_count, last_post_at and last_post_author on every topic from the
+    posts collection, then resets the global topic counter.
+    Only topics whose stored values drifted are written. Returns the number of topics fixed.
+    """
+    db = get_db()
+
+    # Satu aggregation yang berjalan di atas index topic_created_at, tanpa sort di memori
+    stats = {}
+    pipeline = [
+        {"$sort": {"topic_id": ASCENDING, "created_at": ASCENDING}},
+        {"$group": {
+            "_id": "$topic_id",
+            "reply_count": {"$sum": 1},
+            "last_post_at": {"$last": "$created_at"},
+            "last_post_author": {"$last": "$author_username"}
+        }}
+    ]
+    for row in db.posts.aggregate(pipeline, allowDiskUse=True):
+        stats[row["_id"]] = row
+
+    fixed = 0
+    ops = []
+    projection = {"reply_count": 1, "last_post_at": 1, "last_post_author": 1}
+    for topic in db.topics.find({}, projection):
+        row = stats.get(topic["_id"], {})
+        expected = {
+            "reply_count": row.get("reply_count", 0),
+            "last_post_at": row.get("last_post_at"),
+            "last_post_author": row.get("last_post_author")
+        }
+        if any(topic.get(field) != value for field, value in expected.items()):
+            ops.append(UpdateOne({"_id": topic["_id"]}, {"$set": expected}))
+        if len(ops) >= batch_size:
+            fixed += db.topics.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        fixed += db.topics.bulk_write(ops, ordered=False).modified_count
+
+    db.counters.update_one(
+        {"_id": TOPICS_COUNTER},
+        {"$set": {"count": db.topics.count_documents({"deleted_at": None})}},
+        upsert=True
+    )
+    return fixed
+
+
+def _user_activity_update(topics=0, posts=0, active_at=None):
+    update = {}
+    inc = {field: delta for field, delta in (("topic_count", topics), ("post_count", posts)) if delta}
+    if inc:
+        update["$inc"] = inc
+    if active_at is not None:
+        # Simpan sebagai UTC naive seperti timestamp lain di koleksi users
+        if active_at.tzinfo is not None:
+            active_at = active_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        update["$max"] = {"last_active_at": active_at}
+    return update
+
+
+def record_user_activity(user_id, topics=0, posts=0, active_at=None):
+    """
+    Adds topics/posts to a user's topic_count/post_count and moves last_active_at
+    forward to active_at (if given). The user cache does not hold these fields, so
+    nothing is invalidated.
+    """
+    update = _user_activity_update(topics, posts, active_at)
+    if update:
+        get_db().users.update_one({"_id": user_id}, update)
+
+
+def record_users_activity(activity):
+    """
+    Bulk form of record_user_activity: activity maps user_id -> (topics, posts, active_at).
+    Writes every user in one unordered bulk_write.
+    """
+    ops = []
+    for user_id, (topics, posts, active_at) in activity.items():
+        update = _user_activity_update(topics, posts, active_at)
+        if update:
+            ops.append(UpdateOne({"_id": user_id}, update))
+    if ops:
+        get_db().users.bulk_write(ops, ordered=False)
+
+
+def load_user_activity(user):
+    """
+    Sets topic_count, post_count and last_active_at on user from MongoDB, read by _id
+    with a projection once per request (user_cache does not hold them). Returns user.
+    """
+    memo = g.setdefault("_user_activity", {}) if has_request_context() else {}
+    if user._id not in memo:
+        doc = read_db().users.find_one({"_id": user._id}, {"topic_count": 1, "post_count": 1, "last_active_at": 1}) or {}
+        memo[user._id] = (doc.get("topic_count", 0), doc.get("post_count", 0), doc.get("last_active_at"))
+    user.topic_count, user.post_count, user.last_active_at = memo[user._id]
+    return user
+
+
+def repair_user_counters(batch_size=1000):
+    """
+    Rebuilds topic_count, post_count and last_active_at (newest topic or post created)
+    on every user from the topics and posts collections. Topics count while live; posts
+    count until they are purged (see purge.py). Only users whose stored values drifted
+    are written.
+    Returns the number of users fixed.
+    """
+    db = get_db()
+    stats = {}
+    pipelines = (
+        ("topic_count", db.topics, {"deleted_at": None}),
+        ("post_count", db.posts, {}),
+    )
+    for field, collection, match in pipelines:
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$author_id", "count": {"$sum": 1}, "last": {"$max": "$created_at"}}}
+        ]
+        for row in collection.aggregate(pipeline, allowDiskUse=True):
+            entry = stats.setdefault(row["_id"], {"topic_count": 0, "post_count": 0, "last_active_at": None})
+            entry[field] = row["count"]
+            if entry["last_active_at"] is None or (row["last"] and row["last"] > entry["last_active_at"]):
+                entry["last_active_at"] = row["last"]
+
+    fixed = 0
+    ops = []
+    projection = {"topic_count": 1, "post_count": 1, "last_active_at": 1}
+    for user in db.users.find({}, projection):
+        expected = stats.get(user["_id"], {"topic_count": 0, "post_count": 0, "last_active_at": None})
+        if any(user.get(field) != value for field, value in expected.items()):
+            ops.append(UpdateOne({"_id": user["_id"]}, {"$set": expected}))
+        if len(ops) >= batch_size:
+            fixed += db.users.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        fixed += db.users.bulk_write(ops, ordered=False).modified_count
+    return fixed
@@ -1,8 +1,18 @@
 # database.py
+import pymongo
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+from flask import has_request_context, request, session
 import os
+import threading
+from urllib.parse import urlsplit
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
+from config import Config
+from pool_stats import pool_monitor
 
 load_dotenv() # Memuat variabel dari .env
 
@@ -10,40 +20,164 @@ MONGO_URI = os.getenv("MONGO_URI")
 
 client = None
 db = None
+heavy_db = None
+_init_lock = threading.Lock()
+
+# Kunci session: sampai kapan (epoch detik) jalur baca berat tetap memakai primary
+PRIMARY_UNTIL_KEY = "_primary_until"
+# True di dalam primary_reads(): hasil baca akan di-cache, jadi jangan dari secondary yang tertinggal
+_force_primary = ContextVar("force_primary", default=False)
+
+
+def client_options():
+    """
+    Keyword arguments for MongoClient from Config. Unset options are left out, so the
+    driver default or the option in MONGO_URI applies.
+    """
+    options = {
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "maxConnecting": Config.MONGO_MAX_CONNECTING,
+        "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "zlibCompressionLevel": Config.MONGO_ZLIB_COMPRESSION_LEVEL,
+        "wTimeoutMS": Config.MONGO_WTIMEOUT_MS,
+        "readPreference": Config.MONGO_READ_PREFERENCE or None,
+        "compressors": Config.MONGO_COMPRESSORS or None,
+        "journal": True if Config.MONGO_WRITE_CONCERN_JOURNAL else None
+    }
+    w = Config.MONGO_WRITE_CONCERN
+    if w:
+        options["w"] = int(w) if w.isdigit() else w
+    options = {key: value for key, value in options.items() if value is not None}
+    options["event_listeners"] = [pool_monitor]
+    return options
+
+
+def heavy_read_preference():
+    """Read preference for heavy read paths (Config.MONGO_HEAVY_READ_PREFERENCE / MONGO_MAX_STALENESS_SECONDS)."""
+    mode = read_pref_mode_from_name(Config.MONGO_HEAVY_READ_PREFERENCE)
+    if mode == 0: # primary tidak menerima maxStalenessSeconds
+        return make_read_preference(mode, None)
+    return make_read_preference(mode, None, Config.MONGO_MAX_STALENESS_SECONDS or -1)
 
 def init_db():
     """
-    Menginisialisasi koneksi ke database MongoDB.
-    Dipanggil saat aplikasi dimulai.
-    """
-    global client, db
-    if client is None:
-        try:
-            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=15000) # Timeout 5 detik
-            # The ismaster command is cheap and does not require auth.
-            client.admin.command('ismaster') 
-            db = client.forum_db # Ganti 'forum_db' dengan nama database yang Anda inginkan di Atlas
-            print("MongoDB connected successfully!") # Untuk debugging
-        except ServerSelectionTimeoutError as err:
-            print(f"MongoDB connection timeout: {err}")
-            # Anda bisa mempertimbangkan untuk mengeluarkan exception atau menangani ini dengan cara lain
-            # Misalnya, aplikasi tidak akan berfungsi tanpa DB, jadi mungkin exit.
-            raise ConnectionFailure(f"Could not connect to MongoDB: {err}")
-        except ConnectionFailure as err:
-            print(f"MongoDB connection failed: {err}")
-            raise ConnectionFailure(f"Could not connect to MongoDB: {err}")
-        except Exception as err:
-            print(f"An unexpected error occurred during MongoDB connection: {err}")
-            raise Exception(f"Unexpected error connecting to MongoDB: {err}")
+    Menginisialisasi client MongoDB.
+    Dipanggil otomatis oleh get_db() saat database pertama kali dipakai, bukan saat import:
+    MongoClient tidak memblokir (koneksi dibuka di background), jadi cold start tidak
+    menunggu server selection. Pemeriksaan koneksi dilakukan oleh ping_db().
+    """
+    global client, db, heavy_db
+    with _init_lock:
+        if client is None:
+            try:
+                # Pool, kompresi, write concern: lihat Config
+                new_client = MongoClient(MONGO_URI, **client_options())
+                new_db = new_client.forum_db # Ganti 'forum_db' dengan nama database yang Anda inginkan di Atlas
+                heavy_db = new_db.with_options(read_preference=heavy_read_preference())
+                client = new_client
+                db = new_db # Terakhir: get_db() memeriksa `db` tanpa lock
+            except ConnectionFailure as err:
+                # Mis. resolusi DNS mongodb+srv gagal
+                print(f"MongoDB connection failed: {err}")
+                raise ConnectionFailure(f"Could not connect to MongoDB: {err}")
+            except Exception as err:
+                print(f"An unexpected error occurred during MongoDB connection: {err}")
+                raise Exception(f"Unexpected error connecting to MongoDB: {err}")
     return db
 
 def get_db():
     """
-    Mengembalikan objek database yang sudah terinisialisasi.
+    Mengembalikan objek database, menginisialisasi client pada pemakaian pertama.
     """
     if db is None:
-        print("Warning: Database not initialized, attempting to initialize...")
-        init_db() # Coba inisialisasi jika belum
-        if db is None: # Jika masih null setelah mencoba inisialisasi
-            raise Exception("Database not initialized. Call init_db() first or check connection issues.")
+        init_db()
     return db
+
+def close_db():
+    """Closes the client (e.g. when a server worker exits); the next get_db() opens a new one."""
+    global client, db, heavy_db
+    with _init_lock:
+        if client is not None:
+            client.close()
+        client = db = heavy_db = None
+
+def _reset_after_fork():
+    # MongoClient tidak fork-safe: proses anak (mis. worker gunicorn dengan --preload) tidak
+    # boleh memakai socket/thread monitor milik induk. Client induk ditinggalkan tanpa close()
+    # dan get_db() di anak membuat client baru.
+    global client, db, heavy_db, _init_lock
+    client = db = heavy_db = None
+    _init_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def ping_db(timeout=None):
+    """
+    Health check: runs `ping` on the server and returns the round trip in milliseconds.
+    Raises ConnectionFailure if no server is reachable within timeout seconds
+    (default: the server selection timeout).
+    """
+    get_db()
+    started = time.perf_counter()
+    try:
+        with pymongo.timeout(timeout):
+            client.admin.command('ping') # Murah dan tidak membutuhkan auth
+    except ServerSelectionTimeoutError as err:
+        raise ConnectionFailure(f"Could not connect to MongoDB: {err}")
+    return (time.perf_counter() - started) * 1000
+
+
+def source_name():
+    """
+    Identifies the database get_db() uses, as scheme://hosts/dbname without credentials or
+    options, so data derived from it (e.g. the search snapshot) is not loaded against another one.
+    """
+    parts = urlsplit(MONGO_URI or "")
+    return f"{parts.scheme}://{parts.netloc.rpartition('@')[2]}/{get_db().name}"
+
+
+def reads_own_writes():
+    """True while the current session is inside its read-your-writes window after a write request."""
+    return has_request_context() and session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+@contextmanager
+def primary_reads():
+    """
+    Routes read_db() to the primary inside the block. Used around shared cache rebuilds
+    (page_cache, search_cache): a result read from a lagging secondary right after an
+    invalidation would otherwise be served to everyone for the whole cache TTL.
+    """
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def read_db():
+    """
+    Database for heavy read paths (topic listings, topic pages, search, profiles),
+    routed by Config.MONGO_HEAVY_READ_PREFERENCE (primary unless configured otherwise).
+    Falls back to the primary-routed database during the session's read-your-writes
+    window, so the page after a reply or edit redirect shows the user's own write,
+    and inside primary_reads().
+    """
+    get_db()
+    return db if _force_primary.get() or reads_own_writes() else heavy_db
+
+
+def init_read_routing(app):
+    """Opens the read-your-writes window for the session after every write request."""
+    if Config.MONGO_READ_YOUR_WRITES_SECONDS <= 0:
+        return
+
+    @app.after_request
+    def mark_session_write(response):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            session[PRIMARY_UNTIL_KEY] = time.time() + Config.MONGO_READ_YOUR_WRITES_SECONDS
+        return response
@@ -0,0 +1,44 @@
+# excerpts.py
+"""
+Cuplikan (excerpt) isi topik untuk tampilan daftar.
+
+Topic.save menyimpan field `excerpt` berukuran terbatas di samping `content`, sehingga
+halaman indeks, hasil pencarian dan profil cukup memproyeksikan field tersebut tanpa
+mengambil seluruh isi topik. backfill_excerpts() mengisi field ini untuk dokumen lama.
+"""
+from pymongo import UpdateOne
+from config import Config
+from database import get_db
+
+
+def make_excerpt(content, length=None):
+    """Returns content cut to at most length characters, at a word boundary when possible."""
+    length = length or Config.EXCERPT_LENGTH
+    content = (content or "").strip()
+    if len(content) <= length:
+        return content
+    cut = content[:length]
+    space = cut.rfind(" ")
+    # Potong di batas kata kecuali kata terakhirnya sangat panjang
+    if space > length * 0.6:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def backfill_excerpts(batch_size=1000, rewrite=False):
+    """
+    Writes the excerpt field of topics that lack one (or of every topic when rewrite=True,
+    e.g. after changing EXCERPT_LENGTH). Returns the number of topics updated.
+    """
+    db = get_db()
+    query = {} if rewrite else {"excerpt": {"$exists": False}}
+    written = 0
+    ops = []
+    for topic in db.topics.find(query, {"content": 1}):
+        ops.append(UpdateOne({"_id": topic["_id"]}, {"$set": {"excerpt": make_excerpt(topic.get("content"))}}))
+        if len(ops) >= batch_size:
+            written += db.topics.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        written += db.topics.bulk_write(ops, ordered=False).modified_count
+    return written
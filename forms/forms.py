@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, TextAreaField, SubmitField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
+from wtforms.validators import DataRequired, Email, Length, EqualTo
 from models import User # Using models.User for validation
 from database import get_db # Import get_db
 
@@ -13,17 +13,20 @@ class RegistrationForm(FlaskForm):
                                      validators=[DataRequired('Konfirmasi kata sandi wajib diisi.'), EqualTo('password', message='Kata sandi tidak cocok.')])
     submit = SubmitField('Daftar')
 
-    def validate_username(self, username):
-        """Custom validator for existing username."""
-        user = User.find_by_username(username.data)
-        if user:
-            raise ValidationError('Nama pengguna ini sudah digunakan. Harap pilih yang lain.')
-
-    def validate_email(self, email):
-        """Custom validator for existing email."""
-        user = User.find_by_email(email.data) # Use find_by_email from User model
-        if user:
-            raise ValidationError('Email ini sudah terdaftar. Harap gunakan email lain.')
+    def validate(self, extra_validators=None):
+        """
+        Runs the field validators, then checks username and email uniqueness together
+        with a single users query instead of one query per field.
+        """
+        valid = super().validate(extra_validators)
+        if self.username.errors or self.email.errors:
+            return False # Format tidak valid: tidak perlu bertanya ke database
+        taken = User.taken_fields(self.username.data, self.email.data)
+        if "username" in taken:
+            self.username.errors.append('Nama pengguna ini sudah digunakan. Harap pilih yang lain.')
+        if "email" in taken:
+            self.email.errors.append('Email ini sudah terdaftar. Harap gunakan email lain.')
+        return valid and not taken
 
 class LoginForm(FlaskForm):
     """Form for user login."""
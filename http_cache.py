@@ -0,0 +1,89 @@
+# http_cache.py
+"""
+Conditional GET dan header cache untuk CDN/edge cache (Vercel) di route forum.
+
+Setiap route memberikan fungsi validator yang membaca data murah yang sudah ada
+(updated_at topik, waktu post terakhir, jumlah balasan, modified_at di koleksi
+counters). Dari situ dibentuk ETag dan Last-Modified; jika cocok dengan
+If-None-Match / If-Modified-Since, request dijawab 304 sebelum view dijalankan.
+
+Untuk pengunjung anonim respons diberi `Cache-Control: public, s-maxage=...,
+stale-while-revalidate=...` agar edge cache dapat melayaninya. Untuk user yang
+login (atau saat ada flash message) respons bersifat private dan hanya
+direvalidasi oleh browser.
+"""
+import datetime
+import hashlib
+from functools import wraps
+from flask import make_response, request, session
+from flask_login import current_user
+from config import Config
+from inbox import unread_count
+
+
+def _etag(parts, kwargs):
+    # Navbar user yang login memuat badge pesan belum dibaca, jadi jumlahnya ikut dalam ETag.
+    # Dibaca dari MongoDB, bukan dari user cache yang dapat tertinggal di worker lain.
+    user = (current_user.get_id(), unread_count(current_user)) if current_user.is_authenticated else None
+    raw = repr((Config.HTTP_CACHE_VERSION, request.endpoint, sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)), user, parts))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _cache_control(response, s_maxage, flashes):
+    if flashes:
+        response.headers['Cache-Control'] = 'no-store'
+    elif current_user.is_authenticated:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        response.headers['Cache-Control'] = (
+            f'public, max-age=0, s-maxage={s_maxage}, '
+            f'stale-while-revalidate={Config.CDN_STALE_WHILE_REVALIDATE}'
+        )
+    # Halaman anonim dan halaman user yang login berbeda (navbar, form balasan)
+    response.vary.add('Cookie')
+
+
+def conditional_get(validators, s_maxage):
+    """
+    Decorator that answers GET requests with 304 when the page is unchanged and sets cache headers.
+    validators(**view_args) returns (parts, last_modified): parts is any repr-able value that
+    changes whenever the page would, last_modified a naive UTC datetime or None. It may return
+    None (e.g. for a missing topic) to let the view respond uncached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+            validator = validators(**kwargs)
+            if validator is None:
+                return f(*args, **kwargs)
+            parts, last_modified = validator
+            if last_modified is not None:
+                # HTTP date hanya sampai detik; Werkzeug membandingkan datetime yang tz-aware
+                last_modified = last_modified.replace(microsecond=0, tzinfo=datetime.timezone.utc)
+            etag = _etag(parts, kwargs)
+            flashes = bool(session.get('_flashes'))
+
+            if not flashes and _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            _cache_control(response, s_maxage, flashes)
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,52 @@
+# hydration.py
+"""
+Lapisan hidrasi bersama untuk model di models.py.
+
+- Koleksi model dibaca dengan CodecOptions tz-aware (UTC), sehingga setiap datetime
+  yang keluar dari model selalu memiliki tzinfo dan aman dibandingkan satu sama lain.
+- Setiap model memiliki satu row mapper (`Model.from_document`) yang mengisi slot
+  langsung dari dokumen tanpa melewati constructor: nilai yang sudah ObjectId tidak
+  dibungkus ulang, dan model memakai `__slots__` sehingga tidak ada `__dict__` per baris.
+- Opsional (Config.HYDRATION_RAW_BSON): dokumen dibaca sebagai RawBSONDocument, yaitu
+  satu buffer bytes per baris yang baru di-decode saat field pertama diakses oleh row
+  mapper; sub-dokumen tetap berupa BSON mentah sampai benar-benar dibaca.
+"""
+import datetime
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from config import Config
+from database import get_db, read_db
+
+UTC = datetime.timezone.utc
+
+# tzinfo default CodecOptions sudah UTC; menyebutkannya lagi menambah astimezone() per datetime
+CODEC_OPTIONS = CodecOptions(tz_aware=True)
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument, tz_aware=True)
+
+
+def collection(name, raw=None, heavy=False):
+    """
+    Returns a collection whose documents decode datetimes as tz-aware UTC.
+    Documents are RawBSONDocument when raw is True (default: Config.HYDRATION_RAW_BSON).
+    heavy=True routes reads with Config.MONGO_HEAVY_READ_PREFERENCE (see database.read_db).
+    """
+    if raw is None:
+        raw = Config.HYDRATION_RAW_BSON
+    return (read_db() if heavy else get_db())[name].with_options(codec_options=RAW_CODEC_OPTIONS if raw else CODEC_OPTIONS)
+
+
+def utcnow():
+    """Current time as a tz-aware UTC datetime."""
+    return datetime.datetime.now(UTC)
+
+
+def as_utc(value):
+    """Treats naive datetimes as UTC (how the app has always stored them); leaves aware ones as they are."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def map_rows(mapper, rows):
+    """Applies a row mapper to an iterable of documents."""
+    return [mapper(row) for row in rows]
@@ -0,0 +1,206 @@
+# inbox.py
+"""
+Inbox percakapan yang dimaterialisasi per user.
+
+Koleksi `inbox` berisi satu dokumen per (user_id, conversation_id) dengan pesan
+terakhir, username lawan bicara dan jumlah pesan yang belum dibaca. Dokumen ini
+diperbarui oleh Message.save dan Message.mark_messages_as_read, sehingga halaman
+/messages cukup melakukan satu query ber-index.
+
+Dokumen user menyimpan total pesan belum dibaca (`unread_messages`) yang diubah
+bersama counter inbox, sehingga badge navbar tidak perlu menjumlahkan ulang. Badge dan
+ETag halaman membaca nilai itu langsung lewat unread_count(); field ini tidak disimpan di
+user cache (user_cache.UNCACHED_FIELDS), jadi mengubahnya tidak perlu invalidasi.
+"""
+from collections import Counter
+from flask import g, has_request_context
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateMany, UpdateOne
+from database import get_db
+
+SNIPPET_LENGTH = 100
+
+
+def _snippet(content):
+    return content[:SNIPPET_LENGTH]
+
+
+def _fill_usernames(db, entries):
+    """Sets other_username on freshly created inbox entries. entries: list of (user_id, conversation_id, other_user_id)."""
+    other_ids = list({other for _, _, other in entries})
+    usernames = {u["_id"]: u["username"] for u in db.users.find({"_id": {"$in": other_ids}}, {"username": 1})}
+    for user_id, conversation_id, other_user_id in entries:
+        db.inbox.update_one(
+            {"user_id": user_id, "conversation_id": conversation_id},
+            {"$set": {"other_username": usernames.get(other_user_id)}}
+        )
+
+
+def record_message(message):
+    """Updates the sender's and receiver's inbox entries for a newly stored message."""
+    record_messages([message])
+
+
+def record_messages(messages):
+    """
+    Updates the inbox entries of every participant for newly stored messages
+    in a single bulk_write. The last message of an entry only moves forward (by
+    created_at, then _id), so concurrent senders cannot leave an older message last.
+    """
+    if not messages:
+        return
+    db = get_db()
+    ops = []
+    participants = {}  # op index -> (user_id, conversation_id, other_user_id), for upserted entries
+    for message in sorted(messages, key=lambda m: (m.created_at, m._id)):
+        for user_id, other_user_id, update in (
+            (message.sender_id, message.receiver_id, {"$setOnInsert": {"unread_count": 0}}),
+            (message.receiver_id, message.sender_id, {"$inc": {"unread_count": 1}})
+        ):
+            participants[len(ops)] = (user_id, message.conversation_id, other_user_id)
+            ops.append(UpdateOne(
+                {"user_id": user_id, "conversation_id": message.conversation_id},
+                dict(update, **{"$set": {"other_user_id": other_user_id}}),
+                upsert=True
+            ))
+        ops.append(UpdateMany(
+            {"user_id": {"$in": [message.sender_id, message.receiver_id]},
+             "conversation_id": message.conversation_id,
+             "$or": [
+                 {"last_message_timestamp": None},
+                 {"last_message_timestamp": {"$lt": message.created_at}},
+                 {"last_message_timestamp": message.created_at, "last_message_id": {"$lt": message._id}}
+             ]},
+            {"$set": {
+                "last_message_id": message._id,
+                "last_message_content": _snippet(message.content),
+                "last_message_sender_id": message.sender_id,
+                "last_message_timestamp": message.created_at
+            }}
+        ))
+    # ordered=True: entri dibuat sebelum pesan terakhirnya ditulis
+    result = db.inbox.bulk_write(ops, ordered=True)
+    # Username lawan bicara hanya perlu dicari sekali, saat entri inbox pertama kali dibuat
+    if result.upserted_ids:
+        _fill_usernames(db, [participants[i] for i in result.upserted_ids])
+
+    received = Counter(message.receiver_id for message in messages)
+    db.users.bulk_write([UpdateOne({"_id": user_id}, {"$inc": {"unread_messages": count}})
+                         for user_id, count in received.items()], ordered=False)
+
+
+def unread_count(user):
+    """
+    The user's current unread_messages, read by _id with a projection once per request
+    (also stored on user, so later reads in the request agree).
+    """
+    memo = g.setdefault("_unread_counts", {}) if has_request_context() else {}
+    if user._id not in memo:
+        doc = get_db().users.find_one({"_id": user._id}, {"unread_messages": 1})
+        memo[user._id] = max(doc.get("unread_messages", 0), 0) if doc else 0
+    user.unread_messages = memo[user._id]
+    return memo[user._id]
+
+
+def has_unread(user_id, conversation_id):
+    """True when the user's inbox entry for the conversation counts unread messages."""
+    return get_db().inbox.find_one(
+        {"user_id": user_id, "conversation_id": conversation_id, "unread_count": {"$gt": 0}}, {"_id": 1}
+    ) is not None
+
+
+def mark_read(user_id, conversation_id, count):
+    """
+    Subtracts count messages that were just marked read from the user's inbox entry and
+    total. count must be the number of messages actually modified: a message stored
+    concurrently is then either counted here or still counted as unread, never both,
+    so the counters converge (they can dip below zero until its inbox update lands).
+    Returns the user's new total unread count, or None when count is 0 (nothing is written).
+    """
+    if not count:
+        return None
+    db = get_db()
+    db.inbox.update_one({"user_id": user_id, "conversation_id": conversation_id}, {"$inc": {"unread_count": -count}})
+    user = db.users.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"unread_messages": -count}},
+        projection={"unread_messages": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return max(user.get("unread_messages", 0), 0) if user else 0
+
+
+def get_inbox(user_id):
+    """Returns the user's conversations, most recent first."""
+    return list(get_db().inbox.find({"user_id": user_id}, {"_id": 0}).sort("last_message_timestamp", DESCENDING))
+
+
+def backfill_inbox(batch_size=1000):
+    """
+    Rebuilds the inbox collection from the messages collection.
+    Returns the number of inbox entries written.
+    """
+    db = get_db()
+
+    # Jumlah pesan belum dibaca per (conversation_id, receiver_id)
+    unread = {}
+    for row in db.messages.aggregate([
+        {"$match": {"read": False}},
+        {"$group": {"_id": {"c": "$conversation_id", "r": "$receiver_id"}, "n": {"$sum": 1}}}
+    ], allowDiskUse=True):
+        unread[(row["_id"]["c"], row["_id"]["r"])] = row["n"]
+
+    # Pesan terakhir per percakapan, memanfaatkan index conversation_created_at_id
+    last_messages = db.messages.aggregate([
+        {"$sort": {"conversation_id": ASCENDING, "created_at": ASCENDING}},
+        {"$group": {
+            "_id": "$conversation_id",
+            "last_message_id": {"$last": "$_id"},
+            "content": {"$last": "$content"},
+            "sender_id": {"$last": "$sender_id"},
+            "receiver_id": {"$last": "$receiver_id"},
+            "created_at": {"$last": "$created_at"}
+        }}
+    ], allowDiskUse=True)
+
+    written = 0
+    batch = []
+
+    def flush(batch):
+        user_ids = list({oid for row in batch for oid in (row["sender_id"], row["receiver_id"])})
+        usernames = {u["_id"]: u["username"] for u in db.users.find({"_id": {"$in": user_ids}}, {"username": 1})}
+        ops = []
+        for row in batch:
+            for user_id, other_id in ((row["sender_id"], row["receiver_id"]), (row["receiver_id"], row["sender_id"])):
+                ops.append(UpdateOne(
+                    {"user_id": user_id, "conversation_id": row["_id"]},
+                    {"$set": {
+                        "other_user_id": other_id,
+                        "other_username": usernames.get(other_id),
+                        "last_message_id": row["last_message_id"],
+                        "last_message_content": _snippet(row["content"]),
+                        "last_message_sender_id": row["sender_id"],
+                        "last_message_timestamp": row["created_at"],
+                        "unread_count": unread.get((row["_id"], user_id), 0)
+                    }},
+                    upsert=True
+                ))
+        db.inbox.bulk_write(ops, ordered=False)
+        return len(ops)
+
+    for row in last_messages:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            written += flush(batch)
+            batch = []
+    if batch:
+        written += flush(batch)
+
+    # Total belum dibaca per user mengikuti counter inbox yang baru ditulis
+    totals = {}
+    for (_, receiver_id), count in unread.items():
+        totals[receiver_id] = totals.get(receiver_id, 0) + count
+    db.users.update_many({"unread_messages": {"$ne": 0}}, {"$set": {"unread_messages": 0}})
+    ops = [UpdateOne({"_id": user_id}, {"$set": {"unread_messages": count}}) for user_id, count in totals.items()]
+    for i in range(0, len(ops), batch_size):
+        db.users.bulk_write(ops[i:i + batch_size], ordered=False)
+    return written
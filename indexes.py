@@ -0,0 +1,290 @@
+# indexes.py
+"""
+Registry deklaratif untuk semua index MongoDB yang dibutuhkan oleh query di models.py.
+
+INDEXES mendefinisikan index per koleksi, sedangkan QUERY_CHECKS berisi bentuk query
+yang benar-benar dijalankan oleh model. check_indexes() menjalankan explain() untuk
+setiap query tersebut dan melaporkan query yang jatuh ke COLLSCAN atau SORT di memori.
+"""
+import datetime
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from config import Config
+from database import get_db
+from socket_manager import MODE_CHANGE_STREAM, event_indexes
+
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "topics": [
+        # Topic.get_topics_page: find(LIVE_TOPICS).sort(created_at desc, _id desc)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_desc"),
+        # Topic.get_user_topics_page: find({author_id}).sort(created_at desc, _id desc)
+        IndexModel([("author_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="author_created_at_id"),
+        # LocalSearchBackend.sync: topik yang berubah / dihapus sejak sinkronisasi terakhir
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at_sparse", sparse=True),
+    ],
+    "posts": [
+        # Post.get_posts_page: find({topic_id}).sort(created_at asc, _id asc)
+        IndexModel([("topic_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="topic_created_at"),
+        # Post.get_user_posts_page: find({author_id}).sort(created_at desc, _id desc)
+        IndexModel([("author_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="author_created_at_id"),
+        # LocalSearchBackend.sync: balasan yang berubah sejak sinkronisasi terakhir
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "messages": [
+        # Message.get_messages_page: find({conversation_id}).sort(created_at, _id)
+        IndexModel([("conversation_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="conversation_created_at_id"),
+        # Message.mark_messages_as_read: {receiver_id, read, sender_id}
+        IndexModel([("receiver_id", ASCENDING), ("read", ASCENDING), ("sender_id", ASCENDING)], name="receiver_unread"),
+    ],
+    "purge_jobs": [
+        # purge.enqueue_topic_purge: satu job per topik
+        IndexModel([("topic_id", ASCENDING)], name="topic_unique", unique=True),
+        # PurgeWorker._claim_job: job tertunda / lease kedaluwarsa, yang terlama lebih dulu
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "rate_limits": [
+        # rate_limit.MongoStore: bucket dihapus setelah terisi penuh kembali
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "user_cache_invalidations": [
+        # UserCache.sync: invalidasi dari proses lain sejak sinkronisasi terakhir
+        IndexModel([("at", ASCENDING)], name="at"),
+        # Tidak berguna lagi setelah USER_CACHE_TTL: entri cache yang lebih lama sudah kedaluwarsa
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "page_cache_invalidations": [
+        # PageCache.sync: invalidasi dari proses lain sejak sinkronisasi terakhir
+        IndexModel([("at", ASCENDING)], name="at"),
+        # Tidak berguna lagi setelah TTL halaman terpanjang
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "post_tombstones": [
+        # LocalSearchBackend.sync: balasan yang dihapus sejak sinkronisasi terakhir
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at"),
+        # Tombstone dihapus setelah Config.SEARCH_TOMBSTONE_SECONDS
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "topic_tombstones": [
+        # TitleIndex.sync / LocalSearchBackend.sync: topik yang di-purge sejak sinkronisasi terakhir
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at"),
+        # Tombstone dihapus setelah Config.PURGE_TOMBSTONE_SECONDS
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "inbox": [
+        # inbox.record_messages / inbox.mark_read: satu entri per (user, percakapan)
+        IndexModel([("user_id", ASCENDING), ("conversation_id", ASCENDING)], name="user_conversation_unique", unique=True),
+        # Message.get_conversations: find({user_id}).sort(last_message_timestamp desc)
+        IndexModel([("user_id", ASCENDING), ("last_message_timestamp", DESCENDING)], name="user_last_message"),
+    ],
+}
+
+# Koleksi event Socket.IO dalam mode changestream (lihat socket_manager.py): TTL agar tidak tumbuh tanpa batas.
+# Capped collection (mode default) tidak boleh memiliki TTL index, jadi tidak didaftarkan.
+if Config.SOCKETIO_MONGO_MODE == MODE_CHANGE_STREAM:
+    INDEXES[Config.SOCKETIO_MONGO_COLLECTION] = event_indexes(Config.SOCKETIO_MONGO_MODE, Config.SOCKETIO_MONGO_TTL_SECONDS)
+
+# Contoh nilai untuk explain(); planner tidak membutuhkan dokumen yang benar-benar ada.
+_SAMPLE_ID = ObjectId()
+_SAMPLE_CONVERSATION = f"{_SAMPLE_ID}-{_SAMPLE_ID}"
+_SAMPLE_DATE = datetime.datetime(2024, 1, 1)
+
+# Setiap entri mencerminkan satu query di models.py / blueprints.
+QUERY_CHECKS = [
+    {
+        "name": "User.taken_fields",
+        "collection": "users",
+        "filter": {"$or": [{"username": "sample"}, {"email": "sample@example.com"}]},
+        "limit": 2,
+    },
+    {
+        "name": "Topic.get_topics_page (after cursor)",
+        "collection": "topics",
+        "filter": {"deleted_at": None,
+                   "created_at": {"$lte": _SAMPLE_DATE},
+                   "$or": [{"created_at": {"$lt": _SAMPLE_DATE}}, {"_id": {"$lt": _SAMPLE_ID}}]},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "limit": 11,
+    },
+    {
+        "name": "Topic.get_user_topics_page (after cursor)",
+        "collection": "topics",
+        "filter": {"author_id": _SAMPLE_ID, "deleted_at": None,
+                   "created_at": {"$lte": _SAMPLE_DATE},
+                   "$or": [{"created_at": {"$lt": _SAMPLE_DATE}}, {"_id": {"$lt": _SAMPLE_ID}}]},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "limit": 11,
+    },
+    {
+        "name": "Post.get_user_posts_page (after cursor)",
+        "collection": "posts",
+        "filter": {"author_id": _SAMPLE_ID,
+                   "created_at": {"$lte": _SAMPLE_DATE},
+                   "$or": [{"created_at": {"$lt": _SAMPLE_DATE}}, {"_id": {"$lt": _SAMPLE_ID}}]},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "limit": 11,
+    },
+    {
+        "name": "Post.get_user_posts_page (last page)",
+        "collection": "posts",
+        "filter": {"author_id": _SAMPLE_ID},
+        "sort": [("created_at", ASCENDING), ("_id", ASCENDING)],
+        "limit": 11,
+    },
+    {
+        "name": "Post.get_posts_page (after cursor)",
+        "collection": "posts",
+        "filter": {"topic_id": _SAMPLE_ID,
+                   "created_at": {"$gte": _SAMPLE_DATE},
+                   "$or": [{"created_at": {"$gt": _SAMPLE_DATE}}, {"_id": {"$gt": _SAMPLE_ID}}]},
+        "sort": [("created_at", ASCENDING), ("_id", ASCENDING)],
+        "limit": 6,
+    },
+    {
+        "name": "Post.get_posts_page (last page)",
+        "collection": "posts",
+        "filter": {"topic_id": _SAMPLE_ID},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "limit": 6,
+    },
+    {
+        "name": "LocalSearchBackend.sync topics",
+        "collection": "topics",
+        "filter": {"updated_at": {"$gte": _SAMPLE_DATE}, "deleted_at": None},
+    },
+    {
+        "name": "LocalSearchBackend.sync deleted topics",
+        "collection": "topics",
+        "filter": {"deleted_at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "LocalSearchBackend.sync posts",
+        "collection": "posts",
+        "filter": {"updated_at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "UserCache.sync",
+        "collection": "user_cache_invalidations",
+        "filter": {"at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "PageCache.sync",
+        "collection": "page_cache_invalidations",
+        "filter": {"at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "LocalSearchBackend.sync deleted posts",
+        "collection": "post_tombstones",
+        "filter": {"deleted_at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "LocalSearchBackend._live_ids",
+        "collection": "topics",
+        "filter": {"_id": {"$in": [_SAMPLE_ID]}, "deleted_at": None},
+    },
+    {
+        "name": "purge.purged_topic_ids",
+        "collection": "topic_tombstones",
+        "filter": {"deleted_at": {"$gte": _SAMPLE_DATE}},
+    },
+    {
+        "name": "Message.get_messages_page (older messages)",
+        "collection": "messages",
+        "filter": {"conversation_id": _SAMPLE_CONVERSATION,
+                   "created_at": {"$lte": _SAMPLE_DATE},
+                   "$or": [{"created_at": {"$lt": _SAMPLE_DATE}}, {"_id": {"$lt": _SAMPLE_ID}}]},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "limit": 31,
+    },
+    {
+        "name": "Message.get_conversations (inbox)",
+        "collection": "inbox",
+        "filter": {"user_id": _SAMPLE_ID},
+        "sort": [("last_message_timestamp", DESCENDING)],
+    },
+    {
+        "name": "inbox.has_unread",
+        "collection": "inbox",
+        "filter": {"user_id": _SAMPLE_ID, "conversation_id": _SAMPLE_CONVERSATION, "unread_count": {"$gt": 0}},
+    },
+    {
+        "name": "Message.mark_messages_as_read",
+        "collection": "messages",
+        "filter": {"sender_id": _SAMPLE_ID, "receiver_id": _SAMPLE_ID, "read": False},
+    },
+    {
+        "name": "PurgeWorker._claim_job (pending)",
+        "collection": "purge_jobs",
+        "filter": {"status": "pending"},
+        "sort": [("created_at", ASCENDING)],
+        "limit": 1,
+    },
+    {
+        "name": "User.find_by_username",
+        "collection": "users",
+        "filter": {"username": "sample"},
+    },
+    {
+        "name": "User.find_by_email",
+        "collection": "users",
+        "filter": {"email": "sample@example.com"},
+    },
+]
+
+# Stage pada winning plan yang menandakan query tidak didukung index.
+BAD_STAGES = ("COLLSCAN", "SORT")
+
+
+def ensure_indexes():
+    """Creates every index in INDEXES. Returns a dict of collection -> created index names."""
+    db = get_db()
+    created = {}
+    for collection_name, models in INDEXES.items():
+        created[collection_name] = db[collection_name].create_indexes(models)
+    return created
+
+
+def _plan_stages(plan):
+    """Yields every stage name in a (possibly nested) query plan."""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def explain_query(check):
+    """Runs explain() for a single QUERY_CHECKS entry and returns the winning plan stages."""
+    db = get_db()
+    command = {"find": check["collection"], "filter": check["filter"]}
+    if check.get("sort"):
+        command["sort"] = dict(check["sort"])
+    if check.get("limit"):
+        command["limit"] = check["limit"]
+    explain = db.command("explain", command, verbosity="queryPlanner")
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    return list(_plan_stages(winning_plan))
+
+
+def check_indexes():
+    """
+    Runs explain() on every query in QUERY_CHECKS.
+    Returns a list of (name, stages, ok) tuples; ok is False when the plan
+    contains COLLSCAN or an in-memory SORT.
+    """
+    results = []
+    for check in QUERY_CHECKS:
+        stages = explain_query(check)
+        ok = not any(stage in BAD_STAGES for stage in stages)
+        results.append((check["name"], stages, ok))
+    return results
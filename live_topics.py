@@ -0,0 +1,148 @@
+# live_topics.py
+"""
+Pembaruan langsung halaman topik lewat Socket.IO.
+
+Penonton topic_detail bergabung ke room `topic:<id>` (event `join_topic`). Post.save,
+Post.save_many dan Post.delete (lihat models.py) melaporkan perubahan balasan ke
+TopicBroadcaster, yang mengumpulkannya per topik selama jendela singkat
+(Config.LIVE_TOPIC_COALESCE_SECONDS) lalu mengirim paling banyak satu event per jenis:
+
+- `post_created` {topic_id, posts: [...], more}: balasan baru, dibatasi
+  Config.LIVE_TOPIC_MAX_POSTS; `more` adalah jumlah balasan lain yang tidak dikirim.
+- `post_updated` {topic_id, posts: [...]}: isi terbaru balasan yang diedit.
+- `post_deleted` {topic_id, post_ids: [...]}.
+
+Balasan yang dibuat lalu dihapus dalam jendela yang sama tidak dikirim sama sekali,
+dan beberapa edit pada balasan yang sama digabung menjadi versi terakhir.
+"""
+import threading
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from config import Config
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+def topic_room(topic_id):
+    return f"topic:{topic_id}"
+
+
+def post_payload(post):
+    """Serializes a Post into the compact shape sent to topic viewers."""
+    return {
+        "post_id": str(post._id),
+        "author_id": str(post.author_id),
+        "author_username": post.author_username,
+        "content": post.content,
+        "created_at": post.created_at.strftime('%Y-%m-%d %H:%M'),
+        "updated_at": post.updated_at.strftime('%Y-%m-%d %H:%M')
+    }
+
+
+class TopicBroadcaster:
+    """Coalesces post changes per topic and emits them to the topic's Socket.IO room."""
+    def __init__(self, window, max_posts):
+        self.window = window
+        self.max_posts = max_posts
+        self.socketio = None
+        self._pending = {}  # topic_id -> {post_id: (kind, payload)}, in arrival order
+        self._lock = threading.Lock()
+        self._flushing = False
+        self.events = 0
+        self.emits = 0
+
+    def init_app(self, socketio):
+        """Attaches the SocketIO server and registers the join/leave handlers for topic rooms."""
+        # Diimpor di sini agar models.py (dan perintah CLI) tidak memuat Flask-SocketIO saat import
+        from flask_socketio import join_room, leave_room
+        self.socketio = socketio
+
+        @socketio.on('join_topic')
+        def handle_join_topic(data):
+            room = self._room_from(data)
+            if room:
+                join_room(room)
+
+        @socketio.on('leave_topic')
+        def handle_leave_topic(data):
+            room = self._room_from(data)
+            if room:
+                leave_room(room)
+
+    @staticmethod
+    def _room_from(data):
+        try:
+            return topic_room(ObjectId(data.get('topic_id'))) if isinstance(data, dict) else None
+        except (InvalidId, TypeError):
+            return None
+
+    def post_created(self, post):
+        self._record(post.topic_id, str(post._id), CREATED, post_payload(post))
+
+    def post_updated(self, post):
+        self._record(post.topic_id, str(post._id), UPDATED, post_payload(post))
+
+    def post_deleted(self, post):
+        self._record(post.topic_id, str(post._id), DELETED, None)
+
+    def _record(self, topic_id, post_id, kind, payload):
+        if self.socketio is None:
+            return # Tidak ada server Socket.IO (misalnya perintah CLI)
+        with self._lock:
+            self.events += 1
+            changes = self._pending.setdefault(str(topic_id), {})
+            previous = changes.get(post_id)
+            if previous is not None and previous[0] == CREATED:
+                if kind == DELETED:
+                    # Dibuat lalu dihapus sebelum dikirim: penonton tidak perlu tahu
+                    del changes[post_id]
+                    return
+                kind = CREATED # Edit atas balasan yang belum terkirim tetap dikirim sebagai balasan baru
+            changes[post_id] = (kind, payload)
+            if self._flushing:
+                return
+            self._flushing = True
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        """Emits pending changes once per window until no more changes arrive."""
+        while True:
+            self.socketio.sleep(self.window)
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if not pending:
+                    self._flushing = False
+                    return
+            for topic_id, changes in pending.items():
+                self._emit_topic(topic_id, changes)
+
+    def _emit_topic(self, topic_id, changes):
+        grouped = {CREATED: [], UPDATED: [], DELETED: []}
+        for post_id, (kind, payload) in changes.items():
+            grouped[kind].append(payload if kind != DELETED else post_id)
+        room = topic_room(topic_id)
+        try:
+            if grouped[CREATED]:
+                created = grouped[CREATED]
+                self.socketio.emit('post_created', {
+                    "topic_id": topic_id,
+                    "posts": created[-self.max_posts:],
+                    "more": max(len(created) - self.max_posts, 0)
+                }, to=room)
+                self.emits += 1
+            if grouped[UPDATED]:
+                self.socketio.emit('post_updated', {"topic_id": topic_id, "posts": grouped[UPDATED]}, to=room)
+                self.emits += 1
+            if grouped[DELETED]:
+                self.socketio.emit('post_deleted', {"topic_id": topic_id, "post_ids": grouped[DELETED]}, to=room)
+                self.emits += 1
+        except Exception as e:
+            print(f"Error broadcasting updates for topic {topic_id}: {e}")
+
+    def stats(self):
+        return {"events": self.events, "emits": self.emits, "pending_topics": len(self._pending)}
+
+
+topic_broadcaster = TopicBroadcaster(Config.LIVE_TOPIC_COALESCE_SECONDS, Config.LIVE_TOPIC_MAX_POSTS)
@@ -1,20 +1,50 @@
 import datetime
 from bson.objectid import ObjectId
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import password_hasher
 from flask_login import UserMixin
-from database import get_db
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from database import get_db, read_db
+import counters
+import inbox
+from pagination import keyset_page
+from user_cache import user_cache
+from purge import enqueue_topic_purge
+import page_cache
+from excerpts import make_excerpt
+from hydration import as_utc, collection, map_rows, utcnow
+from search_cache import search_cache
+from search_engine import search_backend
+from title_index import title_index
+from live_topics import topic_broadcaster
+
+# Filter for topics that have not been soft-deleted (deleted_at missing or null)
+LIVE_TOPICS = {"deleted_at": None}
+
+# Field yang dirender oleh template daftar topik (index, hasil pencarian, profil); tanpa `content`
+TOPIC_LIST_PROJECTION = {
+    "title": 1, "excerpt": 1, "author_id": 1, "author_username": 1, "created_at": 1,
+    "updated_at": 1, "reply_count": 1, "last_post_at": 1, "last_post_author": 1
+}
 
 class User(UserMixin):
     """
     Model for users who will log in.
     Implements UserMixin for integration with Flask-Login.
     """
-    def __init__(self, username, email, password_hash, role='user', _id=None):
+    def __init__(self, username, email, password_hash, role='user', _id=None,
+                 topic_count=0, post_count=0, last_active_at=None, unread_messages=0):
         self.username = username
         self.email = email
         self.password_hash = password_hash
         self.role = role  # Default role is 'user', can be 'admin'
         self._id = _id if _id else ObjectId()
+        # Denormalized activity counters, maintained by Topic/Post save and delete (see counters.py)
+        self.topic_count = topic_count
+        self.post_count = post_count
+        self.last_active_at = last_active_at
+        # Total private messages not read yet, maintained by inbox.py
+        self.unread_messages = unread_messages
 
     def get_id(self):
         """Returns the user's unique ID as a string, required by Flask-Login."""
@@ -24,102 +54,199 @@ class User(UserMixin):
         """Checks if the user has the 'admin' role."""
         return self.role == 'admin'
 
+    @staticmethod
+    def from_document(user_data):
+        """Builds a User from a raw users document."""
+        return User(
+            username=user_data["username"],
+            email=user_data["email"],
+            password_hash=user_data["password_hash"],
+            role=user_data.get("role", 'user'),  # Get role, default 'user'
+            _id=user_data["_id"],
+            topic_count=user_data.get("topic_count", 0),
+            post_count=user_data.get("post_count", 0),
+            last_active_at=user_data.get("last_active_at"),
+            unread_messages=max(user_data.get("unread_messages", 0), 0)
+        )
+
+    @staticmethod
+    def _find_one(field, value):
+        """Looks a user up by a unique field, going through the user cache first."""
+        user_data = user_cache.get(field, value)
+        if user_data is None:
+            # Invalidasi antara find_one dan put berarti dokumen ini mungkin sudah basi
+            generation = user_cache.generation()
+            user_data = get_db().users.find_one({field: value})
+            if user_data:
+                user_cache.put(user_data, generation)
+        return User.from_document(user_data) if user_data else None
+
     @staticmethod
     def find_by_username(username):
         """Finds a user by username."""
-        user_data = get_db().users.find_one({"username": username})
-        if user_data:
-            return User(
-                username=user_data["username"],
-                email=user_data["email"],
-                password_hash=user_data["password_hash"],
-                role=user_data.get("role", 'user'),  # Get role, default 'user'
-                _id=user_data["_id"]
-            )
-        return None
+        return User._find_one("username", username)
 
     @staticmethod
     def find_by_email(email):
         """Finds a user by email."""
-        user_data = get_db().users.find_one({"email": email})
-        if user_data:
-            return User(
-                username=user_data["username"],
-                email=user_data["email"],
-                password_hash=user_data["password_hash"],
-                role=user_data.get("role", 'user'),
-                _id=user_data["_id"]
-            )
-        return None
+        return User._find_one("email", email)
 
     @staticmethod
     def find_by_id(user_id):
         """Finds a user by ObjectId."""
         try:
             # Ensure user_id can be converted to ObjectId
-            user_data = get_db().users.find_one({"_id": ObjectId(user_id)})
-            if user_data:
-                return User(
-                    username=user_data["username"],
-                    email=user_data["email"],
-                    password_hash=user_data["password_hash"],
-                    role=user_data.get("role", 'user'),  # Get role, default 'user'
-                    _id=user_data["_id"]
-                )
+            return User._find_one("_id", ObjectId(user_id))
         except Exception as e:
             print(f"Error finding user by ID {user_id}: {e}")
             return None
-        return None
+
+    @staticmethod
+    def taken_fields(username, email):
+        """
+        Returns which of "username" / "email" already belong to a user, with one $or query
+        on the two unique indexes (the user cache is not consulted: it only holds users
+        that were looked up before).
+        """
+        taken = set()
+        for doc in get_db().users.find({"$or": [{"username": username}, {"email": email}]},
+                                       {"username": 1, "email": 1}).limit(2):
+            if doc.get("username") == username:
+                taken.add("username")
+            if doc.get("email") == email:
+                taken.add("email")
+        return taken
 
     def save(self):
         """Saves a new user to the database. password_hash is assumed to be hashed."""
         get_db().users.insert_one({
+            "_id": self._id,
             "username": self.username,
             "email": self.email,
             "password_hash": self.password_hash,
             "role": self.role,
-            "created_at": datetime.datetime.utcnow() # Add user creation timestamp
+            "created_at": datetime.datetime.utcnow(), # Add user creation timestamp
+            "topic_count": self.topic_count,
+            "post_count": self.post_count,
+            "unread_messages": self.unread_messages
         })
+        # Every write to a user document must drop its cached copy
+        user_cache.invalidate(self._id)
 
     def check_password(self, password):
-        """Checks the entered password against the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        """
+        Checks the entered password against the stored hash on the hashing pool.
+        After a successful check, a hash made with an outdated method or cost is replaced
+        by one with Config.PASSWORD_HASH_METHOD. Raises passwords.HasherBusy when the pool is saturated.
+        """
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            try:
+                self.update_password_hash(password_hasher.hash(password))
+            except Exception as e:
+                # Login tetap berhasil; hash diperbarui pada login berikutnya
+                print(f"Error upgrading password hash for user {self._id}: {e}")
+        return True
+
+    def update_password_hash(self, new_hash):
+        """Replaces the stored hash, unless it was changed concurrently since this user was loaded."""
+        get_db().users.update_one(
+            {"_id": self._id, "password_hash": self.password_hash},
+            {"$set": {"password_hash": new_hash}}
+        )
+        self.password_hash = new_hash
+        user_cache.invalidate(self._id)
 
 
 class Topic:
     """Model for discussion topics."""
-    def __init__(self, title, content, author_id, author_username, created_at=None, updated_at=None, _id=None):
+    __slots__ = ("_id", "title", "content", "excerpt", "author_id", "author_username", "created_at",
+                 "updated_at", "reply_count", "last_post_at", "last_post_author", "_is_new")
+
+    def __init__(self, title, content, author_id, author_username, created_at=None, updated_at=None, _id=None,
+                 reply_count=0, last_post_at=None, last_post_author=None, excerpt=None):
         self.title = title
         self.content = content
+        # Cuplikan terbatas untuk tampilan daftar; disimpan ulang setiap save()
+        self.excerpt = excerpt if excerpt is not None else make_excerpt(content)
         self.author_id = ObjectId(author_id) # Store author_id as ObjectId
         self.author_username = author_username
-        self.created_at = created_at if created_at else datetime.datetime.utcnow()
-        self.updated_at = updated_at if updated_at else datetime.datetime.utcnow()
+        self.created_at = as_utc(created_at) if created_at else utcnow()
+        self.updated_at = as_utc(updated_at) if updated_at else utcnow()
         self._id = _id if _id else ObjectId()
+        # New objects are inserted on save(); objects loaded from the DB (with an _id) are updated
+        self._is_new = _id is None
+        # Denormalized reply statistics, maintained by Post.save/Post.delete
+        self.reply_count = reply_count
+        self.last_post_at = last_post_at
+        self.last_post_author = last_post_author
+
+    @staticmethod
+    def from_document(t):
+        """
+        Row mapper for the topics collection (see hydration.py): fills the slots straight
+        from the document. Documents loaded with TOPIC_LIST_PROJECTION have no content;
+        such topics are for display only.
+        """
+        topic = Topic.__new__(Topic)
+        topic._id = t["_id"]
+        topic.title = t["title"]
+        topic.content = t.get("content")
+        excerpt = t.get("excerpt")
+        topic.excerpt = excerpt if excerpt is not None else make_excerpt(topic.content)
+        topic.author_id = t["author_id"]
+        topic.author_username = t["author_username"]
+        topic.created_at = t["created_at"]
+        topic.updated_at = t.get("updated_at") or topic.created_at
+        topic.reply_count = t.get("reply_count", 0)
+        topic.last_post_at = t.get("last_post_at")
+        topic.last_post_author = t.get("last_post_author")
+        topic._is_new = False
+        return topic
+
+    def to_document(self):
+        """Returns the topics document for inserting this topic."""
+        return {
+            "_id": self._id,
+            "title": self.title,
+            "content": self.content,
+            "excerpt": self.excerpt,
+            "author_id": self.author_id,
+            "author_username": self.author_username,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "reply_count": self.reply_count,
+            "last_post_at": self.last_post_at,
+            "last_post_author": self.last_post_author
+        }
 
     def save(self):
         """Saves a new topic or updates an existing one."""
-        if self._id and get_db().topics.count_documents({"_id": self._id}) > 0:
+        self.excerpt = make_excerpt(self.content)
+        if not self._is_new:
             # Update existing topic
             get_db().topics.update_one(
                 {"_id": self._id},
                 {"$set": {
                     "title": self.title,
                     "content": self.content,
-                    "updated_at": datetime.datetime.utcnow()
+                    "excerpt": self.excerpt,
+                    "updated_at": utcnow()
                 }}
             )
+            counters.touch(counters.TOPICS_COUNTER)
         else:
             # Insert new topic
-            result = get_db().topics.insert_one({
-                "title": self.title,
-                "content": self.content,
-                "author_id": self.author_id,
-                "author_username": self.author_username,
-                "created_at": self.created_at,
-                "updated_at": self.updated_at
-            })
-            self._id = result.inserted_id
+            get_db().topics.insert_one(self.to_document())
+            self._is_new = False
+            counters.increment(counters.TOPICS_COUNTER, touch=True)
+            counters.record_user_activity(self.author_id, topics=1, active_at=self.created_at)
+        search_backend.index_topic(self)
+        search_cache.invalidate_topic(self._id, self.title, self.content)
+        title_index.add(self._id, self.title)
+        page_cache.page_cache.invalidate(page_cache.TOPICS_TAG, page_cache.topic_tag(self._id),
+                                         page_cache.user_tag(self.author_username))
         return self._id
 
     def update(self):
@@ -127,46 +254,53 @@ class Topic:
         self.save()
 
     def delete(self):
-        """Deletes a topic and all associated posts."""
-        get_db().topics.delete_one({"_id": self._id})
-        # Important: Ensure topic_id in the posts collection is also stored as ObjectId
-        get_db().posts.delete_many({"topic_id": self._id})
+        """
+        Soft-deletes a topic. It disappears from listings and searches immediately;
+        its posts and the topic document are purged in the background (see purge.py).
+        """
+        result = get_db().topics.update_one(
+            {"_id": self._id, "deleted_at": None},
+            {"$set": {"deleted_at": datetime.datetime.utcnow()}}
+        )
+        if result.modified_count:
+            counters.increment(counters.TOPICS_COUNTER, -1, touch=True)
+            counters.record_user_activity(self.author_id, topics=-1)
+            search_backend.remove_topic(self._id)
+            search_cache.invalidate_topic(self._id)
+            title_index.remove(self._id)
+            page_cache.page_cache.invalidate(page_cache.TOPICS_TAG, page_cache.topic_tag(self._id),
+                                             page_cache.user_tag(self.author_username))
+            enqueue_topic_purge(self._id)
 
     @staticmethod
-    def get_paginated_topics(page, per_page):
-        """Retrieves topics with pagination."""
-        skip = (page - 1) * per_page
-        topics_data = list(get_db().topics.find().sort("created_at", -1).skip(skip).limit(per_page))
-        total_topics = get_db().topics.count_documents({})
-        
-        # Convert raw data from DB to Topic objects
-        topics = [Topic(
-            title=t["title"],
-            content=t["content"],
-            author_id=t["author_id"],
-            author_username=t["author_username"],
-            created_at=t["created_at"],
-            updated_at=t.get("updated_at", t["created_at"]), # Get updated_at if available
-            _id=t["_id"]
-        ) for t in topics_data]
-        
-        return topics, total_topics
+    def get_topics_page(per_page, after=None, before=None, last=False):
+        """
+        Retrieves one page of topics (newest first) using keyset pagination.
+        Returns a pagination.Page whose items are Topic objects.
+        """
+        page = keyset_page(collection("topics", heavy=True), LIVE_TOPICS, DESCENDING, per_page,
+                           after=after, before=before, last=last, projection=TOPIC_LIST_PROJECTION)
+        page.items = map_rows(Topic.from_document, page.items)
+        return page
+
+    @staticmethod
+    def get_user_topics_page(author_id, per_page, after=None, before=None, last=False):
+        """
+        Retrieves one page of a user's topics (newest first) using keyset pagination.
+        Returns a pagination.Page whose items are Topic objects.
+        """
+        page = keyset_page(collection("topics", heavy=True), {"author_id": ObjectId(author_id), **LIVE_TOPICS}, DESCENDING,
+                           per_page, after=after, before=before, last=last, projection=TOPIC_LIST_PROJECTION)
+        page.items = map_rows(Topic.from_document, page.items)
+        return page
 
     @staticmethod
     def find_by_id(topic_id):
         """Finds a topic by ObjectId."""
         try:
-            topic_data = get_db().topics.find_one({"_id": ObjectId(topic_id)})
+            topic_data = collection("topics").find_one({"_id": ObjectId(topic_id), **LIVE_TOPICS})
             if topic_data:
-                return Topic(
-                    title=topic_data["title"],
-                    content=topic_data["content"],
-                    author_id=topic_data["author_id"],
-                    author_username=topic_data["author_username"],
-                    created_at=topic_data["created_at"],
-                    updated_at=topic_data.get("updated_at", topic_data["created_at"]),
-                    _id=topic_data["_id"]
-                )
+                return Topic.from_document(topic_data)
         except Exception as e:
             print(f"Error finding topic by ID {topic_id}: {e}")
             return None
@@ -174,153 +308,279 @@ class Topic:
     
     @staticmethod
     def search_topics(query_text, page, per_page):
-        """Searches for topics by text using Atlas Search with pagination."""
-        skip = (page - 1) * per_page
-
-        # Aggregation pipeline for Atlas Search
-        # 'topic_text_index' is the name of the Atlas Search index you created in Atlas
-        pipeline = [
-            {
-                '$search': {
-                    'index': 'topic_text_index', 
-                    'text': {
-                        'query': query_text,
-                        'path': ['title', 'content'] # Search in title and content fields
-                    }
-                }
-            },
-            {'$sort': {'created_at': -1}}, # Sort by newest date
-            {
-                '$facet': {
-                    'totalData': [{'$skip': skip}, {'$limit': per_page}],
-                    'totalCount': [{'$count': 'count'}]
-                }
-            }
-        ]
-
-        # Execute pipeline
-        result = list(get_db().topics.aggregate(pipeline))
-
-        # Extract results
-        # Handle cases where there are no results or empty documents from $facet
-        topics_data = result[0]['totalData'] if result and 'totalData' in result[0] else []
-        total_results = result[0]['totalCount'][0]['count'] if result and 'totalCount' in result[0] and result[0]['totalCount'] else 0
+        """
+        Searches for topics by text with pagination, using the configured search backend.
+        The ordered result ids are cached per normalized query (see search_cache.py).
+        """
+        topics_data, total_results = search_cache.search(query_text, page, per_page, projection=TOPIC_LIST_PROJECTION)
 
         # Convert raw data from DB to Topic objects
-        topics = [Topic(
-            title=t["title"],
-            content=t["content"],
-            author_id=t["author_id"],
-            author_username=t["author_username"],
-            created_at=t["created_at"],
-            updated_at=t.get("updated_at", t["created_at"]),
-            _id=t["_id"]
-        ) for t in topics_data]
+        topics = map_rows(Topic.from_document, topics_data)
 
         return topics, total_results
 
 
 class Post:
     """Model for posts (replies) within a topic."""
+    __slots__ = ("_id", "topic_id", "content", "author_id", "author_username", "created_at", "updated_at", "_is_new")
+
     def __init__(self, topic_id, content, author_id, author_username, created_at=None, updated_at=None, _id=None):
         self.topic_id = ObjectId(topic_id) # Store topic_id as ObjectId
         self.content = content
         self.author_id = ObjectId(author_id) # Store author_id as ObjectId
         self.author_username = author_username
-        self.created_at = created_at if created_at else datetime.datetime.utcnow()
-        self.updated_at = updated_at if updated_at else datetime.datetime.utcnow()
+        self.created_at = as_utc(created_at) if created_at else utcnow()
+        self.updated_at = as_utc(updated_at) if updated_at else utcnow()
         self._id = _id if _id else ObjectId()
+        # New objects are inserted on save(); objects loaded from the DB (with an _id) are updated
+        self._is_new = _id is None
+
+    @staticmethod
+    def from_document(p):
+        """Row mapper for the posts collection (see hydration.py): fills the slots straight from the document."""
+        post = Post.__new__(Post)
+        post._id = p["_id"]
+        post.topic_id = p["topic_id"]
+        post.content = p["content"]
+        post.author_id = p["author_id"]
+        post.author_username = p["author_username"]
+        post.created_at = p["created_at"]
+        post.updated_at = p.get("updated_at") or post.created_at
+        post._is_new = False
+        return post
+
+    def to_document(self):
+        """Returns the posts document for inserting this post."""
+        return {
+            "_id": self._id,
+            "topic_id": self.topic_id,
+            "content": self.content,
+            "author_id": self.author_id,
+            "author_username": self.author_username,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
 
     def save(self):
         """Saves a new post or updates an existing one."""
-        if self._id and get_db().posts.count_documents({"_id": self._id}) > 0:
+        if not self._is_new:
             # Update existing post
+            self.updated_at = utcnow()
             get_db().posts.update_one(
                 {"_id": self._id},
                 {"$set": {
                     "content": self.content,
-                    "updated_at": datetime.datetime.utcnow()
+                    "updated_at": self.updated_at
                 }}
             )
+            Post._touch_topics([self.topic_id])
+            topic_broadcaster.post_updated(self)
         else:
             # Insert new post
-            result = get_db().posts.insert_one({
-                "topic_id": self.topic_id,
-                "content": self.content,
-                "author_id": self.author_id,
-                "author_username": self.author_username,
-                "created_at": self.created_at,
-                "updated_at": self.updated_at
-            })
-            self._id = result.inserted_id
+            get_db().posts.insert_one(self.to_document())
+            self._is_new = False
+            Post._apply_reply_stats([self])
+            counters.record_user_activity(self.author_id, posts=1, active_at=self.created_at)
+            topic_broadcaster.post_created(self)
+        counters.touch(counters.POSTS_COUNTER)
+        search_backend.index_post(self)
+        search_cache.invalidate_post(self)
+        page_cache.page_cache.invalidate(page_cache.TOPICS_TAG, page_cache.topic_tag(self.topic_id),
+                                         page_cache.user_tag(self.author_username))
         return self._id
 
+    @staticmethod
+    def save_many(posts):
+        """
+        Saves many posts with one unordered bulk_write (inserts for new posts, updates
+        for existing ones), then updates the reply statistics of the affected topics.
+        Returns the number of posts written; raises BulkWriteError after applying the
+        statistics of the posts that did succeed.
+        """
+        if not posts:
+            return 0
+        db = get_db()
+        now = utcnow()
+        ops = [
+            InsertOne(post.to_document()) if post._is_new else
+            UpdateOne({"_id": post._id}, {"$set": {"content": post.content, "updated_at": now}})
+            for post in posts
+        ]
+        failed, error = set(), None
+        try:
+            db.posts.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            error = e
+        inserted = [post for i, post in enumerate(posts) if post._is_new and i not in failed]
+        edited = [post for i, post in enumerate(posts) if not post._is_new and i not in failed]
+        for post in inserted:
+            post._is_new = False
+            topic_broadcaster.post_created(post)
+        for post in edited:
+            post.updated_at = now
+            topic_broadcaster.post_updated(post)
+        Post._apply_reply_stats(inserted)
+        Post._apply_user_activity(inserted)
+        Post._touch_topics({post.topic_id for post in edited})
+        counters.touch(counters.POSTS_COUNTER)
+        page_cache.page_cache.invalidate(page_cache.TOPICS_TAG,
+                                         *{page_cache.topic_tag(post.topic_id) for post in posts},
+                                         *{page_cache.user_tag(post.author_username) for post in posts})
+        for i, post in enumerate(posts):
+            if i not in failed:
+                search_backend.index_post(post)
+                search_cache.invalidate_post(post)
+        if error:
+            raise error
+        return len(posts) - len(failed)
+
+    @staticmethod
+    def _apply_reply_stats(new_posts):
+        """Adds newly inserted posts to their topics' reply_count / last_post_* fields in one bulk_write."""
+        stats = {}
+        for post in new_posts:
+            count, latest = stats.get(post.topic_id, (0, post))
+            if post.created_at >= latest.created_at:
+                latest = post
+            stats[post.topic_id] = (count + 1, latest)
+        ops = []
+        for topic_id, (count, latest) in stats.items():
+            ops.append(UpdateOne({"_id": topic_id}, {"$inc": {"reply_count": count}}))
+            # Only move last_post_* forward, so importing old posts never hides newer activity
+            ops.append(UpdateOne(
+                {"_id": topic_id, "$or": [{"last_post_at": None}, {"last_post_at": {"$lte": latest.created_at}}]},
+                {"$set": {"last_post_at": latest.created_at, "last_post_author": latest.author_username}}
+            ))
+        if ops:
+            get_db().topics.bulk_write(ops, ordered=False)
+
+    @staticmethod
+    def _apply_user_activity(new_posts):
+        """Adds newly inserted posts to their authors' post_count / last_active_at in one bulk_write."""
+        activity = {}
+        for post in new_posts:
+            _, count, latest = activity.get(post.author_id, (0, 0, post.created_at))
+            activity[post.author_id] = (0, count + 1, max(latest, post.created_at))
+        counters.record_users_activity(activity)
+
+    @staticmethod
+    def _touch_topics(topic_ids):
+        """Marks topics whose existing posts were edited, so their page validators change."""
+        if topic_ids:
+            get_db().topics.update_many(
+                {"_id": {"$in": list(topic_ids)}},
+                {"$set": {"posts_updated_at": datetime.datetime.utcnow()}}
+            )
+
     def update(self):
         """Updates an existing post (alias method for save with update)."""
         self.save()
 
     def delete(self):
-        """Deletes a post."""
-        get_db().posts.delete_one({"_id": self._id})
+        """Deletes a post and updates the topic's reply statistics."""
+        db = get_db()
+        result = db.posts.delete_one({"_id": self._id})
+        if not result.deleted_count:
+            return
+        counters.record_user_activity(self.author_id, posts=-1)
+        topic_broadcaster.post_deleted(self)
+        search_backend.remove_post(self._id)
+        search_cache.invalidate_post(self)
+        page_cache.page_cache.invalidate(page_cache.TOPICS_TAG, page_cache.topic_tag(self.topic_id),
+                                         page_cache.user_tag(self.author_username))
+        # The deleted post may have been the latest one; look up its successor through the index
+        latest = db.posts.find_one(
+            {"topic_id": self.topic_id},
+            {"created_at": 1, "author_username": 1},
+            sort=[("created_at", DESCENDING), ("_id", DESCENDING)]
+        )
+        db.topics.update_one(
+            {"_id": self.topic_id},
+            {"$inc": {"reply_count": -1},
+             "$set": {"last_post_at": latest["created_at"] if latest else None,
+                      "last_post_author": latest["author_username"] if latest else None,
+                      "posts_updated_at": datetime.datetime.utcnow()}}
+        )
+        counters.touch(counters.POSTS_COUNTER)
 
     @staticmethod
     def find_by_id(post_id):
         """Finds a post by ObjectId."""
         try:
-            post_data = get_db().posts.find_one({"_id": ObjectId(post_id)})
+            post_data = collection("posts").find_one({"_id": ObjectId(post_id)})
             if post_data:
-                return Post(
-                    topic_id=post_data["topic_id"],
-                    content=post_data["content"],
-                    author_id=post_data["author_id"],
-                    author_username=post_data["author_username"],
-                    created_at=post_data["created_at"],
-                    updated_at=post_data.get("updated_at", post_data["created_at"]),
-                    _id=post_data["_id"]
-                )
+                return Post.from_document(post_data)
         except Exception as e:
             print(f"Error finding post by ID {post_id}: {e}")
             return None
         return None
 
     @staticmethod
-    def get_posts_for_topic(topic_id, page, per_page):
-        """Retrieves posts by topic with pagination."""
-        skip = (page - 1) * per_page
-        # Ensure query uses ObjectId for topic_id
-        posts_data = list(get_db().posts.find({"topic_id": ObjectId(topic_id)}).sort("created_at", 1).skip(skip).limit(per_page))
-        total_posts = get_db().posts.count_documents({"topic_id": ObjectId(topic_id)})
-        
-        # Convert raw data from DB to Post objects
-        posts = [Post(
-            topic_id=p["topic_id"],
-            content=p["content"],
-            author_id=p["author_id"],
-            author_username=p["author_username"],
-            created_at=p["created_at"],
-            updated_at=p.get("updated_at", p["created_at"]),
-            _id=p["_id"]
-        ) for p in posts_data]
-
-        return posts, total_posts
+    def get_posts_page(topic_id, per_page, after=None, before=None, last=False):
+        """
+        Retrieves one page of posts for a topic (oldest first) using keyset pagination.
+        Returns a pagination.Page whose items are Post objects.
+        """
+        page = keyset_page(collection("posts", heavy=True), {"topic_id": ObjectId(topic_id)}, ASCENDING, per_page,
+                           after=after, before=before, last=last)
+        page.items = map_rows(Post.from_document, page.items)
+        return page
+
+    @staticmethod
+    def get_user_posts_page(author_id, per_page, after=None, before=None, last=False):
+        """
+        Retrieves one page of a user's posts (newest first) using keyset pagination.
+        Returns a pagination.Page whose items are Post objects; page.topic_titles maps
+        topic_id -> title, fetched with one query. Posts of deleted topics (not purged
+        yet) are left out of the page.
+        """
+        page = keyset_page(collection("posts", heavy=True), {"author_id": ObjectId(author_id)}, DESCENDING, per_page,
+                           after=after, before=before, last=last)
+        posts = map_rows(Post.from_document, page.items)
+        topic_ids = list({post.topic_id for post in posts})
+        page.topic_titles = {
+            t["_id"]: t["title"]
+            for t in read_db().topics.find({"_id": {"$in": topic_ids}, **LIVE_TOPICS}, {"title": 1})
+        } if topic_ids else {}
+        page.items = [post for post in posts if post.topic_id in page.topic_titles]
+        return page
 
 
 class Message:
     """Model for private messages."""
+    __slots__ = ("_id", "sender_id", "receiver_id", "content", "conversation_id", "created_at", "read", "_is_new")
+
     def __init__(self, sender_id, receiver_id, content, conversation_id, created_at=None, read=False, _id=None):
         # Pastikan sender_id dan receiver_id selalu menjadi ObjectId
         self.sender_id = ObjectId(sender_id) 
         self.receiver_id = ObjectId(receiver_id) 
         self.content = content
         self.conversation_id = conversation_id 
-        self.created_at = created_at if created_at is not None else datetime.datetime.utcnow()
+        self.created_at = as_utc(created_at) if created_at is not None else utcnow()
         self.read = read
         self._id = _id if _id else ObjectId()
+        # New objects are inserted on save(); objects loaded from the DB (with an _id) are updated
+        self._is_new = _id is None
 
-    def save(self):
-        """Saves a new message to the database."""
-        db = get_db()
-        message_data = {
+    @staticmethod
+    def from_document(m):
+        """Row mapper for the messages collection (see hydration.py): fills the slots straight from the document."""
+        message = Message.__new__(Message)
+        message._id = m["_id"]
+        message.sender_id = m["sender_id"]
+        message.receiver_id = m["receiver_id"]
+        message.content = m["content"]
+        message.conversation_id = m["conversation_id"]
+        message.created_at = m["created_at"]
+        message.read = m.get("read", False)
+        message._is_new = False
+        return message
+
+    def to_document(self):
+        """Returns the messages document for this message."""
+        return {
+            "_id": self._id,
             "sender_id": self.sender_id,
             "receiver_id": self.receiver_id,
             "content": self.content,
@@ -328,18 +588,27 @@ class Message:
             "created_at": self.created_at,
             "read": self.read
         }
+
+    def save(self):
+        """Saves a new message to the database."""
+        db = get_db()
+        message_data = self.to_document()
         try:
             # For messages, we typically only insert, not update existing ones by _id
-            # The count_documents check for _id is less relevant here for new messages
-            # but harmless for existing ones (which wouldn't be 'new' in this context).
-            if self._id and db.messages.count_documents({"_id": self._id}) > 0:
+            if not self._is_new:
                 print(f"Attempting to update existing message with _id: {self._id}. This is unusual for messages.")
+                del message_data["_id"]
                 db.messages.update_one({"_id": self._id}, {"$set": message_data})
                 print(f"Message updated: {self._id}")
             else:
-                result = db.messages.insert_one(message_data)
-                self._id = result.inserted_id
+                db.messages.insert_one(message_data)
+                self._is_new = False
                 print(f"New message inserted with _id: {self._id}") # Debug print
+                try:
+                    inbox.record_message(self)
+                except Exception as e:
+                    # The message itself is stored; `flask db backfill-inbox` repairs the inbox
+                    print(f"Error updating inbox for message {self._id}: {e}")
             return self
         except Exception as e:
             print(f"Error saving message: {e}") # Debug print
@@ -347,132 +616,70 @@ class Message:
             return None # Indicate failure
 
     @staticmethod
-    def get_messages_between_users(user1_id, user2_id):
-        """Retrieves messages between two specific users."""
-        db = get_db()
-        # Create a consistent conversation_id by sorting and joining user IDs
+    def save_many(messages):
+        """
+        Inserts many new messages with one unordered bulk_write and updates the
+        participants' inbox entries in one more bulk_write.
+        Returns the number of messages inserted; raises BulkWriteError after updating
+        the inbox for the messages that did succeed.
+        """
+        new_messages = [m for m in messages if m._is_new]
+        if not new_messages:
+            return 0
+        failed, error = set(), None
+        try:
+            get_db().messages.bulk_write([InsertOne(m.to_document()) for m in new_messages], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            error = e
+        inserted = [m for i, m in enumerate(new_messages) if i not in failed]
+        for message in inserted:
+            message._is_new = False
+        inbox.record_messages(inserted)
+        if error:
+            raise error
+        return len(inserted)
+
+    @staticmethod
+    def conversation_id_for(user1_id, user2_id):
+        """Returns the consistent conversation_id for two users (sorted, joined user IDs)."""
         u_ids = sorted([str(user1_id), str(user2_id)])
-        conv_id = f"{u_ids[0]}-{u_ids[1]}"
-
-        messages_data = list(db.messages.find({
-            "conversation_id": conv_id
-        }).sort("created_at", 1)) # Sort by timestamp ascending
-
-        messages = []
-        for msg_data in messages_data:
-            # Ensure sender_id and receiver_id are handled as ObjectId before passing to Message constructor
-            sender_obj = ObjectId(msg_data["sender_id"]) if not isinstance(msg_data["sender_id"], ObjectId) else msg_data["sender_id"]
-            receiver_obj = ObjectId(msg_data["receiver_id"]) if not isinstance(msg_data["receiver_id"], ObjectId) else msg_data["receiver_id"]
-
-            messages.append(Message(
-                sender_id=sender_obj,
-                receiver_id=receiver_obj,
-                content=msg_data["content"],
-                conversation_id=msg_data["conversation_id"],
-                created_at=msg_data["created_at"],
-                read=msg_data.get("read", False),
-                _id=msg_data["_id"]
-            ))
-        return messages
+        return f"{u_ids[0]}-{u_ids[1]}"
+
+    @staticmethod
+    def get_messages_page(user1_id, user2_id, per_page, before=None):
+        """
+        Retrieves the newest messages between two users, or the page preceding the
+        `before` cursor, using keyset pagination on (created_at, _id).
+        Returns a pagination.Page whose items are Message objects in ascending order;
+        page.prev_cursor points to older messages.
+        """
+        conv_id = Message.conversation_id_for(user1_id, user2_id)
+        page = keyset_page(collection("messages"), {"conversation_id": conv_id}, ASCENDING, per_page,
+                           before=before, last=before is None)
+        page.items = map_rows(Message.from_document, page.items)
+        return page
 
     @staticmethod
     def get_conversations(user_id):
         """Retrieves a list of conversations for a given user, with the last message and unread count."""
-        db = get_db()
-        
-        # Aggregate pipeline to get a list of unique interlocutors and their last message
-        pipeline = [
-            # Stage 1: Find all messages involving the current user (sender or receiver)
-            {"$match": {"$or": [{"sender_id": ObjectId(user_id)}, {"receiver_id": ObjectId(user_id)}]}},
-            
-            # Stage 2: Sort by created_at descending to easily get the last message per conversation
-            {"$sort": {"created_at": -1}}, 
-            
-            # Stage 3: Group messages by their conversation_id to find the last message
-            {"$group": {
-                "_id": "$conversation_id", # Group by the generated conversation ID
-                "last_message_id": {"$first": "$_id"},
-                "last_message_content": {"$first": "$content"},
-                "last_message_sender_id": {"$first": "$sender_id"},
-                "last_message_receiver_id": {"$first": "$receiver_id"},
-                "last_message_timestamp": {"$first": "$created_at"}
-            }},
-            
-            # Stage 4: Lookup the actual message document for its content and read status
-            {"$lookup": {
-                "from": "messages",
-                "localField": "last_message_id",
-                "foreignField": "_id",
-                "as": "last_message_info"
-            }},
-            {"$unwind": "$last_message_info"}, # Deconstruct the array
-            
-            # Stage 5: Determine the 'other_user_id' in each conversation
-            {"$addFields": {
-                "other_user_id": {
-                    "$cond": {
-                        "if": {"$eq": ["$last_message_sender_id", ObjectId(user_id)]},
-                        "then": "$last_message_receiver_id",
-                        "else": "$last_message_sender_id"
-                    }
-                }
-            }},
-            
-            # Stage 6: Lookup the other user's information (username)
-            {"$lookup": {
-                "from": "users",
-                "localField": "other_user_id",
-                "foreignField": "_id",
-                "as": "other_user_info"
-            }},
-            {"$unwind": "$other_user_info"},
-            
-            # Stage 7: Calculate unread count for the current user in this conversation
-            {"$lookup": {
-                "from": "messages",
-                "let": {"convId": "$_id"},
-                "pipeline": [
-                    {"$match": {
-                        "$expr": {
-                            "$and": [
-                                {"$eq": ["$conversation_id", "$$convId"]},
-                                {"$eq": ["$receiver_id", ObjectId(user_id)]},
-                                {"$eq": ["$read", False]}
-                            ]
-                        }
-                    }},
-                    {"$count": "unread_count"}
-                ],
-                "as": "unread_messages_count"
-            }},
-            {"$addFields": {
-                "unread_count": {"$ifNull": [{"$arrayElemAt": ["$unread_messages_count.unread_count", 0]}, 0]}
-            }},
-
-            # Stage 8: Project the final desired fields
-            {"$project": {
-                "_id": 0, # Exclude the _id from the group stage
-                "conversation_id": "$_id", # Rename group _id to conversation_id
-                "other_user_id": "$other_user_info._id",
-                "other_username": "$other_user_info.username",
-                "last_message_content": "$last_message_info.content",
-                "last_message_timestamp": "$last_message_info.created_at",
-                "unread_count": 1
-            }},
-            
-            # Stage 9: Sort the conversations by the timestamp of their last message
-            {"$sort": {"last_message_timestamp": -1}}
-        ]
-        
-        conversations = list(db.messages.aggregate(pipeline))
-        return conversations
-
+        # Served from the materialized inbox collection (see inbox.py)
+        return inbox.get_inbox(ObjectId(user_id))
 
     @staticmethod
     def mark_messages_as_read(sender_id, receiver_id):
-        """Marks messages sent from sender_id to receiver_id as read."""
-        db = get_db()
-        db.messages.update_many(
-            {"sender_id": sender_id, "receiver_id": receiver_id, "read": False},
+        """
+        Marks messages sent from sender_id to receiver_id as read, but only when the
+        receiver's inbox counter says some are unread. Returns the receiver's new total
+        unread count, or None when there was nothing to mark.
+        """
+        receiver_id = ObjectId(receiver_id)
+        conversation_id = Message.conversation_id_for(sender_id, receiver_id)
+        if not inbox.has_unread(receiver_id, conversation_id):
+            return None
+        # Counter dikurangi sebanyak pesan yang benar-benar diubah, bukan di-nol-kan lebih dulu
+        marked = get_db().messages.update_many(
+            {"sender_id": ObjectId(sender_id), "receiver_id": receiver_id, "read": False},
             {"$set": {"read": True}}
-        )
+        ).modified_count
+        return inbox.mark_read(receiver_id, conversation_id, marked)
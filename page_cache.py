@@ -0,0 +1,279 @@
+# page_cache.py
+"""
+Cache HTML hasil render untuk GET anonim di halaman forum (index, topic_detail, user_profile).
+
+Kunci cache terdiri dari endpoint, argumen URL dan query string. Hanya respons 200
+text/html untuk pengunjung yang belum login dan tanpa flash message tertunda yang
+disimpan, sehingga konten per-user (form balasan, tombol edit, navbar) tidak pernah
+bocor ke pengunjung lain.
+
+Setiap entri diberi tag (misalnya "topics", "topic:<id>", "user:<username>") dan
+di-invalidate oleh Topic/Post save & delete (lihat models.py). Saat entri populer
+kedaluwarsa, hanya satu thread per proses yang me-render ulang; request lain
+menerima versi lama selama render berlangsung (atau menunggu jika belum ada). Render
+yang berjalan saat salah satu tag-nya di-invalidate tidak disimpan.
+
+Cache ini per proses. Invalidasi langsung berlaku di proses yang menulis, lalu dicatat
+di koleksi `page_cache_invalidations`; proses lain (worker gunicorn, host lain) membacanya
+paling lambat setiap Config.PAGE_CACHE_SYNC_SECONDS, saat cache dipakai. Batasnya: selama
+jeda itu worker lain masih dapat menyajikan halaman lama; jika pencatatan ke MongoDB
+gagal atau sinkronisasi dimatikan (0), sampai TTL halaman (Config.PAGE_CACHE_TTL_*).
+"""
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request, session
+from flask_login import current_user
+from pymongo.errors import PyMongoError
+from config import Config
+from database import get_db, primary_reads
+
+TOPICS_TAG = "topics"
+
+
+def topic_tag(topic_id):
+    return f"topic:{topic_id}"
+
+
+def user_tag(username):
+    return f"user:{username}"
+
+
+class PageCache:
+    """Bounded (entries and bytes), thread-safe LRU of rendered pages with tags and per-entry TTLs."""
+    BUILD_WAIT_SECONDS = 5 # Batas menunggu render milik thread lain sebelum render sendiri
+    SYNC_MARGIN = datetime.timedelta(seconds=5) # Toleransi perbedaan jam antar proses
+
+    def __init__(self, maxsize, max_bytes, sync_seconds=0, max_ttl=0):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sync_seconds = sync_seconds # 0 = invalidasi hanya di proses ini
+        self.max_ttl = max_ttl # TTL halaman terpanjang; invalidasi yang lebih tua tidak berguna lagi
+        self._entries = OrderedDict()  # key -> (expires_at, body bytes, tags)
+        self._tags = {}  # tag -> set of keys
+        self._building = {}  # key -> (threading.Event set when the render finishes, _clock at start)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._clock = 0  # Dinaikkan setiap invalidasi
+        # tag -> _clock saat invalidasi terakhirnya; hanya disimpan selama ada render yang berjalan
+        self._invalidated = {}
+        self._cleared_at = 0  # _clock saat clear() terakhir
+        self._sync_lock = threading.Lock()
+        self._synced_at = datetime.datetime.utcnow() # Invalidasi dari proses lain sudah dibaca sampai sini
+        self._last_sync = time.monotonic()
+        self._seen = set() # Id invalidasi di dalam SYNC_MARGIN yang sudah diterapkan
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    def get_or_build(self, key, ttl, tags, build):
+        """
+        Returns the cached body for key, or calls build() -> Response and caches its body
+        when the response is a 200 text/html page. Returns bytes or a Response.
+        """
+        if self.sync_seconds and time.monotonic() - self._last_sync > self.sync_seconds:
+            self.sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            building = self._building.get(key)
+            if building is None:
+                event = threading.Event()
+                started = self._clock
+                self._building[key] = (event, started)
+                self.misses += 1
+            elif entry is not None:
+                # Thread lain sedang me-render ulang; sajikan versi lama
+                self.stale_hits += 1
+                return entry[1]
+            else:
+                event, started = building[0], None
+
+        if started is None:
+            event.wait(self.BUILD_WAIT_SECONDS)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry[1]
+            return build()
+
+        try:
+            # Halaman ini akan disajikan ke semua pengunjung selama TTL, jadi dibaca dari primary
+            with primary_reads():
+                response = build()
+            if response.status_code == 200 and response.mimetype == "text/html":
+                self._store(key, started, time.monotonic() + ttl, response.get_data(), tags)
+            return response
+        finally:
+            with self._lock:
+                self._building.pop(key)[0].set()
+                # Invalidasi yang lebih tua dari render tertua yang masih berjalan tidak diperlukan lagi
+                oldest = min((s for _, s in self._building.values()), default=self._clock)
+                self._invalidated = {tag: at for tag, at in self._invalidated.items() if at > oldest}
+
+    def _store(self, key, started, expires_at, body, tags):
+        with self._lock:
+            if self._cleared_at > started or any(self._invalidated.get(tag, 0) > started for tag in tags):
+                return # Ada penulisan pada halaman ini selama render; hasilnya mungkin sudah basi
+            self._remove(key)
+            self._entries[key] = (expires_at, body, tags)
+            self._bytes += len(body)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        """Removes an entry and its tag references. Caller must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[1])
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        """Drops every page carrying any of the given tags, in every process."""
+        self._invalidate_local(tags)
+        self._publish(list(tags))
+
+    def _invalidate_local(self, tags):
+        with self._lock:
+            self._clock += 1
+            for tag in tags:
+                if self._building:
+                    self._invalidated[tag] = self._clock
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops every cached page, in every process."""
+        self._clear_local()
+        self._publish(None)
+
+    def _clear_local(self):
+        with self._lock:
+            self._clock += 1
+            self._cleared_at = self._clock
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    # --- invalidasi antar proses ---
+
+    @staticmethod
+    def _origin():
+        # Dihitung setiap kali, sehingga tetap benar di proses anak setelah fork
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _publish(self, tags):
+        """Records an invalidation for other processes; tags None means "clear everything"."""
+        if not self.sync_seconds:
+            return
+        now = datetime.datetime.utcnow()
+        try:
+            get_db().page_cache_invalidations.insert_one({
+                "tags": tags,
+                "origin": self._origin(),
+                "at": now,
+                "expires_at": now + datetime.timedelta(seconds=self.max_ttl)
+            })
+        except PyMongoError as e:
+            # Worker lain menyajikan halaman lama sampai TTL-nya habis
+            print(f"Could not publish page cache invalidation: {e}")
+
+    def sync(self):
+        """Applies invalidations published by other processes since the last sync."""
+        if not self._sync_lock.acquire(blocking=False):
+            return # Thread lain sedang menyusul
+        try:
+            self._last_sync = time.monotonic()
+            started = datetime.datetime.utcnow()
+            since = self._synced_at - self.SYNC_MARGIN
+            origin = self._origin()
+            seen = set()
+            for doc in get_db().page_cache_invalidations.find({"at": {"$gte": since}}, {"tags": 1, "origin": 1}):
+                seen.add(doc["_id"])
+                if doc["_id"] in self._seen or doc.get("origin") == origin:
+                    continue
+                self.remote_invalidations += 1
+                if doc.get("tags") is None:
+                    self._clear_local()
+                else:
+                    self._invalidate_local(doc["tags"])
+            self._seen = seen
+            self._synced_at = started
+        except PyMongoError as e:
+            print(f"Could not sync page cache invalidations: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size, for sizing the cache."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None
+        }
+
+
+page_cache = PageCache(
+    Config.PAGE_CACHE_SIZE,
+    Config.PAGE_CACHE_MAX_BYTES,
+    sync_seconds=Config.PAGE_CACHE_SYNC_SECONDS,
+    max_ttl=max(Config.PAGE_CACHE_TTL_INDEX, Config.PAGE_CACHE_TTL_TOPIC, Config.PAGE_CACHE_TTL_PROFILE)
+)
+
+
+def cached_page(ttl, tags):
+    """
+    Decorator that caches a view's rendered HTML for anonymous GET requests.
+    tags(**view_args) returns the invalidation tags of the page.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if (request.method != 'GET' or current_user.is_authenticated
+                    or session.get('_flashes') or not ttl):
+                return f(*args, **kwargs)
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))))
+
+            def build():
+                response = f(*args, **kwargs)
+                if isinstance(response, str):
+                    response = Response(response, mimetype="text/html")
+                return response
+
+            result = page_cache.get_or_build(key, ttl, tags(**kwargs), build)
+            if isinstance(result, bytes):
+                return Response(result, mimetype="text/html")
+            return result
+        return decorated_function
+    return decorator
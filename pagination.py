@@ -0,0 +1,111 @@
+# pagination.py
+"""
+Keyset (cursor) pagination berdasarkan pasangan (created_at, _id).
+
+Berbeda dengan skip/limit, biaya setiap halaman tetap konstan karena query
+langsung melompat ke posisi cursor melalui index (created_at, _id).
+Token cursor bersifat opaque bagi klien: base64 dari "<epoch_ms>:<object_id>".
+"""
+import base64
+import binascii
+import datetime
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class Page:
+    """One page of keyset-paginated documents plus cursors to its neighbours."""
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(created_at, _id):
+    """Encodes a (created_at, _id) position into an opaque URL-safe token."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    # BSON datetime hanya memiliki presisi milidetik, jadi ms sudah cukup untuk posisi yang tepat
+    millis = (created_at - _EPOCH) // datetime.timedelta(milliseconds=1)
+    raw = f"{millis}:{_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decodes a token from encode_cursor. Returns (created_at, ObjectId) or None if invalid."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        millis, oid = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        return _EPOCH + datetime.timedelta(milliseconds=int(millis)), ObjectId(oid)
+    except (ValueError, InvalidId, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _cursor_of(doc):
+    return encode_cursor(doc["created_at"], doc["_id"])
+
+
+def _seek_filter(position, direction):
+    """
+    Builds the filter for documents strictly after `position` in the given sort direction.
+    The range on created_at is kept at the top level so the planner can bound the index scan.
+    """
+    created_at, _id = position
+    if direction == ASCENDING:
+        return {"created_at": {"$gte": created_at},
+                "$or": [{"created_at": {"$gt": created_at}}, {"_id": {"$gt": _id}}]}
+    return {"created_at": {"$lte": created_at},
+            "$or": [{"created_at": {"$lt": created_at}}, {"_id": {"$lt": _id}}]}
+
+
+def keyset_page(collection, query, direction, per_page, after=None, before=None, last=False, projection=None):
+    """
+    Fetches one page from `collection` ordered by (created_at, _id) in `direction`.
+
+    - after:  token; returns the page following that position.
+    - before: token; returns the page preceding that position.
+    - last:   returns the final page of the ordering.
+    Without any of these the first page is returned.
+    """
+    reverse = DESCENDING if direction == ASCENDING else ASCENDING
+    after_pos = decode_cursor(after)
+    before_pos = decode_cursor(before)
+
+    if last or before_pos:
+        # Scan dari ujung lain lalu balik hasilnya agar urutan tampilan tetap sama
+        flt = dict(query)
+        if before_pos:
+            flt.update(_seek_filter(before_pos, reverse))
+        docs = list(collection.find(flt, projection)
+                    .sort([("created_at", reverse), ("_id", reverse)])
+                    .limit(per_page + 1))
+        has_prev = len(docs) > per_page
+        docs = docs[:per_page][::-1]
+        has_next = bool(before_pos)
+    else:
+        flt = dict(query)
+        if after_pos:
+            flt.update(_seek_filter(after_pos, direction))
+        docs = list(collection.find(flt, projection)
+                    .sort([("created_at", direction), ("_id", direction)])
+                    .limit(per_page + 1))
+        has_next = len(docs) > per_page
+        docs = docs[:per_page]
+        has_prev = bool(after_pos)
+
+    next_cursor = _cursor_of(docs[-1]) if docs and has_next else None
+    prev_cursor = _cursor_of(docs[0]) if docs and has_prev else None
+    return Page(docs, next_cursor, prev_cursor)
@@ -0,0 +1,170 @@
+# passwords.py
+"""
+Hashing password di luar thread request.
+
+scrypt, pbkdf2 dan bcrypt sengaja memakan CPU puluhan sampai ratusan milidetik. Jika
+dijalankan langsung di worker request (apalagi worker gevent/eventlet dengan satu event
+loop), satu gelombang login menghentikan semua request lain di worker tersebut, termasuk
+Socket.IO. PasswordHasher menjalankannya di pool thread native yang terbatas; ketiga
+algoritma melepas GIL saat menghitung, sehingga request lain tetap berjalan.
+
+- Jumlah thread: Config.PASSWORD_HASH_WORKERS (default: jumlah core CPU).
+- Antrean: paling banyak Config.PASSWORD_HASH_QUEUE operasi menunggu di belakang thread
+  yang sibuk; selebihnya ditolak dengan HasherBusy (route menjawab 503) daripada
+  menumpuk latensi untuk semua orang.
+- Algoritma dan cost: Config.PASSWORD_HASH_METHOD, misalnya `scrypt:32768:8:1`,
+  `pbkdf2:sha256:1000000` atau `bcrypt:12`; parameter yang tidak ditulis memakai default
+  werkzeug/bcrypt. Hash tersimpan dengan algoritma atau parameter lain diperbarui saat
+  login berikutnya berhasil (lihat User.check_password).
+"""
+import os
+import threading
+import bcrypt
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from config import Config
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full; the caller should answer 503 and let the client retry."""
+
+
+class _TpoolExecutor:
+    """Executor-like wrapper around eventlet's native thread pool (tpool.execute yields to the hub)."""
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        from eventlet import tpool
+        future = Future()
+        try:
+            future.set_result(tpool.execute(fn, *args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _native_executor(workers):
+    """
+    A pool of real OS threads. Under gevent/eventlet monkey-patching the standard
+    ThreadPoolExecutor would run green threads on the event loop, so their native pools are used.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor(max_workers=workers)
+    except ImportError:
+        pass
+    try:
+        from eventlet import patcher
+        if patcher.is_monkey_patched("thread"):
+            return _TpoolExecutor() # Ukuran pool: EVENTLET_THREADPOOL_SIZE
+    except ImportError:
+        pass
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+
+def normalize_method(method):
+    """Fills in the default parameters werkzeug/bcrypt apply, so it compares equal to hash_method()."""
+    name, *params = method.split(":")
+    if name == "bcrypt":
+        return f"bcrypt:{int(params[0]) if params else 12}"
+    if name == "scrypt":
+        defaults = ["32768", "8", "1"]
+    elif name == "pbkdf2":
+        defaults = ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ":".join([name] + params + defaults[len(params):])
+
+
+def hash_method(password_hash):
+    """Returns the method string of a stored hash, in the same form as Config.PASSWORD_HASH_METHOD."""
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return password_hash.split("$", 1)[0]
+
+
+def _hash(password, method):
+    if method.startswith("bcrypt"):
+        _, _, rounds = method.partition(":")
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(int(rounds))).decode("ascii")
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("ascii"))
+        except ValueError:
+            return False # Hash rusak
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded pool of native threads."""
+    def __init__(self, method, workers, queue_limit):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HasherBusy("Password hashing queue is full")
+            self.in_flight += 1
+            if self._executor is None:
+                # Dibuat saat pertama dipakai, yaitu di dalam proses worker setelah fork
+                self._executor = _native_executor(self.workers)
+            executor = self._executor
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def hash(self, password):
+        """Hashes a password with the configured method. Raises HasherBusy when the queue is full."""
+        return self._submit(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Checks a password against a stored hash of any supported method. Raises HasherBusy when the queue is full."""
+        return self._submit(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the stored hash was made with a different method or cost than the configured one."""
+        return hash_method(password_hash) != self.method
+
+    def _reset_after_fork(self):
+        # Thread pool tidak ikut ke proses anak
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def stats(self):
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+password_hasher = PasswordHasher(
+    method=Config.PASSWORD_HASH_METHOD,
+    workers=Config.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    queue_limit=Config.PASSWORD_HASH_QUEUE
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=password_hasher._reset_after_fork)
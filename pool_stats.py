@@ -0,0 +1,101 @@
+# pool_stats.py
+"""
+Statistik connection pool MongoDB dari event listener pymongo.
+
+PoolMonitor didaftarkan ke MongoClient (lihat database.py) dan menghitung checkout,
+checkout yang gagal (misalnya timeout antrean saat pool penuh), koneksi yang dibuat
+dan ditutup, serta waktu tunggu checkout. Waktu tunggu yang tinggi atau checkout
+gagal berarti MONGO_MAX_POOL_SIZE terlalu kecil untuk beban per proses.
+Hasilnya tersedia di /admin/stats.
+"""
+import threading
+from collections import deque
+from pymongo import monitoring
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Thread-safe counters and checkout wait-time samples for every pool of a client."""
+    SAMPLE_SIZE = 1000 # Jumlah waktu tunggu terakhir yang disimpan untuk persentil
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=self.SAMPLE_SIZE)
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures = {}
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_clears = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            if event.duration is not None:
+                self._waits.append(event.duration)
+                self.total_wait += event.duration
+                self.max_wait = max(self.max_wait, event.duration)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    # Event lain tidak dipakai untuk statistik
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self):
+        """Returns counters and checkout wait times in milliseconds."""
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+
+            def pct(p):
+                return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 3) if waits else None
+
+            return {
+                "checkouts": checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "in_use": checkouts - self.checkins,
+                "open_connections": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "pool_clears": self.pool_clears,
+                "wait_ms": {
+                    "avg": round(self.total_wait / checkouts * 1000, 3) if checkouts else None,
+                    "p50": pct(0.5),
+                    "p99": pct(0.99),
+                    "max": round(self.max_wait * 1000, 3)
+                }
+            }
+
+
+pool_monitor = PoolMonitor()
@@ -0,0 +1,178 @@
+# purge.py
+"""
+Penghapusan balasan secara bertahap di background untuk topik yang dihapus.
+
+Topic.delete hanya menandai topik dengan `deleted_at` lalu membuat job di koleksi
+`purge_jobs`. PurgeWorker (thread di dalam proses) mengambil job dengan lease,
+menghapus balasan per batch dengan jeda di antara batch, mencatat progres di dokumen
+job, dan menghapus dokumen topik setelah semua balasannya habis. Job yang lease-nya
+kedaluwarsa (misalnya karena proses restart) akan diambil ulang dan dilanjutkan.
+
+Sebelum dokumen topik dihapus, worker menulis tombstone di koleksi `topic_tombstones`
+(TTL Config.PURGE_TOMBSTONE_SECONDS). Index di memori proses lain (title_index,
+search_engine) menyusul penghapusan lewat `deleted_at` selama dokumennya masih ada, dan
+lewat tombstone ini setelahnya (lihat purged_topic_ids()).
+"""
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from pymongo import ReturnDocument
+import counters
+from config import Config
+from database import get_db
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+TOMBSTONE_RETENTION = datetime.timedelta(seconds=Config.PURGE_TOMBSTONE_SECONDS)
+
+
+def enqueue_topic_purge(topic_id):
+    """Creates a purge job for a soft-deleted topic and wakes the worker."""
+    now = datetime.datetime.utcnow()
+    get_db().purge_jobs.update_one(
+        {"topic_id": topic_id},
+        {"$setOnInsert": {
+            "topic_id": topic_id,
+            "status": STATUS_PENDING,
+            "deleted_posts": 0,
+            "lease_until": None,
+            "created_at": now,
+            "updated_at": now
+        }},
+        upsert=True
+    )
+    purge_worker.wake()
+
+
+def record_topic_tombstone(topic_id):
+    """Records that a topic is being hard-deleted, so other processes can drop it from their indexes."""
+    now = datetime.datetime.utcnow()
+    get_db().topic_tombstones.update_one(
+        {"_id": topic_id},
+        {"$set": {"deleted_at": now, "expires_at": now + TOMBSTONE_RETENTION}},
+        upsert=True
+    )
+
+
+def purged_topic_ids(since):
+    """
+    Returns the ids of topics hard-deleted since the given UTC time. Callers whose
+    `since` is older than TOMBSTONE_RETENTION must rebuild instead: the TTL index may
+    already have dropped the tombstones.
+    """
+    return [t["_id"] for t in get_db().topic_tombstones.find({"deleted_at": {"$gte": since}}, {"_id": 1})]
+
+
+def job_progress(limit=20):
+    """Returns the most recent purge jobs with their progress, newest first."""
+    return list(get_db().purge_jobs.find({}, {"_id": 0}).sort("created_at", -1).limit(limit))
+
+
+class PurgeWorker:
+    """In-process background worker that purges the replies of deleted topics in bounded batches."""
+    def __init__(self, batch_size, throttle, lease_seconds, poll_interval):
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the worker thread once per process; pending jobs from a previous run are resumed.
+        Does nothing after stop(): a worker shutting down does not pick up new batches.
+        """
+        with self._lock:
+            if self._stop.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            # Identitas pemilik lease ditentukan saat start, setelah fork jika ada
+            self.owner = f"{socket.gethostname()}-{os.getpid()}"
+            self._thread = threading.Thread(target=self._run, name="purge-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim_job()
+                if job is not None:
+                    self._process(job)
+                    continue
+            except Exception as e:
+                print(f"Purge worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _lease(self):
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=self.lease_seconds)
+
+    def _claim_job(self):
+        """Atomically claims a pending job, or a running job whose lease has expired."""
+        now = datetime.datetime.utcnow()
+        return get_db().purge_jobs.find_one_and_update(
+            {"$or": [
+                {"status": STATUS_PENDING},
+                {"status": STATUS_RUNNING, "lease_until": {"$lt": now}}
+            ]},
+            {"$set": {"status": STATUS_RUNNING, "owner": self.owner, "lease_until": self._lease(), "updated_at": now}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _process(self, job):
+        """Deletes the topic's posts batch by batch, then the topic itself."""
+        db = get_db()
+        topic_id = job["topic_id"]
+        while True:
+            if self._stop.is_set():
+                return # Lease akan kedaluwarsa dan job dilanjutkan oleh worker berikutnya
+            batch = list(db.posts.find({"topic_id": topic_id}, {"_id": 1, "author_id": 1}).limit(self.batch_size))
+            if not batch:
+                break
+            deleted = db.posts.delete_many({"_id": {"$in": [p["_id"] for p in batch]}}).deleted_count
+            # post_count penulis dikurangi saat balasan benar-benar dihapus
+            authors = Counter(p["author_id"] for p in batch)
+            counters.record_users_activity({author_id: (0, -count, None) for author_id, count in authors.items()})
+            # Catat progres dan perpanjang lease; jika job sudah diambil alih proses lain, berhenti
+            renewed = db.purge_jobs.update_one(
+                {"_id": job["_id"], "owner": self.owner},
+                {"$inc": {"deleted_posts": deleted},
+                 "$set": {"lease_until": self._lease(), "updated_at": datetime.datetime.utcnow()}}
+            )
+            if not renewed.matched_count:
+                return
+            time.sleep(self.throttle)
+
+        # Tombstone lebih dulu: setelah dokumen hilang, proses lain hanya dapat melihat penghapusan dari sini
+        record_topic_tombstone(topic_id)
+        db.topics.delete_one({"_id": topic_id, "deleted_at": {"$ne": None}})
+        db.purge_jobs.update_one(
+            {"_id": job["_id"], "owner": self.owner},
+            {"$set": {"status": STATUS_DONE, "lease_until": None,
+                      "finished_at": datetime.datetime.utcnow(), "updated_at": datetime.datetime.utcnow()}}
+        )
+        print(f"Purge job for topic {topic_id} finished")
+
+
+purge_worker = PurgeWorker(
+    batch_size=Config.PURGE_BATCH_SIZE,
+    throttle=Config.PURGE_THROTTLE_SECONDS,
+    lease_seconds=Config.PURGE_LEASE_SECONDS,
+    poll_interval=Config.PURGE_POLL_INTERVAL
+)
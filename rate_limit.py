@@ -0,0 +1,196 @@
+# rate_limit.py
+"""
+Pembatasan percobaan login dan pendaftaran dengan token bucket.
+
+Setiap limiter memberi `limit` token per `window` detik untuk satu kunci (IP atau username)
+dan menampung paling banyak `limit` token. Tanpa token, percobaan ditolak sebelum lookup
+user di MongoDB dan sebelum hashing password (lihat blueprints/auth.py), sehingga
+credential stuffing tidak dapat menghabiskan CPU.
+
+- Bucket IP (login dan pendaftaran): setiap percobaan mengambil satu token.
+- Bucket username: hanya login yang gagal yang mengambil token (record_login_failure),
+  sehingga login yang berhasil, termasuk dari IP lain, tidak mengunci akun pemiliknya.
+
+IP diambil dari request.remote_addr (lihat client_ip()). Di belakang reverse proxy,
+Config.PROXY_FIX_X_FOR harus diisi; tanpa itu semua client tampak sebagai alamat proxy.
+Jika request datang dari alamat privat/loopback dengan X-Forwarded-For sementara
+PROXY_FIX_X_FOR = 0, bucket IP dilewati (dengan peringatan) daripada membatasi seluruh
+situs sebagai satu client.
+
+- Bucket lokal (di memori proses, LRU terbatas Config.RATE_LIMIT_MAX_KEYS) selalu diperiksa
+  lebih dulu; penolakannya tidak menyentuh jaringan sama sekali.
+- Config.RATE_LIMIT_STORE = 'mongo': bucket yang sama juga disimpan di koleksi
+  `rate_limits` dan diperbarui atomik dengan satu find_one_and_update, sehingga batas
+  berlaku untuk semua worker dan host. Jika MongoDB gagal, hanya bucket lokal yang berlaku.
+"""
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import request
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from config import Config
+from database import get_db
+
+
+class MemoryStore:
+    """Per-process token buckets, least recently used keys are forgotten beyond max_keys."""
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at monotonic)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, window, cost=1):
+        """
+        Takes `cost` tokens (0 only checks). Returns the tokens left (>= 0) when allowed;
+        when rejected, a negative number whose magnitude is the missing fraction of a token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not cost and key not in self._buckets:
+                return burst # Bucket penuh; pemeriksaan tidak membuat entri baru
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= cost
+                result = tokens
+            else:
+                result = tokens - 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoStore:
+    """Token buckets shared by every process, in the `rate_limits` collection (TTL on expires_at)."""
+    def take(self, key, rate, burst, window, cost=1):
+        """Same contract as MemoryStore.take, as one atomic pipeline update."""
+        now = "$$NOW" # Jam server MongoDB, sama untuk semua host
+        refill = {"$multiply": [{"$divide": [{"$subtract": [now, "$updated_at"]}, 1000]}, rate]}
+        pipeline = [
+            {"$set": {"tokens": {"$cond": [
+                {"$eq": [{"$type": "$updated_at"}, "missing"]},
+                burst,
+                {"$min": [burst, {"$add": ["$tokens", refill]}]}
+            ]}}},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                "updated_at": now,
+                "expires_at": {"$add": [now, int(window * 1000)]}
+            }}
+        ]
+        doc = get_db().rate_limits.find_one_and_update(
+            {"_id": key}, pipeline, projection={"tokens": 1, "allowed": 1},
+            upsert=bool(cost), return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return burst # Pemeriksaan (cost 0) untuk bucket yang belum ada
+        return doc["tokens"] if doc["allowed"] else doc["tokens"] - 1
+
+
+class RateLimiter:
+    """Token bucket of `limit` attempts per `window` seconds per key; local first, then the shared store."""
+    def __init__(self, name, limit, window, shared=None, max_keys=100000):
+        self.name = name
+        self.burst = limit
+        self.window = window
+        self.rate = limit / window
+        self.local = MemoryStore(max_keys)
+        self.shared = shared
+        self.rejected = 0
+
+    def hit(self, key, cost=1):
+        """
+        Records one attempt for key (cost=0 only checks the bucket). Returns None if allowed,
+        otherwise the number of seconds until the next attempt is allowed (for Retry-After).
+        """
+        if not key or self.burst <= 0:
+            return None
+        key = f"{self.name}:{key}"
+        tokens = self.local.take(key, self.rate, self.burst, self.window, cost)
+        if tokens >= 0 and self.shared is not None:
+            try:
+                tokens = self.shared.take(key, self.rate, self.burst, self.window, cost)
+            except PyMongoError as e:
+                print(f"Shared rate limit store error ({self.name}): {e}")
+        if tokens >= 0:
+            return None
+        self.rejected += 1
+        return max(1, math.ceil(-tokens / self.rate))
+
+    def stats(self):
+        return {"rejected": self.rejected, "tracked_keys": len(self.local)}
+
+
+def _limiter(name, limit, window):
+    shared = MongoStore() if Config.RATE_LIMIT_STORE == "mongo" else None
+    return RateLimiter(name, limit, window, shared=shared, max_keys=Config.RATE_LIMIT_MAX_KEYS)
+
+
+login_ip_limiter = _limiter("login-ip", Config.LOGIN_IP_LIMIT, Config.LOGIN_IP_WINDOW)
+login_user_limiter = _limiter("login-user", Config.LOGIN_USER_LIMIT, Config.LOGIN_USER_WINDOW)
+register_ip_limiter = _limiter("register-ip", Config.REGISTER_IP_LIMIT, Config.REGISTER_IP_WINDOW)
+
+
+_proxy_warned = False
+
+
+def client_ip():
+    """
+    request.remote_addr for the IP buckets, or None (IP buckets skipped) when the request
+    evidently came through a reverse proxy that ProxyFix is not configured for.
+    """
+    global _proxy_warned
+    ip = request.remote_addr
+    if Config.PROXY_FIX_X_FOR or not ip or "X-Forwarded-For" not in request.headers:
+        return ip
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    if not (address.is_private or address.is_loopback):
+        return ip # Client langsung dapat menulis header apa saja; tetap batasi per alamatnya
+    if not _proxy_warned:
+        _proxy_warned = True
+        print(f"X-Forwarded-For received from proxy {ip} but PROXY_FIX_X_FOR=0; "
+              f"IP rate limits are skipped until PROXY_FIX_X_FOR is set")
+    return None
+
+
+def _username_key(username):
+    # Username di-casefold agar variasi huruf besar/kecil tidak mendapat bucket baru
+    return (username or "").strip().casefold()
+
+
+def check_login(ip, username):
+    """
+    Retry-After seconds if this login attempt must be rejected, else None. Takes a token
+    from the IP bucket; the username bucket is only checked (see record_login_failure).
+    """
+    if not Config.RATE_LIMIT_ENABLED:
+        return None
+    return login_ip_limiter.hit(ip) or login_user_limiter.hit(_username_key(username), cost=0)
+
+
+def record_login_failure(username):
+    """Takes a token from the username bucket after a failed login."""
+    if Config.RATE_LIMIT_ENABLED:
+        login_user_limiter.hit(_username_key(username))
+
+
+def check_register(ip):
+    """Retry-After seconds if this registration attempt must be rejected, else None."""
+    if not Config.RATE_LIMIT_ENABLED:
+        return None
+    return register_ip_limiter.hit(ip)
+
+
+def stats():
+    return {limiter.name: limiter.stats() for limiter in (login_ip_limiter, login_user_limiter, register_ip_limiter)}
@@ -0,0 +1,133 @@
+# search_cache.py
+"""
+Cache hasil pencarian untuk /search.
+
+Setiap query dinormalisasi (lihat cache_key() pada backend) lalu backend dijalankan
+sekali untuk mengambil daftar id topik yang sudah terurut beserta totalnya. Halaman
+berikutnya dari query yang sama cukup memotong daftar tersebut dan mengambil dokumen
+topiknya dengan satu query $in.
+
+Memori dibatasi oleh jumlah entri (LRU) dan jumlah id per entri; halaman di luar
+daftar id yang tersimpan dilayani langsung oleh backend. Entri kedaluwarsa setelah
+TTL dan di-invalidate oleh Topic.save/delete dan Post.save/delete (lihat models.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from database import primary_reads
+from search_engine import fetch_topics, search_backend, tokenize
+
+
+class SearchResultCache:
+    """Bounded, thread-safe LRU of ordered topic id lists per normalized query, with a TTL."""
+    def __init__(self, backend, maxsize, ttl, max_ids):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_ids = max_ids
+        self._entries = OrderedDict()  # cache key -> (expires_at, ids tuple, total, query tokens)
+        self._lock = threading.Lock()
+        self._generation = 0  # Dinaikkan setiap invalidasi; hasil yang dihitung sebelumnya tidak disimpan
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key, generation, ids, total, tokens):
+        with self._lock:
+            if generation != self._generation:
+                return # Ada penulisan selama backend berjalan; hasil ini mungkin sudah basi
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(ids), total, tokens)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def search(self, query_text, page, per_page, projection=None):
+        """Returns (topic documents, total) for one page of a query, from the cache when possible."""
+        key = self.backend.cache_key(query_text)
+        if not key:
+            return [], 0
+        entry = self._get(key)
+        if entry is None:
+            with self._lock:
+                generation = self._generation
+            with primary_reads(): # Daftar id ini dipakai semua pengunjung selama TTL
+                ids, total = self.backend.search_ids(query_text, self.max_ids)
+            entry = (None, tuple(ids), total, frozenset(tokenize(query_text)))
+            if self.backend.ready: # Index lokal yang belum selesai dimuat mengembalikan hasil kosong
+                self._put(key, generation, *entry[1:])
+        _, ids, total, _ = entry
+
+        start = (page - 1) * per_page
+        if start + per_page > len(ids) and len(ids) < total:
+            # Halaman melewati daftar id yang di-cache
+            return self.backend.search(query_text, page, per_page, projection)
+        return fetch_topics(ids[start:start + per_page], projection), total
+
+    # --- invalidasi ---
+
+    def _drop(self, predicate):
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if predicate(entry)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_topic(self, topic_id, *texts):
+        """
+        Drops entries whose results contain topic_id, plus entries whose query could
+        match the given text of a created or edited topic. Call with no texts for deletes.
+        """
+        if texts and self.backend.name != "local":
+            # Analyzer Atlas (stemming dsb.) berbeda dari tokenize(), jadi tidak bisa ditarget
+            self._drop(lambda entry: True)
+            return
+        topic_id = str(topic_id)
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+        self._drop(lambda entry: topic_id in entry[1] or not entry[3].isdisjoint(tokens))
+
+    def invalidate_post(self, post):
+        """Like invalidate_topic, for a reply; only the local backend indexes replies."""
+        if self.backend.name == "local":
+            self.invalidate_topic(post.topic_id, post.content)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size, for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "max_ids": self.max_ids,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+search_cache = SearchResultCache(search_backend, Config.SEARCH_CACHE_SIZE, Config.SEARCH_CACHE_TTL,
+                                 Config.SEARCH_CACHE_MAX_IDS)
@@ -0,0 +1,605 @@
+# search_engine.py
+"""
+Backend pencarian yang dapat dipilih lewat Config.SEARCH_BACKEND.
+
+- "atlas": pipeline $search Atlas Search yang lama (butuh index `topic_text_index` di Atlas).
+- "local": inverted index di dalam proses dengan ranking BM25, mencakup judul, isi topik
+  dan balasan topik yang belum dihapus. Index diperbarui secara inkremental oleh
+  Topic.save/Post.save/delete, disimpan sebagai snapshot JSON di disk untuk warm start, dan
+  disusul (catch-up) dari MongoDB berdasarkan updated_at/deleted_at agar perubahan dari
+  proses lain ikut masuk. Balasan dan topik yang sudah di-purge di-hard-delete, jadi
+  penghapusannya dibaca dari tombstone (`post_tombstones`, TTL Config.SEARCH_TOMBSTONE_SECONDS,
+  dan `topic_tombstones` dari purge.py); index yang tertinggal lebih lama dari retensi
+  tersebut dibangun ulang karena tombstone-nya mungkin sudah kedaluwarsa.
+  Pemuatan, build dan catch-up berjalan di thread background; sampai pemuatan pertama
+  selesai, pencarian mengembalikan hasil kosong (dan tidak di-cache, lihat `ready`).
+  Snapshot hanya dimuat jika dimiliki user proses, tidak dapat ditulis user lain, dan
+  dibangun dari database yang sama (database.source_name()).
+
+Kedua backend memenuhi kontrak yang sama: search(query, page, per_page, projection) -> (dokumen topik, total)
+dan search_ids(query, limit) -> (id topik terurut, total) yang dipakai oleh search_cache.py.
+"""
+import atexit
+import base64
+import datetime
+import json
+import math
+import os
+import re
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from bson.objectid import ObjectId
+from config import Config
+from database import get_db, read_db, source_name
+from hydration import collection
+from purge import TOMBSTONE_RETENTION, purged_topic_ids
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset((
+    "yang dan di ke dari ini itu untuk dengan pada adalah atau juga tidak akan ada saya kita "
+    "the and or of to in is it for on with as at by be this that are was an"
+).split())
+MAX_TF = 0xFFFF # Batas term frequency yang muat di array('H')
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(text):
+    """Lowercases text and splits it into word tokens, dropping stopwords and 1-char tokens."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index ranked with BM25.
+
+    Every indexed document (a topic or a post) gets a monotonically increasing ordinal,
+    so postings stay sorted when appended. Postings are compact parallel arrays of
+    ordinals (uint32) and term frequencies (uint16). Updates and deletes tombstone the
+    old ordinal; compact() drops tombstones once they pile up.
+    """
+    K1 = 1.2
+    B = 0.75
+    TITLE_WEIGHT = 2 # Token judul dihitung dua kali
+    COMPACT_RATIO = 0.25 # Compaction saat tombstone melebihi 25% dokumen
+
+    def __init__(self):
+        self.postings = {}  # term -> (array('I') ordinals, array('H') term frequencies)
+        self.alive = bytearray()  # ordinal -> 1 if live
+        self.doc_lengths = array('I')  # ordinal -> token count
+        self.doc_topic = array('I')  # ordinal -> topic ordinal
+        self.ordinals = {}  # doc key ("t:<id>" / "p:<id>") -> ordinal of its live version
+        self.topic_ids = []  # topic ordinal -> topic id string
+        self.topic_ordinals = {}  # topic id string -> topic ordinal
+        self.topic_docs = {}  # topic ordinal -> set of live doc keys
+        self.live_docs = 0
+        self.live_length = 0
+        self.dead_docs = 0
+
+    def _topic_ordinal(self, topic_id):
+        t_ord = self.topic_ordinals.get(topic_id)
+        if t_ord is None:
+            t_ord = self.topic_ordinals[topic_id] = len(self.topic_ids)
+            self.topic_ids.append(topic_id)
+        return t_ord
+
+    def add(self, key, topic_id, tokens):
+        """Indexes (or re-indexes) a document belonging to topic_id."""
+        self.remove(key)
+        ordinal = len(self.alive)
+        t_ord = self._topic_ordinal(topic_id)
+        for term, tf in Counter(tokens).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array('I'), array('H'))
+            entry[0].append(ordinal)
+            entry[1].append(min(tf, MAX_TF))
+        self.alive.append(1)
+        self.doc_lengths.append(len(tokens))
+        self.doc_topic.append(t_ord)
+        self.ordinals[key] = ordinal
+        self.topic_docs.setdefault(t_ord, set()).add(key)
+        self.live_docs += 1
+        self.live_length += len(tokens)
+
+    def remove(self, key):
+        """Tombstones a document; no-op if it is not indexed."""
+        ordinal = self.ordinals.pop(key, None)
+        if ordinal is None:
+            return
+        self.alive[ordinal] = 0
+        self.live_docs -= 1
+        self.live_length -= self.doc_lengths[ordinal]
+        self.dead_docs += 1
+        docs = self.topic_docs.get(self.doc_topic[ordinal])
+        if docs is not None:
+            docs.discard(key)
+        if self.dead_docs > self.COMPACT_RATIO * len(self.alive):
+            self.compact()
+
+    def remove_topic(self, topic_id):
+        """Tombstones a topic and all of its posts."""
+        t_ord = self.topic_ordinals.get(topic_id)
+        if t_ord is None:
+            return
+        for key in list(self.topic_docs.pop(t_ord, ())):
+            self.remove(key)
+
+    def compact(self):
+        """Rebuilds postings without tombstoned documents and renumbers ordinals."""
+        remap = array('i', [-1]) * len(self.alive)
+        next_ordinal = 0
+        for ordinal, live in enumerate(self.alive):
+            if live:
+                remap[ordinal] = next_ordinal
+                next_ordinal += 1
+
+        postings = {}
+        for term, (ords, tfs) in self.postings.items():
+            new_ords, new_tfs = array('I'), array('H')
+            for ordinal, tf in zip(ords, tfs):
+                if remap[ordinal] >= 0:
+                    new_ords.append(remap[ordinal])
+                    new_tfs.append(tf)
+            if new_ords:
+                postings[term] = (new_ords, new_tfs)
+
+        keep = [ordinal for ordinal, live in enumerate(self.alive) if live]
+        self.postings = postings
+        self.doc_lengths = array('I', (self.doc_lengths[o] for o in keep))
+        self.doc_topic = array('I', (self.doc_topic[o] for o in keep))
+        self.alive = bytearray(b"\x01") * len(keep)
+        self.ordinals = {key: remap[ordinal] for key, ordinal in self.ordinals.items()}
+        self.dead_docs = 0
+
+    def search(self, tokens):
+        """Returns topic ids ranked by their best-scoring document (BM25), best first."""
+        if not self.live_docs:
+            return []
+        avgdl = self.live_length / self.live_docs
+        alive, lengths = self.alive, self.doc_lengths
+        k1, b = self.K1, self.B
+        scores = {}
+        for term in set(tokens):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            # df hanya menghitung dokumen hidup: dengan tombstone, df > live_docs membuat idf negatif
+            live = [(ordinal, tf) for ordinal, tf in zip(*entry) if alive[ordinal]]
+            if not live:
+                continue
+            df = len(live)
+            idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+            for ordinal, tf in live:
+                norm = k1 * (1 - b + b * lengths[ordinal] / avgdl)
+                scores[ordinal] = scores.get(ordinal, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        topic_scores = {}
+        for ordinal, score in scores.items():
+            t_ord = self.doc_topic[ordinal]
+            if score > topic_scores.get(t_ord, 0.0):
+                topic_scores[t_ord] = score
+        # Skor sama: topik yang lebih baru diindex lebih dulu
+        ranked = sorted(topic_scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [self.topic_ids[t_ord] for t_ord, _ in ranked]
+
+    def stats(self):
+        return {
+            "documents": self.live_docs,
+            "tombstones": self.dead_docs,
+            "topics": len(self.topic_docs),
+            "terms": len(self.postings),
+            "postings_bytes": sum(o.itemsize * len(o) + t.itemsize * len(t) for o, t in self.postings.values())
+        }
+
+    def to_state(self):
+        """JSON-serializable state; postings are concatenated arrays, base64-encoded."""
+        terms = list(self.postings)
+        offsets, ords, tfs = array('Q', [0]), array('I'), array('H')
+        for term in terms:
+            o, t = self.postings[term]
+            ords.extend(o)
+            tfs.extend(t)
+            offsets.append(len(ords))
+        return {
+            "byteorder": sys.byteorder,
+            "itemsizes": [array(code).itemsize for code in "QIH"],
+            "terms": terms,
+            "offsets": _pack(offsets),
+            "ordinals": _pack(ords),
+            "tfs": _pack(tfs),
+            "alive": _pack(self.alive),
+            "doc_lengths": _pack(self.doc_lengths),
+            "doc_topic": _pack(self.doc_topic),
+            "docs": self.ordinals,
+            "topic_ids": self.topic_ids
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds an index from to_state(); the counters are derived rather than trusted."""
+        if state["byteorder"] != sys.byteorder or state["itemsizes"] != [array(code).itemsize for code in "QIH"]:
+            raise ValueError("snapshot was written on an incompatible platform")
+        index = cls()
+        offsets, ords, tfs = (_unpack(code, state[k]) for code, k in (("Q", "offsets"), ("I", "ordinals"), ("H", "tfs")))
+        if len(offsets) != len(state["terms"]) + 1 or len(ords) != len(tfs) or offsets[-1] != len(ords):
+            raise ValueError("snapshot postings are inconsistent")
+        for i, term in enumerate(state["terms"]):
+            index.postings[term] = (ords[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+        index.alive = bytearray(base64.b64decode(state["alive"]))
+        index.doc_lengths = _unpack("I", state["doc_lengths"])
+        index.doc_topic = _unpack("I", state["doc_topic"])
+        index.ordinals = {key: int(ordinal) for key, ordinal in state["docs"].items()}
+        index.topic_ids = [str(t) for t in state["topic_ids"]]
+        index.topic_ordinals = {topic_id: t_ord for t_ord, topic_id in enumerate(index.topic_ids)}
+        for key, ordinal in index.ordinals.items():
+            index.topic_docs.setdefault(index.doc_topic[ordinal], set()).add(key)
+            index.live_length += index.doc_lengths[ordinal]
+        index.live_docs = len(index.ordinals)
+        index.dead_docs = len(index.alive) - index.live_docs
+        return index
+
+
+def _pack(values):
+    return base64.b64encode(values).decode("ascii")
+
+
+def _unpack(typecode, text):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    return values
+
+
+def normalize_query(query_text):
+    """Canonical form of a query for cache keys: NFKC, casefolded, single-spaced."""
+    return " ".join(unicodedata.normalize("NFKC", query_text or "").casefold().split())
+
+
+def fetch_topics(topic_ids, projection=None):
+    """Fetches live topic documents for the given ids with one $in query, keeping the given order."""
+    docs = {str(t["_id"]): t for t in collection("topics", heavy=True).find(
+        {"_id": {"$in": [ObjectId(i) for i in topic_ids]}, "deleted_at": None}, projection)}
+    return [docs[str(i)] for i in topic_ids if str(i) in docs]
+
+
+def _topic_tokens(doc):
+    return tokenize(doc.get("title")) * InvertedIndex.TITLE_WEIGHT + tokenize(doc.get("content"))
+
+
+class AtlasSearchBackend:
+    """Atlas Search ($search) backend; requires the `topic_text_index` search index in Atlas."""
+    name = "atlas"
+    ready = True
+
+    @staticmethod
+    def _pipeline(query_text, facet):
+        # 'topic_text_index' is the name of the Atlas Search index you created in Atlas
+        return [
+            {
+                '$search': {
+                    'index': 'topic_text_index',
+                    'text': {
+                        'query': query_text,
+                        'path': ['title', 'content'] # Search in title and content fields
+                    }
+                }
+            },
+            {'$match': {'deleted_at': None}}, # Hide soft-deleted topics
+            {'$sort': {'created_at': -1}}, # Sort by newest date
+            {'$facet': facet}
+        ]
+
+    @staticmethod
+    def cache_key(query_text):
+        # Analyzer Atlas tidak membuang stopword kita, jadi urutan dan kata tetap dipertahankan
+        return normalize_query(query_text)
+
+    def search(self, query_text, page, per_page, projection=None):
+        skip = (page - 1) * per_page
+
+        # Aggregation pipeline for Atlas Search
+        page_stages = [{'$skip': skip}, {'$limit': per_page}]
+        if projection:
+            page_stages.append({'$project': projection})
+        pipeline = self._pipeline(query_text, {
+            'totalData': page_stages,
+            'totalCount': [{'$count': 'count'}]
+        })
+
+        # Execute pipeline
+        result = list(collection("topics", heavy=True).aggregate(pipeline))
+
+        # Extract results
+        # Handle cases where there are no results or empty documents from $facet
+        topics_data = result[0]['totalData'] if result and 'totalData' in result[0] else []
+        total_results = result[0]['totalCount'][0]['count'] if result and 'totalCount' in result[0] and result[0]['totalCount'] else 0
+        return topics_data, total_results
+
+    def search_ids(self, query_text, limit):
+        """Returns up to limit matching topic ids (newest first) and the total number of matches."""
+        result = list(read_db().topics.aggregate(self._pipeline(query_text, {
+            'ids': [{'$limit': limit}, {'$project': {'_id': 1}}],
+            'totalCount': [{'$count': 'count'}]
+        })))
+        if not result:
+            return [], 0
+        ids = [str(t['_id']) for t in result[0]['ids']]
+        total = result[0]['totalCount'][0]['count'] if result[0]['totalCount'] else 0
+        return ids, total
+
+    # Atlas memelihara index-nya sendiri
+    def index_topic(self, topic):
+        pass
+
+    def remove_topic(self, topic_id):
+        pass
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+
+class LocalSearchBackend:
+    """In-process BM25 backend over topics and their replies."""
+    name = "local"
+    SYNC_MARGIN = datetime.timedelta(seconds=5) # Toleransi perbedaan jam antar proses
+
+    def __init__(self, snapshot_path, refresh_seconds, snapshot_seconds, tombstone_seconds):
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.snapshot_seconds = snapshot_seconds
+        self.tombstone_retention = datetime.timedelta(seconds=tombstone_seconds)
+        self.index = None
+        self.source = None # database.source_name() dari data index ini
+        self.synced_at = None # Waktu (UTC) data MongoDB terakhir disusul
+        self._last_refresh = 0.0
+        self._last_snapshot = 0.0
+        self._lock = threading.RLock() # Melindungi index; tidak dipegang selama query MongoDB atau penulisan file
+        self._loading = False # Pemuatan, build atau sync sedang berjalan di background
+
+    @property
+    def ready(self):
+        """False until the first snapshot load or build finishes; searches return nothing until then."""
+        return self.index is not None
+
+    # --- pemuatan & sinkronisasi (di thread background, bukan di jalur request) ---
+
+    def _start_background(self, target):
+        """Runs target in a background thread unless a load, build or sync is already running."""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._run_background, args=(target,), name="search-index", daemon=True).start()
+
+    def _run_background(self, target):
+        try:
+            target()
+        except Exception as e:
+            print(f"Search index update failed: {e}")
+        finally:
+            self._last_refresh = time.monotonic() # Jika gagal, dicoba lagi setelah refresh_seconds
+            self._loading = False
+
+    def load(self):
+        """Loads the snapshot and catches up, or builds the index from MongoDB if there is no usable snapshot."""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                state = self._read_snapshot()
+                index = InvertedIndex.from_state(state["index"])
+                with self._lock:
+                    self.index, self.source = index, state["source"]
+                    self.synced_at = datetime.datetime.fromisoformat(state["synced_at"])
+                self.sync()
+                print(f"Search index loaded from snapshot {self.snapshot_path}")
+                return
+            except Exception as e:
+                print(f"Could not load search snapshot {self.snapshot_path}: {e}")
+        self.rebuild()
+
+    def rebuild(self):
+        """Builds a fresh index from every live topic and its posts, then writes a snapshot."""
+        db = get_db()
+        started = datetime.datetime.utcnow()
+        index = InvertedIndex()
+        live = set()
+        for t in db.topics.find({"deleted_at": None}, {"title": 1, "content": 1}):
+            live.add(t["_id"])
+            index.add(f"t:{t['_id']}", str(t["_id"]), _topic_tokens(t))
+        for p in db.posts.find({}, {"topic_id": 1, "content": 1}):
+            # Balasan topik yang di-soft-delete masih ada sampai purge selesai
+            if p["topic_id"] in live:
+                index.add(f"p:{p['_id']}", str(p["topic_id"]), tokenize(p.get("content")))
+        with self._lock:
+            self.index, self.source, self.synced_at = index, source_name(), started
+        # Penulisan selama build (termasuk dari proses ini) masuk ke index lama; susul dari MongoDB
+        self.sync()
+        self.save_snapshot()
+        return index.stats()
+
+    def refresh(self):
+        """Catches up with MongoDB, writing a snapshot at most every snapshot_seconds."""
+        self.sync()
+        if time.monotonic() - self._last_snapshot > self.snapshot_seconds:
+            self.save_snapshot()
+
+    def sync(self):
+        """
+        Applies topic/post writes made since the last sync (e.g. by other worker processes).
+        MongoDB is read without holding the lock; only applying the changes blocks searches.
+        """
+        with self._lock:
+            if self.index is None:
+                return
+            since = self.synced_at - self.SYNC_MARGIN
+        db = get_db()
+        started = datetime.datetime.utcnow()
+        if since < started - min(self.tombstone_retention, TOMBSTONE_RETENTION):
+            # Tombstone balasan/topik yang dihapus sejak saat itu mungkin sudah dibuang oleh TTL
+            print("Search index is older than the tombstone retention; rebuilding")
+            self.rebuild()
+            return
+        topics = list(db.topics.find({"updated_at": {"$gte": since}, "deleted_at": None}, {"title": 1, "content": 1}))
+        deleted_topics = [t["_id"] for t in db.topics.find({"deleted_at": {"$gte": since}}, {"_id": 1})]
+        # Dokumen topik yang sudah di-purge tidak ada lagi; penghapusannya hanya terlihat dari tombstone
+        deleted_topics += purged_topic_ids(since)
+        posts = list(db.posts.find({"updated_at": {"$gte": since}}, {"topic_id": 1, "content": 1}))
+        # Balasan yang berubah di topik yang sudah dihapus tidak dimasukkan kembali
+        live = set()
+        if posts:
+            live = {t["_id"] for t in db.topics.find(
+                {"_id": {"$in": list({p["topic_id"] for p in posts})}, "deleted_at": None}, {"_id": 1})}
+        deleted_posts = [p["_id"] for p in db.post_tombstones.find({"deleted_at": {"$gte": since}}, {"_id": 1})]
+        with self._lock:
+            for t in topics:
+                self.index.add(f"t:{t['_id']}", str(t["_id"]), _topic_tokens(t))
+            for topic_id in deleted_topics:
+                self.index.remove_topic(str(topic_id))
+            for p in posts:
+                if p["topic_id"] in live:
+                    self.index.add(f"p:{p['_id']}", str(p["topic_id"]), tokenize(p.get("content")))
+            for post_id in deleted_posts:
+                self.index.remove(f"p:{post_id}")
+            self.synced_at = started
+            self._last_refresh = time.monotonic()
+
+    def save_snapshot(self):
+        """Atomically writes the index to snapshot_path; only copying the state blocks searches."""
+        with self._lock:
+            if not self.snapshot_path or self.index is None:
+                return
+            state = {"version": SNAPSHOT_VERSION, "source": self.source, "synced_at": self.synced_at.isoformat(),
+                     "index": self.index.to_state()}
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        tmp_path = None
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # mkstemp membuat file baru dengan mode 0600, tidak mengikuti symlink yang sudah ada
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.snapshot_path) + ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+            tmp_path = None
+        except OSError as e:
+            # Mis. filesystem read-only di serverless: index tetap dipakai dari memori
+            print(f"Could not write search snapshot {self.snapshot_path}: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._last_snapshot = time.monotonic()
+
+    def _read_snapshot(self):
+        """Reads the snapshot, refusing files another user could have written or built from another database."""
+        fd = os.open(self.snapshot_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        with os.fdopen(fd, "r", encoding="utf-8") as f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise ValueError("not a regular file")
+            if hasattr(os, "geteuid") and st.st_uid != os.geteuid():
+                raise ValueError(f"owned by uid {st.st_uid}, not by this process (uid {os.geteuid()})")
+            if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                raise ValueError(f"writable by group or others (mode {stat.S_IMODE(st.st_mode):o})")
+            state = json.load(f)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {state.get('version')}")
+        if state.get("source") != source_name():
+            raise ValueError(f"built from {state.get('source')}, not from {source_name()}")
+        return state
+
+    # --- kontrak backend ---
+
+    @staticmethod
+    def cache_key(query_text):
+        # BM25 di sini mengabaikan urutan, duplikat dan stopword, jadi kuncinya cukup himpunan token
+        return " ".join(sorted(set(tokenize(query_text))))
+
+    @staticmethod
+    def _live_ids(topic_ids):
+        """Drops topics deleted since the index last caught up, keeping the ranking order."""
+        if not topic_ids:
+            return topic_ids
+        live = {str(t["_id"]) for t in read_db().topics.find(
+            {"_id": {"$in": [ObjectId(i) for i in topic_ids]}, "deleted_at": None}, {"_id": 1})}
+        return [i for i in topic_ids if i in live]
+
+    def _ranked_ids(self, query_text):
+        tokens = tokenize(query_text)
+        if not tokens:
+            return []
+        if self.index is None:
+            self._start_background(self.load)
+            return []
+        if time.monotonic() - self._last_refresh > self.refresh_seconds:
+            self._start_background(self.refresh)
+        with self._lock:
+            topic_ids = self.index.search(tokens)
+        return self._live_ids(topic_ids)
+
+    def search(self, query_text, page, per_page, projection=None):
+        topic_ids = self._ranked_ids(query_text)
+        start = (page - 1) * per_page
+        # fetch_topics mempertahankan urutan relevansi
+        return fetch_topics(topic_ids[start:start + per_page], projection), len(topic_ids)
+
+    def search_ids(self, query_text, limit):
+        topic_ids = self._ranked_ids(query_text)
+        return topic_ids[:limit], len(topic_ids)
+
+    # Hook inkremental; jika index belum dimuat, pemuatan berikutnya akan menyusul dari MongoDB
+    def index_topic(self, topic):
+        with self._lock:
+            if self.index is not None:
+                self.index.add(f"t:{topic._id}", str(topic._id),
+                               _topic_tokens({"title": topic.title, "content": topic.content}))
+
+    def remove_topic(self, topic_id):
+        with self._lock:
+            if self.index is not None:
+                self.index.remove_topic(str(topic_id))
+
+    def index_post(self, post):
+        with self._lock:
+            if self.index is not None:
+                self.index.add(f"p:{post._id}", str(post.topic_id), tokenize(post.content))
+
+    def remove_post(self, post_id):
+        # Tombstone untuk proses lain; proses ini langsung menghapus dari index-nya sendiri
+        now = datetime.datetime.utcnow()
+        get_db().post_tombstones.update_one(
+            {"_id": post_id},
+            {"$set": {"deleted_at": now, "expires_at": now + self.tombstone_retention}},
+            upsert=True
+        )
+        with self._lock:
+            if self.index is not None:
+                self.index.remove(f"p:{post_id}")
+
+    def stats(self):
+        with self._lock:
+            return self.index.stats() if self.index is not None else None
+
+
+def create_search_backend(name):
+    """Returns the search backend configured by name ('atlas' or 'local')."""
+    if name == "local":
+        backend = LocalSearchBackend(
+            snapshot_path=Config.SEARCH_INDEX_PATH,
+            refresh_seconds=Config.SEARCH_REFRESH_SECONDS,
+            snapshot_seconds=Config.SEARCH_SNAPSHOT_SECONDS,
+            tombstone_seconds=Config.SEARCH_TOMBSTONE_SECONDS
+        )
+        atexit.register(backend.save_snapshot)
+        return backend
+    if name == "atlas":
+        return AtlasSearchBackend()
+    raise ValueError(f"Unknown SEARCH_BACKEND: {name}")
+
+
+search_backend = create_search_backend(Config.SEARCH_BACKEND)
@@ -0,0 +1,123 @@
+# serve.py
+"""
+Launcher produksi: gunicorn dengan worker yang cocok untuk Socket.IO.
+
+    pip install -r requirements-prod.txt
+    python serve.py
+
+- Worker class: Config.SERVER_WORKER_CLASS, atau otomatis gevent -> eventlet -> gthread
+  sesuai paket yang terpasang. Async mode Socket.IO diselaraskan dengan worker class.
+- Jumlah worker: Config.WEB_CONCURRENCY, atau jumlah core CPU yang boleh dipakai proses
+  ini (affinity dan kuota cgroup container ikut dihitung). Worker gevent/eventlet
+  melayani banyak koneksi dalam satu thread, jadi satu worker per core.
+- Setiap worker memanggil app.create_app() setelah fork, sehingga client MongoDB dan
+  server Socket.IO tidak dibagi antar proses, lalu memulai purge worker satu kali
+  (hook post_worker_init).
+- Lebih dari satu worker: gunicorn tidak memiliki sticky session, sehingga long-polling
+  Socket.IO dimatikan (SOCKETIO_WEBSOCKET_ONLY) dan emit antar worker memakai
+  SOCKETIO_MESSAGE_QUEUE (default `mongo` jika belum diisi, lihat socket_manager.py).
+- SIGTERM/SIGINT: gunicorn berhenti menerima koneksi, menunggu request yang berjalan
+  sampai Config.SERVER_GRACEFUL_TIMEOUT, lalu setiap worker menghentikan purge worker
+  dan menutup client MongoDB.
+"""
+import importlib.util
+import os
+from gunicorn.app.base import BaseApplication
+from config import Config
+
+# Worker class gunicorn -> async_mode Flask-SocketIO
+ASYNC_MODES = {"gevent": "gevent", "eventlet": "eventlet", "gthread": "threading", "sync": "threading"}
+
+
+def available_cpus():
+    """CPU cores this process may use: scheduler affinity, capped by the cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass # Bukan Linux / tanpa cgroup v2
+    return cpus
+
+
+def worker_count():
+    return Config.WEB_CONCURRENCY or available_cpus()
+
+
+def worker_class():
+    if Config.SERVER_WORKER_CLASS:
+        return Config.SERVER_WORKER_CLASS
+    for module in ("gevent", "eventlet"):
+        if importlib.util.find_spec(module) is not None:
+            return module
+    return "gthread"
+
+
+def post_worker_init(worker):
+    """Gunicorn hook: starts the purge worker thread once in each worker, after the app is loaded."""
+    from purge import purge_worker
+    purge_worker.start()
+
+
+def worker_exit(server, worker):
+    """Gunicorn hook: stops background work and closes the MongoDB client of an exiting worker."""
+    from database import close_db
+    from purge import purge_worker
+    purge_worker.stop(timeout=Config.SERVER_GRACEFUL_TIMEOUT)
+    close_db()
+
+
+def server_options():
+    """Gunicorn settings from Config; also aligns the Socket.IO settings that workers inherit."""
+    workers = worker_count()
+    klass = worker_class()
+    if not Config.SOCKETIO_ASYNC_MODE:
+        Config.SOCKETIO_ASYNC_MODE = ASYNC_MODES.get(klass, "")
+    if workers > 1:
+        Config.SOCKETIO_WEBSOCKET_ONLY = True
+        if not Config.SOCKETIO_MESSAGE_QUEUE:
+            print("SOCKETIO_MESSAGE_QUEUE is empty; using `mongo` so emits reach clients of every worker")
+            Config.SOCKETIO_MESSAGE_QUEUE = "mongo"
+    return {
+        "bind": Config.SERVER_BIND,
+        "workers": workers,
+        "worker_class": klass,
+        "worker_connections": Config.SERVER_WORKER_CONNECTIONS,
+        "threads": Config.SERVER_THREADS if klass == "gthread" else 1,
+        "graceful_timeout": Config.SERVER_GRACEFUL_TIMEOUT,
+        "preload_app": False, # create_app() di setiap worker, setelah fork
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "accesslog": "-"
+    }
+
+
+class ForumServer(BaseApplication):
+    """Gunicorn application that builds the Flask app with create_app() inside each worker."""
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import create_app
+        return create_app()
+
+
+def main():
+    options = server_options()
+    print(f"Starting {options['workers']} {options['worker_class']} worker(s) on {options['bind']} "
+          f"(Socket.IO async_mode={Config.SOCKETIO_ASYNC_MODE}, websocket only={Config.SOCKETIO_WEBSOCKET_ONLY})")
+    ForumServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# socket_manager.py
+"""
+Client manager Socket.IO yang dapat dipilih untuk fan-out antar proses dan antar host.
+
+Manager bawaan Flask-SocketIO hanya mengenal client yang terhubung ke proses yang sama,
+sehingga emit ke room user (misalnya `new_message` di blueprints/messages.py) tidak sampai
+ke client yang terhubung ke worker lain. Config.SOCKETIO_MESSAGE_QUEUE memilih backend:
+
+- kosong: manager di dalam proses (hanya untuk satu proses).
+- redis://, rediss://, kafka://, zmq+tcp://, amqp://: message queue yang didukung
+  python-socketio (RedisManager, KafkaManager, ZmqManager, KombuManager). Paket client-nya
+  (redis, kafka-python, pyzmq, kombu) harus dipasang terpisah.
+- mongodb://, mongodb+srv:// atau `mongo` (memakai MONGO_URI): MongoManager di bawah ini,
+  tanpa layanan tambahan selain MongoDB yang sudah dipakai aplikasi.
+
+MongoManager memiliki dua mode (Config.SOCKETIO_MONGO_MODE):
+- `capped`: setiap pesan di-insert ke capped collection dan setiap proses membaca
+  dengan tailable cursor (await data) dalam urutan natural (urutan insert). Berjalan di
+  mongod tunggal, termasuk untuk test.
+- `changestream`: setiap proses membuka change stream pada koleksi pesan. Membutuhkan
+  replica set atau Atlas; koleksinya biasa, jadi dokumen dihapus oleh TTL index pada
+  created_at (Config.SOCKETIO_MONGO_TTL_SECONDS, lihat event_indexes()).
+
+Throughput fan-out dapat diukur dengan benchmarks/bench_socket_fanout.py untuk URL
+backend mana pun. Tidak ada angka yang dicatat di repo ini: hasilnya bergantung pada
+jaringan ke broker dan MongoDB, jadi ukur di lingkungan deploy yang sebenarnya sebelum
+memilih backend.
+"""
+import datetime
+import pickle
+import time
+import socketio
+from bson.binary import Binary
+from pymongo import ASCENDING, CursorType, IndexModel, MongoClient
+from pymongo.errors import CollectionInvalid, PyMongoError
+from config import Config
+
+MODE_CAPPED = "capped"
+MODE_CHANGE_STREAM = "changestream"
+
+
+def event_indexes(mode, ttl_seconds):
+    """
+    Indexes of the event collection: in change-stream mode a TTL on created_at, so the
+    plain collection does not grow without bound (capped collections cannot have TTL indexes).
+    """
+    if mode != MODE_CHANGE_STREAM:
+        return []
+    return [IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=ttl_seconds)]
+
+
+class MongoManager(socketio.PubSubManager):
+    """
+    Socket.IO pub/sub client manager backed by a MongoDB collection.
+    Messages are pickled like in the other python-socketio managers; the listener runs
+    in the server's background task and reconnects after errors.
+    """
+    name = "mongo"
+    RETRY_SECONDS = 1 # Jeda sebelum membuka ulang cursor / change stream setelah error
+
+    def __init__(self, url, channel="socketio", write_only=False, logger=None,
+                 collection="socketio_events", mode=MODE_CAPPED, capped_bytes=16 * 1024 * 1024,
+                 ttl_seconds=300):
+        if mode not in (MODE_CAPPED, MODE_CHANGE_STREAM):
+            raise ValueError(f"Unknown MongoManager mode: {mode}")
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self.collection_name = collection
+        self.mode = mode
+        self.capped_bytes = capped_bytes
+        self.ttl_seconds = ttl_seconds
+        # Client dibuat saat pertama dipakai, yaitu setelah fork pada server prefork
+        self._client = None
+        self._collection = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            self._client = MongoClient(self.url)
+            db = self._client.forum_db # Database yang sama dengan database.py
+            if self.mode == MODE_CAPPED:
+                try:
+                    db.create_collection(self.collection_name, capped=True, size=self.capped_bytes)
+                    # Tailable cursor pada capped collection kosong langsung mati; beri satu dokumen awal
+                    db[self.collection_name].insert_one({"channel": None})
+                except CollectionInvalid:
+                    pass # Sudah dibuat oleh proses lain
+            else:
+                # Idempoten; juga didaftarkan di indexes.INDEXES untuk `flask db ensure-indexes`
+                db[self.collection_name].create_indexes(event_indexes(self.mode, self.ttl_seconds))
+            self._collection = db[self.collection_name]
+        return self._collection
+
+    def _publish(self, data):
+        self._get_collection().insert_one({
+            "channel": self.channel,
+            "payload": Binary(pickle.dumps(data)),
+            "created_at": datetime.datetime.utcnow()
+        })
+
+    def _listen(self):
+        listen = self._listen_capped if self.mode == MODE_CAPPED else self._listen_change_stream
+        while True:
+            try:
+                yield from listen()
+            except PyMongoError as e:
+                self._get_logger().error(f"MongoManager listener error: {e}")
+            time.sleep(self.RETRY_SECONDS)
+
+    def _listen_capped(self):
+        """
+        Tails the capped collection in natural (insertion) order. ObjectIds are not ordered
+        across hosts and processes, so a reopened cursor does not filter on _id: it reads
+        from the start and skips documents up to and including the last one already seen.
+        """
+        collection = self._get_collection()
+        # Mulai dari dokumen terakhir saat ini: pesan lama tidak diputar ulang
+        last = collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            # Jika dokumen terakhir sudah tertimpa (koleksi berputar), semua dokumen yang
+            # tersisa di-insert setelahnya, jadi tidak ada yang perlu dilewati
+            skipping = last_id is not None and collection.find_one({"_id": last_id}, {"_id": 1}) is not None
+            # Channel difilter di sini, bukan di query: tailable cursor yang query-nya tidak
+            # cocok dengan dokumen mana pun dapat langsung mati
+            cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT, no_cursor_timeout=True)
+            try:
+                while cursor.alive:
+                    for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc.get("channel") == self.channel:
+                            yield pickle.loads(doc["payload"])
+                    if skipping:
+                        # Sampai di akhir data tanpa menemukan last_id: tertimpa selama pembacaan
+                        self._get_logger().warning("MongoManager lost its position in the capped collection")
+                        skipping = False
+            finally:
+                cursor.close()
+            # Cursor mati (misalnya koleksi berputar melewati posisi terakhir); buka lagi
+            time.sleep(self.RETRY_SECONDS)
+
+    def _listen_change_stream(self):
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.channel": self.channel}}]
+        resume_token = None
+        while True:
+            with self._get_collection().watch(pipeline, resume_after=resume_token) as stream:
+                for change in stream:
+                    resume_token = stream.resume_token
+                    yield pickle.loads(change["fullDocument"]["payload"])
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = self._collection = None
+
+
+def _mongo_url(queue):
+    return Config.MONGO_URI if queue == "mongo" else queue
+
+
+def socketio_options():
+    """Returns the SocketIO(...) / init_app keyword arguments: async mode, transports and client manager."""
+    options = {}
+    if Config.SOCKETIO_ASYNC_MODE:
+        options["async_mode"] = Config.SOCKETIO_ASYNC_MODE
+    if Config.SOCKETIO_WEBSOCKET_ONLY:
+        options["transports"] = ["websocket"]
+    queue = Config.SOCKETIO_MESSAGE_QUEUE
+    if not queue:
+        return options
+    if queue == "mongo" or queue.startswith(("mongodb://", "mongodb+srv://")):
+        options["client_manager"] = MongoManager(
+            _mongo_url(queue),
+            channel=Config.SOCKETIO_CHANNEL,
+            collection=Config.SOCKETIO_MONGO_COLLECTION,
+            mode=Config.SOCKETIO_MONGO_MODE,
+            capped_bytes=Config.SOCKETIO_MONGO_CAPPED_BYTES,
+            ttl_seconds=Config.SOCKETIO_MONGO_TTL_SECONDS
+        )
+    else:
+        # Skema lain dipetakan ke manager python-socketio oleh Flask-SocketIO sendiri
+        options.update(message_queue=queue, channel=Config.SOCKETIO_CHANNEL)
+    return options
+
+
+def client_options():
+    """Options for the browser's io(...) call, matching the server transports."""
+    return {"transports": ["websocket"]} if Config.SOCKETIO_WEBSOCKET_ONLY else {}
@@ -0,0 +1,23 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import database
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """An empty in-memory forum_db (mongomock) behind database.get_db() / read_db()."""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    db = client.forum_db
+    monkeypatch.setattr(database, "client", client)
+    monkeypatch.setattr(database, "db", db)
+    monkeypatch.setattr(database, "heavy_db", db)
+    return db
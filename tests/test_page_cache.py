@@ -0,0 +1,46 @@
+# tests/test_page_cache.py
+from flask import Response
+
+from page_cache import PageCache
+
+
+def page(body, during=None):
+    def build():
+        if during is not None:
+            during()
+        return Response(body, mimetype="text/html")
+    return build
+
+
+def test_write_to_another_page_does_not_discard_a_render():
+    cache = PageCache(maxsize=10, max_bytes=1 << 20)
+    cache.get_or_build("a", 60, ["topic:a"], page("A", during=lambda: cache.invalidate("topic:b")))
+    assert cache.get_or_build("a", 60, ["topic:a"], page("baru")) == b"A"
+
+
+def test_write_to_the_page_during_its_render_is_not_cached():
+    cache = PageCache(maxsize=10, max_bytes=1 << 20)
+    cache.get_or_build("a", 60, ["topic:a"], page("lama", during=lambda: cache.invalidate("topic:a")))
+    assert cache.get_or_build("a", 60, ["topic:a"], page("baru")).get_data() == b"baru"
+    assert cache.get_or_build("a", 60, ["topic:a"], page("lain")) == b"baru"
+
+    cache.get_or_build("b", 60, ["topic:b"], page("lama", during=cache.clear))
+    assert cache.get_or_build("b", 60, ["topic:b"], page("baru")).get_data() == b"baru"
+
+
+def test_invalidation_reaches_other_processes(mongo):
+    writer = PageCache(maxsize=10, max_bytes=1 << 20, sync_seconds=1, max_ttl=60)
+    reader = PageCache(maxsize=10, max_bytes=1 << 20, sync_seconds=1, max_ttl=60)
+    reader._origin = lambda: "other-host:1"
+    reader.get_or_build("a", 60, ["topic:a"], page("lama"))
+    reader.get_or_build("b", 60, ["topic:b"], page("B"))
+
+    writer.invalidate("topic:a")
+    reader.sync()
+    assert reader.get_or_build("a", 60, ["topic:a"], page("baru")).get_data() == b"baru"
+    assert reader.get_or_build("b", 60, ["topic:b"], page("lain")) == b"B"
+    assert reader.remote_invalidations == 1
+
+    writer.clear()
+    reader.sync()
+    assert reader.stats()["size"] == 0
@@ -0,0 +1,9 @@
+# tests/test_purge.py
+from purge import PurgeWorker
+
+
+def test_start_after_stop_does_nothing():
+    worker = PurgeWorker(batch_size=10, throttle=0, lease_seconds=60, poll_interval=1)
+    worker.stop() # Mis. worker_exit gunicorn saat graceful shutdown
+    worker.start()
+    assert worker._thread is None
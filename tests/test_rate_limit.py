@@ -0,0 +1,63 @@
+# tests/test_rate_limit.py
+import pytest
+
+import rate_limit
+from rate_limit import MemoryStore, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.monotonic() as seen by rate_limit."""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_take_spends_tokens_and_refills_over_time(clock):
+    store = MemoryStore(max_keys=10)
+    # 2 token per 10 detik: satu token kembali setiap 5 detik
+    assert store.take("k", rate=0.2, burst=2, window=10) == 1
+    assert store.take("k", rate=0.2, burst=2, window=10) == 0
+    assert store.take("k", rate=0.2, burst=2, window=10) == -1 # Ditolak, kurang satu token penuh
+
+    clock[0] += 2.5
+    assert store.take("k", rate=0.2, burst=2, window=10) == pytest.approx(-0.5)
+    clock[0] += 2.5
+    assert store.take("k", rate=0.2, burst=2, window=10) == pytest.approx(0)
+
+    clock[0] += 60 # Tidak pernah melebihi burst
+    assert store.take("k", rate=0.2, burst=2, window=10) == pytest.approx(1)
+
+
+def test_take_with_zero_cost_only_checks(clock):
+    store = MemoryStore(max_keys=10)
+    assert store.take("k", rate=0.2, burst=2, window=10, cost=0) == 2
+    assert len(store) == 0 # Pemeriksaan tidak membuat bucket
+
+    store.take("k", rate=0.2, burst=2, window=10)
+    assert store.take("k", rate=0.2, burst=2, window=10, cost=0) == 1
+    assert store.take("k", rate=0.2, burst=2, window=10, cost=0) == 1 # Tidak mengambil token
+    store.take("k", rate=0.2, burst=2, window=10)
+    assert store.take("k", rate=0.2, burst=2, window=10, cost=0) < 0
+
+
+def test_hit_returns_retry_after_until_a_token_refills(clock):
+    limiter = RateLimiter("test", limit=2, window=10)
+    assert limiter.hit("1.2.3.4") is None
+    assert limiter.hit("1.2.3.4") is None
+    assert limiter.hit("1.2.3.4") == 5 # Satu token kembali setelah 10 / 2 detik
+    assert limiter.hit("5.6.7.8") is None # Bucket per kunci
+
+    clock[0] += 4
+    assert limiter.hit("1.2.3.4") == 1 # Sisa 0.2 token = 1 detik
+    clock[0] += 1
+    assert limiter.hit("1.2.3.4") is None
+    assert limiter.stats() == {"rejected": 2, "tracked_keys": 2}
+
+
+def test_hit_with_zero_cost_does_not_spend(clock):
+    limiter = RateLimiter("test", limit=1, window=60)
+    for _ in range(3):
+        assert limiter.hit("alice", cost=0) is None
+    assert limiter.hit("alice") is None
+    assert limiter.hit("alice", cost=0) == 60
@@ -0,0 +1,209 @@
+# tests/test_search_engine.py
+import datetime
+import json
+import time
+
+import pytest
+
+import purge
+import search_engine
+from search_engine import InvertedIndex, LocalSearchBackend, tokenize
+
+
+def round_trip(index):
+    return InvertedIndex.from_state(json.loads(json.dumps(index.to_state())))
+
+
+# --- InvertedIndex ---
+
+def test_add_replaces_the_previous_version():
+    index = InvertedIndex()
+    index.add("t:1", "1", tokenize("flask blueprint"))
+    index.add("t:1", "1", tokenize("mongodb index"))
+    assert index.search(tokenize("flask")) == []
+    assert index.search(tokenize("mongodb")) == ["1"]
+    assert index.live_docs == 1
+
+
+def test_remove_and_remove_topic():
+    index = InvertedIndex()
+    for i in range(8):
+        index.add(f"t:{i}", str(i), tokenize("flask"))
+    index.add("p:a", "0", tokenize("gunicorn"))
+    index.add("p:b", "1", tokenize("gunicorn"))
+    index.remove("p:b")
+    index.remove("p:unknown")
+    assert index.search(tokenize("gunicorn")) == ["0"]
+    index.remove_topic("0")
+    assert index.search(tokenize("gunicorn")) == []
+    assert "0" not in index.search(tokenize("flask"))
+    assert index.live_docs == 7
+
+
+def test_compact_drops_tombstones_and_renumbers():
+    index = InvertedIndex()
+    for i in range(10):
+        index.add(f"t:{i}", str(i), tokenize(f"flask topik{i}"))
+    for i in range(0, 10, 2):
+        index.remove(f"t:{i}") # Compaction otomatis setelah tombstone melewati COMPACT_RATIO
+    index.compact()
+    assert index.dead_docs == 0
+    assert len(index.alive) == index.live_docs == 5
+    assert sorted(index.ordinals.values()) == list(range(5))
+    assert sorted(index.search(tokenize("flask"))) == ["1", "3", "5", "7", "9"]
+    assert index.search(tokenize("topik3")) == ["3"]
+    assert index.search(tokenize("topik4")) == []
+    # Dokumen baru setelah compaction tetap mendapat ordinal di akhir
+    index.add("t:10", "10", tokenize("topik10"))
+    assert index.search(tokenize("topik10")) == ["10"]
+
+
+def test_state_round_trip():
+    index = InvertedIndex()
+    index.add("t:1", "1", tokenize("belajar flask blueprint") * 2)
+    index.add("p:1", "1", tokenize("balasan tentang flask"))
+    index.add("t:2", "2", tokenize("mongodb flask"))
+    index.remove("p:1")
+    restored = round_trip(index)
+    assert restored.stats() == index.stats()
+    assert restored.ordinals == index.ordinals
+    assert restored.search(tokenize("flask")) == index.search(tokenize("flask"))
+    assert restored.search(tokenize("balasan")) == []
+    restored.add("p:2", "2", tokenize("balasan"))
+    assert restored.search(tokenize("balasan")) == ["2"]
+
+
+def test_state_from_another_platform_is_rejected():
+    state = InvertedIndex().to_state()
+    state["byteorder"] = "big" if state["byteorder"] == "little" else "little"
+    with pytest.raises(ValueError):
+        InvertedIndex.from_state(state)
+
+
+# --- BM25 ---
+
+def test_bm25_ranks_higher_term_frequency_first():
+    index = InvertedIndex()
+    index.add("t:once", "once", tokenize("flask server deploy"))
+    index.add("t:twice", "twice", tokenize("flask flask deploy"))
+    assert index.search(tokenize("flask")) == ["twice", "once"]
+
+
+def test_bm25_prefers_shorter_documents():
+    index = InvertedIndex()
+    index.add("t:long", "long", tokenize("flask " + "kata lain " * 20))
+    index.add("t:short", "short", tokenize("flask singkat"))
+    assert index.search(tokenize("flask")) == ["short", "long"]
+
+
+def test_bm25_weights_rare_terms_higher():
+    index = InvertedIndex()
+    for i in range(5):
+        index.add(f"t:{i}", str(i), tokenize("flask umum"))
+    index.add("t:common", "common", tokenize("flask flask jarang"))
+    index.add("t:rare", "rare", tokenize("gevent jarang"))
+    assert index.search(tokenize("gevent flask"))[0] == "rare"
+
+
+def test_tombstones_do_not_make_scores_negative():
+    index = InvertedIndex()
+    for i in range(5):
+        index.add(f"t:{i}", str(i), tokenize("flask"))
+    index.add("t:0", "0", tokenize("flask")) # Versi lama tetap ada di postings sampai compaction
+    assert sorted(index.search(tokenize("flask"))) == ["0", "1", "2", "3", "4"]
+
+
+def test_topic_scores_by_its_best_document():
+    index = InvertedIndex()
+    index.add("t:1", "1", tokenize("topik pertama"))
+    index.add("p:1", "1", tokenize("gunicorn gunicorn"))
+    index.add("t:2", "2", tokenize("gunicorn dan lainnya"))
+    assert index.search(tokenize("gunicorn")) == ["1", "2"]
+
+
+# --- LocalSearchBackend ---
+
+def make_backend(path):
+    return LocalSearchBackend(snapshot_path=str(path), refresh_seconds=3600, snapshot_seconds=3600, tombstone_seconds=3600)
+
+
+def insert_topic(db, title, **fields):
+    now = datetime.datetime.utcnow()
+    return db.topics.insert_one({"title": title, "content": "", "created_at": now, "updated_at": now,
+                                 "deleted_at": None, **fields}).inserted_id
+
+
+def insert_post(db, topic_id, content):
+    now = datetime.datetime.utcnow()
+    return db.posts.insert_one({"topic_id": topic_id, "content": content, "created_at": now,
+                                "updated_at": now}).inserted_id
+
+
+def test_rebuild_skips_replies_of_deleted_topics(mongo, tmp_path):
+    live = insert_topic(mongo, "Topik aktif")
+    deleted = insert_topic(mongo, "Topik dihapus", deleted_at=datetime.datetime.utcnow())
+    insert_post(mongo, live, "gunicorn")
+    insert_post(mongo, deleted, "gunicorn")
+    backend = make_backend(tmp_path / "index.json")
+    backend.rebuild()
+    assert backend.search_ids("gunicorn", 10) == ([str(live)], 1)
+
+
+def test_sync_applies_deletions_from_other_processes(mongo, tmp_path):
+    purged = insert_topic(mongo, "Topik gevent")
+    soft_deleted = insert_topic(mongo, "Topik gevent kedua")
+    kept = insert_topic(mongo, "Topik gevent ketiga")
+    post_id = insert_post(mongo, soft_deleted, "balasan lama")
+    backend = make_backend(tmp_path / "index.json")
+    backend.rebuild()
+
+    # Proses lain: purge satu topik, soft delete topik lain lalu balasannya diedit
+    mongo.topics.delete_one({"_id": purged})
+    purge.record_topic_tombstone(purged)
+    mongo.topics.update_one({"_id": soft_deleted}, {"$set": {"deleted_at": datetime.datetime.utcnow()}})
+    mongo.posts.update_one({"_id": post_id}, {"$set": {"content": "balasan baru",
+                                                      "updated_at": datetime.datetime.utcnow()}})
+    backend.sync()
+    assert backend.index.search(tokenize("gevent")) == [str(kept)]
+    assert backend.index.search(tokenize("balasan")) == []
+
+
+def test_search_counts_only_live_topics(mongo, tmp_path):
+    ids = [insert_topic(mongo, f"Topik flask {i}") for i in range(5)]
+    backend = make_backend(tmp_path / "index.json")
+    backend.rebuild()
+    # Dihapus oleh proses lain, belum disusul oleh sync()
+    mongo.topics.update_many({"_id": {"$in": ids[:3]}}, {"$set": {"deleted_at": datetime.datetime.utcnow()}})
+    topics, total = backend.search("flask", 1, 2, {"_id": 1})
+    assert total == 2
+    assert sorted(t["_id"] for t in topics) == sorted(ids[3:])
+    assert backend.search("flask", 2, 2, {"_id": 1}) == ([], 2)
+
+
+def test_first_search_loads_in_the_background(mongo, tmp_path):
+    topic_id = insert_topic(mongo, "Topik flask")
+    backend = make_backend(tmp_path / "index.json")
+    assert backend.search_ids("flask", 10) == ([], 0)
+    deadline = time.monotonic() + 5
+    while not backend.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert backend.ready
+    assert backend.search_ids("flask", 10) == ([str(topic_id)], 1)
+
+
+def test_snapshot_from_another_database_is_not_loaded(mongo, tmp_path, monkeypatch):
+    path = tmp_path / "index.json"
+    insert_topic(mongo, "Topik flask")
+    make_backend(path).rebuild()
+    assert path.exists()
+
+    same = make_backend(path)
+    same.load()
+    assert same.index.search(tokenize("flask"))
+
+    monkeypatch.setattr(search_engine, "source_name", lambda: "mongodb://other-host/forum_db")
+    mongo.topics.delete_many({})
+    other = make_backend(path)
+    other.load()
+    assert other.source == "mongodb://other-host/forum_db"
+    assert other.index.search(tokenize("flask")) == []
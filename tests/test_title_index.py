@@ -0,0 +1,54 @@
+# tests/test_title_index.py
+import datetime
+
+from bson.objectid import ObjectId
+
+import counters
+import purge
+from title_index import TitleIndex
+
+
+def make_index():
+    return TitleIndex(max_words=3, key_length=20, merge_threshold=1000, refresh_seconds=3600)
+
+
+def insert_topic(db, title):
+    now = datetime.datetime.utcnow()
+    return db.topics.insert_one({"title": title, "created_at": now, "updated_at": now, "deleted_at": None}).inserted_id
+
+
+def titles(index, query):
+    return [s["title"] for s in index.suggest(query, 8)]
+
+
+def test_suggest_matches_any_of_the_first_words(mongo):
+    insert_topic(mongo, "Belajar Flask Blueprint")
+    insert_topic(mongo, "Blueprint untuk para pemula")
+    index = make_index()
+    index.rebuild()
+
+    # Judul yang cocok dari kata pertamanya di urutan pertama
+    assert titles(index, "blue") == ["Blueprint untuk para pemula", "Belajar Flask Blueprint"]
+    assert titles(index, "flask") == ["Belajar Flask Blueprint"]
+    assert titles(index, "pemula") == []
+
+
+def test_purged_topic_is_dropped_by_other_processes(mongo, monkeypatch):
+    monkeypatch.setattr(counters, "record_users_activity", lambda activity: None)
+    topic_id = insert_topic(mongo, "Belajar Flask Blueprint")
+    insert_topic(mongo, "Blueprint untuk para pemula")
+    mongo.posts.insert_one({"topic_id": topic_id, "author_id": ObjectId(), "content": "balasan"})
+    other = make_index() # Index milik worker lain yang tidak melihat Topic.delete
+    other.rebuild()
+
+    # Soft delete lalu purge selesai sebelum worker lain sempat sync
+    mongo.topics.update_one({"_id": topic_id}, {"$set": {"deleted_at": datetime.datetime.utcnow()}})
+    purge.enqueue_topic_purge(topic_id)
+    worker = purge.PurgeWorker(batch_size=10, throttle=0, lease_seconds=60, poll_interval=1)
+    worker.owner = "test"
+    worker._process(worker._claim_job())
+    assert mongo.topics.find_one({"_id": topic_id}) is None
+    assert mongo.posts.count_documents({"topic_id": topic_id}) == 0
+
+    other.sync()
+    assert titles(other, "blue") == ["Blueprint untuk para pemula"]
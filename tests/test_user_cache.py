@@ -0,0 +1,16 @@
+# tests/test_user_cache.py
+from bson.objectid import ObjectId
+
+from user_cache import UserCache
+
+
+def test_put_after_an_invalidation_is_skipped():
+    cache = UserCache(maxsize=10, ttl=60)
+    user_id = ObjectId()
+    generation = cache.generation()
+    cache.invalidate(user_id) # Mis. password diganti saat dokumen lama sedang dibaca
+    cache.put({"_id": user_id, "username": "alice", "email": "a@example.com"}, generation)
+    assert cache.get("_id", user_id) is None
+
+    cache.put({"_id": user_id, "username": "alice", "email": "a@example.com"}, cache.generation())
+    assert cache.get("username", "alice")["_id"] == user_id
@@ -0,0 +1,292 @@
+# title_index.py
+"""
+Index prefix judul topik di dalam memori untuk typeahead /search/suggest.
+
+Setiap judul dinormalisasi (NFKC, casefold, tanda baca menjadi spasi) lalu
+menghasilkan beberapa kunci: akhiran judul yang dimulai dari beberapa kata
+pertamanya, dipotong ke SUGGEST_KEY_LENGTH karakter. Dengan begitu "blue" cocok
+dengan "Belajar Flask Blueprint" lewat kunci "blueprint".
+
+Agar tetap ringkas untuk jutaan judul, kunci disimpan sebagai satu blob UTF-8
+terurut dengan offset array('I') dan dicari dengan bisect. Perubahan baru masuk
+ke delta kecil yang terurut; ketika delta melewati SUGGEST_MERGE_THRESHOLD, delta
+digabung ke blob oleh thread background. Versi judul yang lama atau topik yang
+dihapus disaring lewat `_overrides` sampai penggabungan berikutnya.
+"""
+import bisect
+import datetime
+import heapq
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bson.objectid import ObjectId
+from config import Config
+from database import get_db
+from purge import TOMBSTONE_RETENTION, purged_topic_ids
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(text):
+    """NFKC, casefold, punctuation collapsed to single spaces."""
+    return _NON_WORD_RE.sub(" ", unicodedata.normalize("NFKC", text or "").casefold()).strip()
+
+
+class _KeyView:
+    """Read-only sequence over the packed keys, so bisect can search the blob directly."""
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+class TitleIndex:
+    """Compact, thread-safe prefix index over live topic titles."""
+    SYNC_MARGIN = datetime.timedelta(seconds=5) # Toleransi perbedaan jam antar proses
+
+    def __init__(self, max_words, key_length, merge_threshold, refresh_seconds):
+        self.max_words = max_words
+        self.key_length = key_length
+        self.merge_threshold = merge_threshold
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.synced_at = None
+        self._loading = False
+        self._merging = False
+        self._last_refresh = 0.0
+
+    def _reset(self):
+        # Judul: ordinal -> ObjectId (12 byte) dan judul asli di blob UTF-8
+        self._ids = bytearray()
+        self._titles = bytearray()
+        self._title_offsets = array('I', [0])
+        # Kunci terurut: blob UTF-8 + offset, dengan ordinal judul dan posisi kata per kunci
+        self._keys = b""
+        self._key_offsets = array('I', [0])
+        self._key_titles = array('I')
+        self._key_positions = array('B')
+        self._frozen = [] # Delta yang sedang digabung di background
+        self._delta = [] # Sorted list of (key bytes, title ordinal, word position)
+        self._overrides = {} # topic id bytes -> ordinal versi terbaru, atau None jika dihapus
+
+    # --- penyimpanan judul ---
+
+    def _append_title(self, topic_id, title):
+        ordinal = len(self._title_offsets) - 1
+        self._ids += ObjectId(topic_id).binary
+        self._titles += title.encode("utf-8")
+        self._title_offsets.append(len(self._titles))
+        return ordinal
+
+    def _title(self, ordinal):
+        return self._titles[self._title_offsets[ordinal]:self._title_offsets[ordinal + 1]].decode("utf-8")
+
+    def _topic_id(self, ordinal):
+        return bytes(self._ids[ordinal * 12:ordinal * 12 + 12])
+
+    def _keys_for(self, title):
+        words = normalize_title(title).split()
+        keys = {}
+        for position in range(min(len(words), self.max_words)):
+            key = " ".join(words[position:])[:self.key_length].encode("utf-8")
+            keys.setdefault(key, position)
+        return keys.items()
+
+    def _is_current(self, ordinal):
+        latest = self._overrides.get(self._topic_id(ordinal), ordinal)
+        return latest == ordinal
+
+    # --- pemuatan & sinkronisasi ---
+
+    def _start_loading(self):
+        """Builds the index from MongoDB in a background thread. Caller holds the lock."""
+        if self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self.rebuild, name="title-index-load", daemon=True).start()
+
+    def rebuild(self):
+        """Builds the whole index from MongoDB; suggestions stay empty until the first build finishes."""
+        try:
+            started = datetime.datetime.utcnow()
+            fresh = TitleIndex(self.max_words, self.key_length, self.merge_threshold, self.refresh_seconds)
+            entries = []
+            for t in get_db().topics.find({"deleted_at": None}, {"title": 1}):
+                ordinal = fresh._append_title(t["_id"], t["title"])
+                entries.extend((key, ordinal, position) for key, position in fresh._keys_for(t["title"]))
+            entries.sort()
+            fresh._pack(entries)
+            with self._lock:
+                # Perubahan yang terjadi selama build akan disusul oleh sync()
+                for name in ("_ids", "_titles", "_title_offsets", "_keys", "_key_offsets",
+                             "_key_titles", "_key_positions"):
+                    setattr(self, name, getattr(fresh, name))
+                self._frozen, self._delta, self._overrides = [], [], {}
+                self.synced_at = started
+                self.ready = True
+                self.sync()
+            return self.stats()
+        except Exception as e:
+            print(f"Title index build failed: {e}")
+        finally:
+            self._loading = False
+
+    def _pack(self, entries):
+        """Replaces the packed keys with an iterable of sorted (key, ordinal, position) entries."""
+        keys, offsets, titles, positions = bytearray(), array('I', [0]), array('I'), array('B')
+        for key, ordinal, position in entries:
+            keys += key
+            offsets.append(len(keys))
+            titles.append(ordinal)
+            positions.append(position)
+        self._keys = keys
+        self._key_offsets, self._key_titles, self._key_positions = offsets, titles, positions
+
+    def sync(self):
+        """Applies topic writes made since the last sync (e.g. by other worker processes), including purged topics."""
+        with self._lock:
+            if not self.ready:
+                return
+            db = get_db()
+            started = datetime.datetime.utcnow()
+            since = self.synced_at - self.SYNC_MARGIN
+            if since < started - TOMBSTONE_RETENTION:
+                # Tombstone topik yang di-purge sejak saat itu mungkin sudah dibuang oleh TTL
+                self._start_loading()
+            for t in db.topics.find({"updated_at": {"$gte": since}, "deleted_at": None}, {"title": 1}):
+                self.add(t["_id"], t["title"])
+            for t in db.topics.find({"deleted_at": {"$gte": since}}, {"_id": 1}):
+                self.remove(t["_id"])
+            # Topik yang sudah di-purge tidak lagi ada di koleksi topics
+            for topic_id in purged_topic_ids(since):
+                self.remove(topic_id)
+            self.synced_at = started
+            self._last_refresh = time.monotonic()
+
+    def _merge(self):
+        """Merges the frozen delta into the packed keys, dropping stale entries."""
+        # Array kunci tidak pernah diubah di tempat (hanya diganti), jadi aman dibaca tanpa lock
+        with self._lock:
+            keys, key_offsets = self._keys, self._key_offsets
+            key_titles, key_positions = self._key_titles, self._key_positions
+            frozen = self._frozen
+            overrides = dict(self._overrides)
+            title_count = len(self._title_offsets) - 1
+        try:
+            # Ordinal yang sudah digantikan versi lebih baru atau milik topik yang dihapus
+            stale = {ordinal for ordinal in range(title_count)
+                     if overrides.get(self._topic_id(ordinal), ordinal) != ordinal}
+            base = zip(_KeyView(keys, key_offsets), key_titles, key_positions)
+            packed = TitleIndex(self.max_words, self.key_length, self.merge_threshold, self.refresh_seconds)
+            packed._pack(entry for entry in heapq.merge(base, frozen) if entry[1] not in stale)
+            with self._lock:
+                self._keys, self._key_offsets = packed._keys, packed._key_offsets
+                self._key_titles, self._key_positions = packed._key_titles, packed._key_positions
+                self._frozen = []
+                # Entri basi untuk override ini sudah dibuang; override yang berubah selama merge tetap disimpan
+                for topic_id, ordinal in overrides.items():
+                    if self._overrides.get(topic_id, ordinal) == ordinal:
+                        self._overrides.pop(topic_id, None)
+        finally:
+            self._merging = False
+
+    # --- pembaruan inkremental ---
+
+    def add(self, topic_id, title):
+        """Indexes a new or edited topic title; older versions of the topic stop matching."""
+        with self._lock:
+            if not self.ready:
+                return # Build berikutnya membaca judul langsung dari MongoDB
+            ordinal = self._append_title(topic_id, title)
+            self._overrides[ObjectId(topic_id).binary] = ordinal
+            for key, position in self._keys_for(title):
+                bisect.insort(self._delta, (key, ordinal, position))
+            if len(self._delta) >= self.merge_threshold and not self._merging:
+                self._merging = True
+                self._frozen, self._delta = self._delta, []
+                threading.Thread(target=self._merge, name="title-index-merge", daemon=True).start()
+
+    def remove(self, topic_id):
+        """Stops suggesting a deleted topic."""
+        with self._lock:
+            if self.ready:
+                self._overrides[ObjectId(topic_id).binary] = None
+
+    # --- query ---
+
+    def suggest(self, query_text, limit):
+        """
+        Returns up to limit [{"id", "title"}] whose normalized title has a word starting
+        with the normalized query. Titles matching from their first word rank first.
+        """
+        prefix = normalize_title(query_text)[:self.key_length].encode("utf-8")
+        if not prefix:
+            return []
+        with self._lock:
+            if not self.ready:
+                self._start_loading()
+                return []
+            if time.monotonic() - self._last_refresh > self.refresh_seconds:
+                self.sync()
+
+            scan = limit * 8
+            candidates = []
+            view = _KeyView(self._keys, self._key_offsets)
+            i = bisect.bisect_left(view, prefix)
+            while i < len(view) and len(candidates) < scan and view[i].startswith(prefix):
+                candidates.append((self._key_positions[i], view[i], self._key_titles[i]))
+                i += 1
+            for delta in (self._frozen, self._delta):
+                start = bisect.bisect_left(delta, (prefix,))
+                for key, ordinal, position in delta[start:start + scan]:
+                    if not key.startswith(prefix):
+                        break
+                    candidates.append((position, key, ordinal))
+
+            suggestions, seen = [], set()
+            for _, _, ordinal in sorted(candidates):
+                if ordinal in seen or not self._is_current(ordinal):
+                    continue
+                seen.add(ordinal)
+                suggestions.append({"id": str(ObjectId(self._topic_id(ordinal))), "title": self._title(ordinal)})
+                if len(suggestions) >= limit:
+                    break
+            return suggestions
+
+    def stats(self):
+        """Returns entry counts and the approximate memory footprint in bytes."""
+        with self._lock:
+            packed = (len(self._keys) + len(self._titles) + len(self._ids)
+                      + sum(a.itemsize * len(a) for a in (self._key_offsets, self._key_titles,
+                                                          self._key_positions, self._title_offsets)))
+            # Perkiraan kasar untuk struktur Python biasa (tuple + bytes per entri delta)
+            pending = sum(sys.getsizeof(d) + len(d) * 120 for d in (self._frozen, self._delta))
+            pending += sys.getsizeof(self._overrides) + len(self._overrides) * 50
+            return {
+                "ready": self.ready,
+                "titles": len(self._title_offsets) - 1,
+                "keys": len(self._key_titles),
+                "delta": len(self._delta) + len(self._frozen),
+                "overrides": len(self._overrides),
+                "packed_bytes": packed,
+                "pending_bytes": pending,
+                "memory_bytes": packed + pending
+            }
+
+
+title_index = TitleIndex(
+    max_words=Config.SUGGEST_MAX_WORDS,
+    key_length=Config.SUGGEST_KEY_LENGTH,
+    merge_threshold=Config.SUGGEST_MERGE_THRESHOLD,
+    refresh_seconds=Config.SUGGEST_REFRESH_SECONDS
+)
@@ -0,0 +1,225 @@
+# user_cache.py
+"""
+Cache dokumen user untuk Flask-Login user_loader dan pencarian User.
+
+Dua lapis:
+- memo per request (flask.g), sehingga satu request tidak pernah mengambil user yang sama dua kali;
+- LRU per proses dengan TTL dan ukuran terbatas, dibagi oleh pencarian berdasarkan _id, username dan email.
+
+Entri harus di-invalidate setiap kali dokumen user berubah (lihat invalidate()), kecuali
+counter (UNCACHED_FIELDS): counter aktivitas berubah di setiap penyimpanan topik/balasan dan
+unread_messages di setiap pesan, jadi tidak disimpan di cache dan dibaca langsung oleh halaman
+yang menampilkannya (counters.load_user_activity(), inbox.unread_count()).
+Invalidasi langsung berlaku di proses yang menulis, lalu dicatat di koleksi
+`user_cache_invalidations` (TTL Config.USER_CACHE_TTL). Proses lain (worker gunicorn, host
+lain, perintah CLI) membacanya paling lambat setiap Config.USER_CACHE_SYNC_SECONDS, saat
+cache dipakai. Batasnya: selama jeda itu worker lain masih dapat memakai dokumen lama
+(role, password_hash); jika pencatatan ke MongoDB gagal, sampai
+Config.USER_CACHE_TTL.
+"""
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_request_context
+from pymongo.errors import PyMongoError
+from config import Config
+from database import get_db
+
+# Field yang dapat dipakai untuk mencari user di cache
+LOOKUP_FIELDS = ("_id", "username", "email")
+# Counter yang diubah tanpa invalidasi (lihat counters.record_user_activity dan inbox.record_messages);
+# tidak pernah disimpan di cache
+UNCACHED_FIELDS = frozenset(("topic_count", "post_count", "last_active_at", "unread_messages"))
+
+
+class UserCache:
+    """Bounded, thread-safe LRU of raw user documents with a TTL and a per-request memo."""
+    SYNC_MARGIN = datetime.timedelta(seconds=5) # Toleransi perbedaan jam antar proses
+
+    def __init__(self, maxsize, ttl, sync_seconds=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sync_seconds = sync_seconds # 0 = invalidasi hanya di proses ini
+        self._entries = OrderedDict()  # str(_id) -> (expires_at, document)
+        self._keys = {}  # (field, value) -> str(_id), for username/email lookups
+        self._lock = threading.Lock()
+        self._generation = 0  # Dinaikkan setiap invalidasi; dokumen yang dibaca sebelumnya tidak disimpan
+        self._sync_lock = threading.Lock()
+        self._synced_at = datetime.datetime.utcnow() # Invalidasi dari proses lain sudah dibaca sampai sini
+        self._last_sync = time.monotonic()
+        self._seen = set() # Id invalidasi di dalam SYNC_MARGIN yang sudah diterapkan
+        self.hits = 0
+        self.misses = 0
+        self.request_hits = 0
+        self.evictions = 0
+        self.remote_invalidations = 0
+
+    @staticmethod
+    def _memo():
+        """Returns the per-request memo dict, or None outside a request."""
+        if not has_request_context():
+            return None
+        if "_user_cache" not in g:
+            g._user_cache = {}
+        return g._user_cache
+
+    def get(self, field, value):
+        """Returns a cached user document looked up by field ('_id', 'username' or 'email'), or None."""
+        key = (field, str(value) if field == "_id" else value)
+        memo = self._memo()
+        if memo is not None and key in memo:
+            self.request_hits += 1
+            return memo[key]
+        if self.sync_seconds and time.monotonic() - self._last_sync > self.sync_seconds:
+            self.sync()
+
+        with self._lock:
+            user_id = key[1] if field == "_id" else self._keys.get(key)
+            entry = self._entries.get(user_id) if user_id else None
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(user_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            document = entry[1]
+
+        if memo is not None:
+            memo[key] = document
+        return document
+
+    def generation(self):
+        """Snapshot to take before reading a user from MongoDB and to pass to put()."""
+        with self._lock:
+            return self._generation
+
+    def put(self, document, generation=None):
+        """
+        Stores a user document, without UNCACHED_FIELDS, in the LRU and in the current
+        request's memo. With the generation() taken before the document was read, the put
+        is skipped if an invalidation happened since: the document may already be stale.
+        """
+        document = {field: value for field, value in document.items() if field not in UNCACHED_FIELDS}
+        user_id = str(document["_id"])
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if user_id in self._entries:
+                self._remove(user_id)
+            self._entries[user_id] = (time.monotonic() + self.ttl, document)
+            for field in ("username", "email"):
+                self._keys[(field, document.get(field))] = user_id
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+        memo = self._memo()
+        if memo is not None:
+            for field in LOOKUP_FIELDS:
+                memo[(field, user_id if field == "_id" else document.get(field))] = document
+
+    def invalidate(self, user_id):
+        """Drops a user from the LRU and from the current request's memo, in every process."""
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids):
+        """Bulk form of invalidate(), published to other processes with one insert."""
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._remove(user_id)
+        memo = self._memo()
+        if memo is not None:
+            memo.clear()
+        self._publish(user_ids)
+
+    @staticmethod
+    def _origin():
+        # Dihitung setiap kali, sehingga tetap benar di proses anak setelah fork
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _publish(self, user_ids):
+        """Records invalidations for other processes; user_id None means "clear everything"."""
+        if not self.sync_seconds:
+            return
+        now = datetime.datetime.utcnow()
+        expires_at = now + datetime.timedelta(seconds=self.ttl)
+        try:
+            get_db().user_cache_invalidations.insert_many(
+                [{"user_id": user_id, "origin": self._origin(), "at": now, "expires_at": expires_at}
+                 for user_id in user_ids], ordered=False)
+        except PyMongoError as e:
+            # Worker lain memakai dokumen lama sampai TTL entri mereka habis
+            print(f"Could not publish user cache invalidation: {e}")
+
+    def sync(self):
+        """Applies invalidations published by other processes since the last sync."""
+        if not self._sync_lock.acquire(blocking=False):
+            return # Thread lain sedang menyusul
+        try:
+            self._last_sync = time.monotonic()
+            started = datetime.datetime.utcnow()
+            since = self._synced_at - self.SYNC_MARGIN
+            origin = self._origin()
+            seen = set()
+            for doc in get_db().user_cache_invalidations.find({"at": {"$gte": since}}, {"user_id": 1, "origin": 1}):
+                seen.add(doc["_id"])
+                if doc["_id"] in self._seen or doc.get("origin") == origin:
+                    continue
+                self.remote_invalidations += 1
+                with self._lock:
+                    self._generation += 1
+                    if doc.get("user_id") is None:
+                        self._entries.clear()
+                        self._keys.clear()
+                    else:
+                        self._remove(doc["user_id"])
+            self._seen = seen
+            self._synced_at = started
+        except PyMongoError as e:
+            print(f"Could not sync user cache invalidations: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def _remove(self, user_id):
+        """Removes an entry and its username/email keys. Caller must hold the lock."""
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for field in ("username", "email"):
+            key = (field, entry[1].get(field))
+            if self._keys.get(key) == user_id:
+                del self._keys[key]
+
+    def clear(self):
+        """Drops every cached user, in every process."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys.clear()
+        self._publish([None])
+
+    def stats(self):
+        """Returns hit/miss counters and the current size, for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "request_hits": self.request_hits,
+            "evictions": self.evictions,
+            "remote_invalidations": self.remote_invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+user_cache = UserCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL, Config.USER_CACHE_SYNC_SECONDS)
@@ -5,4 +5,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from app import app 
+from app import create_app
+from purge import purge_worker
+
+# Vercel dan server WSGI lain memakai objek `app` dari modul ini
+app = create_app()
+# Worker purge dimulai sekali per proses yang mengimpor modul ini (tanpa preload/fork sesudahnya);
+# serve.py memulainya lewat hook gunicorn post_worker_init
+purge_worker.start()
+